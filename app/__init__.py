@@ -2,59 +2,151 @@ import os
 import json
 
 from sqlalchemy import exc
+from sqlalchemy.orm import selectinload, joinedload, contains_eager
 from flask_cors import CORS
 from dateutil.parser import parse
 
-from flask import Flask, request, jsonify, abort
-from app.models import Actor, Movie, setup_db
-from auth.auth import requires_auth, AuthError
+from flask import Flask, request, abort
+from app.models import db, Actor, Movie, Casting, StaleVersion, setup_db
+from app.pool import pool_status
+from app.http_cache import (
+    resource_etag, list_validators, is_fresh, with_validators, not_modified,
+    if_match_version)
+from app.response_cache import cached_response, response_cache
+from app.single_flight import coalesced, single_flight
+from app.query_stats import query_stats
+from app.metrics import metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from app.routing import router
+from app.counts import count_rows, COUNT_STRATEGY, COUNT_STRATEGIES
+from app.pagination import keyset_page, order_by_sort, sort_columns
+from app.filters import list_criteria, parse_fields, load_fields
+from app.serialization import jsonify, row_query, init_app as init_json
+from app.export import export_response
+from app.search import search, SEARCHABLE, SEARCH_MAX_LIMIT
+from app.batch import parse_ids, fetch_by_ids
+from app.bulk import (
+    parse_operations, required_permissions, apply_operations,
+    BULK_CHUNK_SIZE)
+from app.validation import validate_data, ValidationError
+from auth.auth import (
+    requires_auth, check_permissions, get_current_payload,
+    get_current_permissions, AuthError)
+from auth.permissions import Permissions
 
 app = Flask(__name__)
 setup_db(app)
+init_json(app)
+query_stats.init_app(app)
+metrics.init_app(app)
+router.init_app(app)
 CORS(app)
 
 
 PER_PAGE = 10
+INTERNAL_ENDPOINTS = os.getenv('INTERNAL_ENDPOINTS', 'false').lower() == 'true'
 
 # ROUTES
 '''
 Retrieves a paginated list of actors.
+The total is computed with the `count` strategy
+(exact, cached or approximate), defaulting to COUNT_STRATEGY.
+Filters: `gender`, `min_age`, `max_age` and `name_prefix`.
+`sort` orders by id, created_at, name or dob, descending with a '-'
+prefix, and `fields` selects a comma separated subset of the fields.
+Passing `cursor` (empty for the first page) switches from page/limit
+to keyset pagination ordered by `sort`; the response then carries the
+`next_cursor` to request.
+`ids` (comma separated, at most BATCH_MAX_IDS) instead returns those
+actors in the requested order, loaded in a single query, with the ids
+that do not exist listed in `missing`.
+Responses are kept in the response cache until actors change.
+With SINGLE_FLIGHT on, identical requests in flight share one response.
 '''
 @app.route('/api/v1/actors', methods=['GET'])
 @requires_auth(permission='get:actors')
+@coalesced(Actor)
+@cached_response(Actor)
 def retrieve_actors():
     page = request.args.get('page', 1, type=int)
     limit = request.args.get('limit', PER_PAGE, type=int)
     offset = (page - 1) * limit
+    cursor = request.args.get('cursor')
+    sort = request.args.get('sort', 'id')
+    strategy = request.args.get('count', COUNT_STRATEGY)
+    if strategy not in COUNT_STRATEGIES:
+        abort(400)
+    ids = request.args.get('ids')
     try:
-        actors = Actor.query.offset(offset).limit(limit).all()
+        sort_columns(Actor, sort)
+        criteria = list_criteria(Actor, request.args)
+        fields = parse_fields(Actor, request.args.get('fields'))
+        if ids is not None:
+            ids = parse_ids(ids)
+    except ValueError:
+        abort(400)
+    try:
+        etag, last_modified = list_validators(Actor)
+        if is_fresh(etag, last_modified):
+            return not_modified(etag, weak=True, last_modified=last_modified)
+        if ids is not None:
+            query = Actor.query
+            if fields:
+                query = query.options(load_fields(Actor, fields))
+            actors, missing = fetch_by_ids(Actor, ids, query)
+            response = jsonify({
+                'success': True,
+                'actors': Actor.format_rows(actors, fields),
+                'missing': missing
+            })
+            return with_validators(response, etag, weak=True,
+                                   last_modified=last_modified), 200
+        query = row_query(Actor.query.filter(*criteria), Actor, fields, sort)
+        if cursor is None:
+            actors = order_by_sort(query, Actor, sort) \
+                .offset(offset).limit(limit).all()
+        else:
+            try:
+                actors, next_cursor = keyset_page(Actor, sort, cursor, limit,
+                                                  query=query)
+            except ValueError:
+                abort(400)
         if not actors:
             abort(404)
-        data = [actor.format() for actor in actors]
-        total_actors = len(Actor.query.all())
-        return jsonify({
+        data = Actor.format_rows(actors, fields)
+        total_actors = count_rows(Actor, strategy, criteria)
+        response = {
                 'success': True,
                 'actors': data,
                 'total-actors': total_actors
-            }), 200
+            }
+        if cursor is not None:
+            response['next_cursor'] = next_cursor
+        return with_validators(jsonify(response), etag, weak=True,
+                               last_modified=last_modified), 200
     except Exception as error:
         raise error
 
 
 '''
 Retrieves a single actor by their ID.
+With SINGLE_FLIGHT on, identical requests in flight share one response.
 '''
 @app.route('/api/v1/actors/<int:id>', methods=['GET'])
 @requires_auth(permission='get:actors')
+@coalesced(Actor)
 def retrieve_actor(id):
     try:
         actor = Actor.query.get(id)
         if not actor:
             abort(404)
-        return jsonify({
+        etag = resource_etag(actor)
+        if is_fresh(etag):
+            return not_modified(etag)
+        response = jsonify({
                 'success': True,
                 'actor': actor.format()
-            }), 200
+            })
+        return with_validators(response, etag), 200
     except Exception as error:
         raise error
 
@@ -79,24 +171,36 @@ def add_actor():
 
 '''
 Edits an actor's details.
+Only the columns of the actor may be set. The row is updated with a
+single statement, without loading it first. With an If-Match header
+carrying the ETag of a GET, the update only applies if the actor has
+not changed since, and fails with 412 otherwise.
 '''
 @app.route('/api/v1/actors/<int:id>', methods=['PATCH'])
 @requires_auth(permission='patch:actors')
 def edit_actor(id):
     try:
-        actor = Actor.query.get(id)
-        if not actor:
-            abort(422)
-        data = json.loads(request.data)
-        for key, value in data.items():
-            setattr(actor, key, value)
-        actor.update()
-        return jsonify({
-                'success': True,
-                'actor': actor.format()
-            }), 200
-    except Exception as error:
-        raise error
+        version = if_match_version(Actor, id)
+    except ValueError:
+        abort(412)
+    try:
+        values = validate_data(Actor, json.loads(request.data),
+                               partial=True)
+    except ValueError:
+        abort(400)
+    except ValidationError:
+        abort(422)
+    try:
+        actor = Actor.update_by_id(id, values, version)
+    except StaleVersion:
+        abort(412)
+    if actor is None:
+        abort(422)
+    response = jsonify({
+            'success': True,
+            'actor': Actor.format_row(actor)
+        })
+    return with_validators(response, resource_etag(actor, Actor)), 200
 
 
 '''
@@ -118,44 +222,171 @@ def delete_actor(id):
         raise error
 
 
+'''
+Streams every actor as NDJSON (default) or CSV (`format=csv`).
+'''
+@app.route('/api/v1/actors/export', methods=['GET'])
+@requires_auth(permission='get:actors')
+def export_actors():
+    try:
+        return export_response(Actor, request.args.get('format', 'ndjson'))
+    except ValueError:
+        abort(400)
+
+
+'''
+Applies a batch of create, update and delete operations to actors.
+Takes a JSON array (or NDJSON) of {"op", "id", "data"} objects and
+answers with one result per operation. Each kind of operation needs
+its usual post:/patch:/delete: permission.
+'''
+@app.route('/api/v1/actors/bulk', methods=['POST'])
+@requires_auth()
+def bulk_actors():
+    try:
+        operations = parse_operations(request)
+    except ValueError:
+        abort(400)
+    required = Permissions(all_of=required_permissions(Actor, operations))
+    if required:
+        check_permissions(required, get_current_payload(),
+                          get_current_permissions())
+    chunk_size = request.args.get('chunk_size', BULK_CHUNK_SIZE, type=int)
+    if chunk_size < 1:
+        abort(400)
+    try:
+        results = apply_operations(Actor, operations, chunk_size)
+        return jsonify({
+            'success': True,
+            'results': results
+        }), 200
+    except exc.SQLAlchemyError:
+        abort(422)
+
+
 '''
 Retrieves a paginated list of movies.
+The total is computed with the `count` strategy
+(exact, cached or approximate), defaulting to COUNT_STRATEGY.
+Filters: `released_after`, `released_before` and `title_prefix`.
+`sort` orders by id, created_at, title or release_date, descending with
+a '-' prefix, and `fields` selects a comma separated subset of the fields.
+Passing `cursor` (empty for the first page) switches from page/limit
+to keyset pagination ordered by `sort`; the response then carries the
+`next_cursor` to request.
+`include=cast` embeds the cast of each movie, loaded in one extra query
+for the whole page.
+`ids` (comma separated, at most BATCH_MAX_IDS) instead returns those
+movies in the requested order, loaded in a single query, with the ids
+that do not exist listed in `missing`.
+Responses are kept in the response cache until movies, actors or
+castings change.
+With SINGLE_FLIGHT on, identical requests in flight share one response.
 '''
 @app.route('/api/v1/movies', methods=['GET'])
 @requires_auth(permission='get:movies')
+@coalesced(Movie, Actor, Casting)
+@cached_response(Movie, Actor, Casting)
 def retrieve_movies():
     page = request.args.get('page', 1, type=int)
     limit = request.args.get('limit', PER_PAGE, type=int)
     offset = (page - 1) * limit
+    cursor = request.args.get('cursor')
+    sort = request.args.get('sort', 'id')
+    include = request.args.get('include')
+    strategy = request.args.get('count', COUNT_STRATEGY)
+    if strategy not in COUNT_STRATEGIES or include not in (None, 'cast'):
+        abort(400)
+    ids = request.args.get('ids')
     try:
-        movies = Movie.query.offset(offset).limit(limit).all()
+        sort_columns(Movie, sort)
+        criteria = list_criteria(Movie, request.args)
+        fields = parse_fields(Movie, request.args.get('fields'))
+        if ids is not None:
+            ids = parse_ids(ids)
+    except ValueError:
+        abort(400)
+    try:
+        query = Movie.query.filter(*criteria)
+        if include == 'cast':
+            etag, last_modified = list_validators(Movie, Actor, Casting)
+            query = query.options(
+                selectinload(Movie.castings).joinedload(Casting.actor))
+            if fields:
+                query = query.options(load_fields(Movie, fields, sort))
+        else:
+            etag, last_modified = list_validators(Movie)
+            query = row_query(query, Movie, fields, sort)
+        if is_fresh(etag, last_modified):
+            return not_modified(etag, weak=True, last_modified=last_modified)
+        if ids is not None:
+            query = Movie.query
+            if include == 'cast':
+                query = query.options(
+                    selectinload(Movie.castings).joinedload(Casting.actor))
+            if fields:
+                query = query.options(load_fields(Movie, fields))
+            movies, missing = fetch_by_ids(Movie, ids, query)
+            if include == 'cast':
+                data = [movie.format_with_cast(fields) for movie in movies]
+            else:
+                data = [movie.format(fields) for movie in movies]
+            response = jsonify({
+                'success': True,
+                'movies': data,
+                'missing': missing
+            })
+            return with_validators(response, etag, weak=True,
+                                   last_modified=last_modified), 200
+        if cursor is None:
+            movies = order_by_sort(query, Movie, sort) \
+                .offset(offset).limit(limit).all()
+        else:
+            try:
+                movies, next_cursor = keyset_page(Movie, sort, cursor, limit,
+                                                  query=query)
+            except ValueError:
+                abort(400)
         if not movies:
             abort(404)
-        data = [movie.format() for movie in movies]
-        total_movies = len(Movie.query.all())
-        return jsonify({
+        if include == 'cast':
+            data = [movie.format_with_cast(fields) for movie in movies]
+        else:
+            data = [Movie.format_row(movie, fields) for movie in movies]
+        total_movies = count_rows(Movie, strategy, criteria)
+        response = {
                 'success': True,
                 'movies': data,
                 'total-movies': total_movies
-            }), 200
+            }
+        if cursor is not None:
+            response['next_cursor'] = next_cursor
+        return with_validators(jsonify(response), etag, weak=True,
+                               last_modified=last_modified), 200
     except Exception as error:
         raise error
 
 
 '''
 Retrieves a single movie.
+With SINGLE_FLIGHT on, identical requests in flight share one response.
 '''
 @app.route('/api/v1/movies/<int:id>', methods=['GET'])
 @requires_auth(permission='get:movies')
+@coalesced(Movie)
 def retrieve_movie(id):
     try:
         movie = Movie.query.get(id)
         if not movie:
             abort(404)
-        return jsonify({
+        etag = resource_etag(movie)
+        if is_fresh(etag):
+            return not_modified(etag)
+        response = jsonify({
                 'success': True,
                 'movie': movie.format()
-            }), 200
+            })
+        return with_validators(response, etag), 200
     except Exception as error:
         raise error
 
@@ -180,24 +411,36 @@ def add_movie():
 
 '''
 Edits a movie.
+Only the columns of the movie may be set. The row is updated with a
+single statement, without loading it first. With an If-Match header
+carrying the ETag of a GET, the update only applies if the movie has
+not changed since, and fails with 412 otherwise.
 '''
 @app.route('/api/v1/movies/<int:id>', methods=['PATCH'])
 @requires_auth(permission='patch:movies')
 def edit_movie(id):
     try:
-        movie = Movie.query.get(id)
-        if not movie:
-            abort(422)
-        data = json.loads(request.data)
-        for key, value in data.items():
-            setattr(movie, key, value)
-        movie.update()
-        return jsonify({
+        version = if_match_version(Movie, id)
+    except ValueError:
+        abort(412)
+    try:
+        values = validate_data(Movie, json.loads(request.data),
+                               partial=True)
+    except ValueError:
+        abort(400)
+    except ValidationError:
+        abort(422)
+    try:
+        movie = Movie.update_by_id(id, values, version)
+    except StaleVersion:
+        abort(412)
+    if movie is None:
+        abort(422)
+    response = jsonify({
             'success': True,
-            'movie': movie.format()
-        }), 200
-    except Exception as error:
-        raise error
+            'movie': Movie.format_row(movie)
+        })
+    return with_validators(response, resource_etag(movie, Movie)), 200
 
 
 '''
@@ -219,6 +462,243 @@ def delete_movie(id):
         raise error
 
 
+'''
+Streams every movie as NDJSON (default) or CSV (`format=csv`).
+'''
+@app.route('/api/v1/movies/export', methods=['GET'])
+@requires_auth(permission='get:movies')
+def export_movies():
+    try:
+        return export_response(Movie, request.args.get('format', 'ndjson'))
+    except ValueError:
+        abort(400)
+
+
+'''
+Applies a batch of create, update and delete operations to movies.
+Takes a JSON array (or NDJSON) of {"op", "id", "data"} objects and
+answers with one result per operation. Each kind of operation needs
+its usual post:/patch:/delete: permission.
+'''
+@app.route('/api/v1/movies/bulk', methods=['POST'])
+@requires_auth()
+def bulk_movies():
+    try:
+        operations = parse_operations(request)
+    except ValueError:
+        abort(400)
+    required = Permissions(all_of=required_permissions(Movie, operations))
+    if required:
+        check_permissions(required, get_current_payload(),
+                          get_current_permissions())
+    chunk_size = request.args.get('chunk_size', BULK_CHUNK_SIZE, type=int)
+    if chunk_size < 1:
+        abort(400)
+    try:
+        results = apply_operations(Movie, operations, chunk_size)
+        return jsonify({
+            'success': True,
+            'results': results
+        }), 200
+    except exc.SQLAlchemyError:
+        abort(422)
+
+
+'''
+Retrieves the cast of a movie in billing order.
+'''
+@app.route('/api/v1/movies/<int:id>/cast', methods=['GET'])
+@requires_auth(permission='get:movies')
+def retrieve_cast(id):
+    try:
+        if not Movie.query.get(id):
+            abort(404)
+        castings = Casting.query.options(joinedload(Casting.actor)) \
+            .filter(Casting.movie_id == id) \
+            .order_by(Casting.billing_order, Casting.id).all()
+        return jsonify({
+            'success': True,
+            'movie_id': id,
+            'cast': [casting.format_for_movie() for casting in castings]
+        }), 200
+    except Exception as error:
+        raise error
+
+
+'''
+Casts an actor in a movie.
+Takes {"actor_id", "role", "billing_order"}.
+'''
+@app.route('/api/v1/movies/<int:id>/cast', methods=['POST'])
+@requires_auth(permission='patch:movies')
+def add_casting(id):
+    try:
+        data = json.loads(request.data)
+        if 'role' not in data or not Movie.query.get(id) or \
+                not Actor.query.get(data.get('actor_id')):
+            abort(422)
+        casting = Casting(movie_id=id, actor_id=data['actor_id'],
+                          role=data['role'],
+                          billing_order=data.get('billing_order', 0))
+        try:
+            casting.insert()
+        except exc.IntegrityError:
+            db.session.rollback()
+            abort(422)
+        return jsonify({
+            'success': True,
+            'casting': casting.format_for_movie()
+        }), 201
+    except Exception as error:
+        raise error
+
+
+'''
+Removes an actor's role from a movie.
+'''
+@app.route('/api/v1/movies/<int:id>/cast/<int:casting_id>',
+           methods=['DELETE'])
+@requires_auth(permission='patch:movies')
+def delete_casting(id, casting_id):
+    try:
+        casting = Casting.query.get(casting_id)
+        if not casting or casting.movie_id != id:
+            abort(422)
+        casting.delete()
+        return jsonify({
+            'success': True,
+            'deleted': casting_id
+        }), 200
+    except Exception as error:
+        raise error
+
+
+'''
+Retrieves the movies an actor is cast in, by release date.
+'''
+@app.route('/api/v1/actors/<int:id>/movies', methods=['GET'])
+@requires_auth(permission='get:actors')
+def retrieve_filmography(id):
+    try:
+        if not Actor.query.get(id):
+            abort(404)
+        castings = Casting.query.join(Casting.movie) \
+            .options(contains_eager(Casting.movie)) \
+            .filter(Casting.actor_id == id) \
+            .order_by(Movie.release_date, Casting.id).all()
+        return jsonify({
+            'success': True,
+            'actor_id': id,
+            'movies': [casting.format_for_actor() for casting in castings]
+        }), 200
+    except Exception as error:
+        raise error
+
+
+'''
+Searches actor names and movie titles.
+Every word of `q` matches the start of a word, so partial names work.
+Results are ranked best first and paged with `page` and `limit`;
+`type=actor` or `type=movie` restricts the search to one kind, and
+kinds the token has no get: permission for are left out.
+'''
+@app.route('/api/v1/search', methods=['GET'])
+@requires_auth()
+def search_catalog():
+    page = request.args.get('page', 1, type=int)
+    limit = request.args.get('limit', PER_PAGE, type=int)
+    kind = request.args.get('type')
+    if page < 1 or not 0 < limit <= SEARCH_MAX_LIMIT or \
+            kind not in (None,) + tuple(SEARCHABLE):
+        abort(400)
+    permissions = get_current_permissions() or frozenset()
+    types = [name for name, (model, column) in SEARCHABLE.items()
+             if f'get:{model.__tablename__}' in permissions and
+             kind in (None, name)]
+    if not types:
+        raise AuthError({
+            'code': 'forbidden',
+            'description': 'Permission not found'
+        }, 403)
+    try:
+        rows = search(request.args.get('q'), types,
+                      offset=(page - 1) * limit, limit=limit + 1)
+    except ValueError:
+        abort(400)
+    results = [{
+        'type': name,
+        'id': id,
+        SEARCHABLE[name][1]: value,
+        'score': score
+    } for name, id, value, score in rows[:limit]]
+    return jsonify({
+        'success': True,
+        'results': results,
+        'next_page': page + 1 if len(rows) > limit else None
+    }), 200
+
+
+'''
+Reports database connection pool usage of this worker.
+Only served when INTERNAL_ENDPOINTS is enabled.
+'''
+@app.route('/internal/pool', methods=['GET'])
+def retrieve_pool_status():
+    if not INTERNAL_ENDPOINTS:
+        abort(404)
+    return jsonify({
+        'success': True,
+        'pool': pool_status(db.engine)
+    }), 200
+
+
+'''
+Reports response cache hit ratio and latency, and how many requests
+shared the response of an identical one in flight, in this worker.
+Only served when INTERNAL_ENDPOINTS is enabled.
+'''
+@app.route('/internal/cache', methods=['GET'])
+def retrieve_cache_status():
+    if not INTERNAL_ENDPOINTS:
+        abort(404)
+    return jsonify({
+        'success': True,
+        'cache': response_cache.stats(),
+        'single_flight': single_flight.stats()
+    }), 200
+
+
+'''
+Reports SQL statement counts and database time per endpoint of this
+worker, the endpoints spending the most database time first.
+Only served when INTERNAL_ENDPOINTS is enabled, and only counts
+requests made while SQL_INSTRUMENTATION is on.
+'''
+@app.route('/internal/queries', methods=['GET'])
+def retrieve_query_stats():
+    if not INTERNAL_ENDPOINTS:
+        abort(404)
+    return jsonify({
+        'success': True,
+        'enabled': query_stats.enabled,
+        'endpoints': query_stats.report()
+    }), 200
+
+
+'''
+Exposes request latency, authentication, database time and connection
+pool metrics in the Prometheus text format, summed over the workers
+sharing METRICS_DIR.
+Only served when METRICS_ENABLED is set.
+'''
+@app.route('/metrics', methods=['GET'])
+def retrieve_metrics():
+    if not metrics.enabled:
+        abort(404)
+    return app.response_class(metrics.render(),
+                              content_type=METRICS_CONTENT_TYPE)
+
+
 '''
 Error handling for resource not found.
 '''
@@ -255,6 +735,18 @@ def unprocessable(error):
     }), 422
 
 
+'''
+Error handling for failed preconditions (If-Match).
+'''
+@app.errorhandler(412)
+def precondition_failed(error):
+    return jsonify({
+        'success': False,
+        'error': 412,
+        'message': 'resource was modified'
+    }), 412
+
+
 '''
 Error handling for method not allowed.
 '''
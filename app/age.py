@@ -0,0 +1,83 @@
+import os
+from datetime import date, datetime
+
+from flask import g, has_request_context
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - optional speedup
+    numpy = None
+
+# Pages at least this long have their ages computed with NumPy
+AGE_NUMPY_THRESHOLD = int(os.getenv('AGE_NUMPY_THRESHOLD', 500))
+
+UNIX_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def today():
+    """Returns the current date, computed once per request.
+
+    Every age of a response, and its ETag, then agree even when the
+    request straddles midnight.
+    """
+    if not has_request_context():
+        return datetime.now().date()
+    if 'today' not in g:
+        g.today = datetime.now().date()
+    return g.today
+
+
+def age_on(dob, day):
+    """Completed years between dob and day.
+
+    Whoever was born on February 29 gets one year older on March 1 in
+    common years.
+    """
+    return day.year - dob.year - ((day.month, day.day) < (dob.month, dob.day))
+
+
+def years_before(day, years):
+    """Returns the same calendar day `years` earlier (Feb 29 -> Feb 28).
+
+    age_on(dob, day) >= years exactly when dob <= years_before(day, years).
+    """
+    try:
+        return day.replace(year=day.year - years)
+    except ValueError:
+        return day.replace(year=day.year - years, day=28)
+
+
+def dob_range(min_age=None, max_age=None, day=None):
+    """Translates an age range into (earliest, latest) dates of birth.
+
+    earliest is exclusive and latest inclusive; either is None when the
+    matching bound is.
+    """
+    day = day or today()
+    latest = years_before(day, min_age) if min_age is not None else None
+    earliest = years_before(day, max_age + 1) if max_age is not None \
+        else None
+    return earliest, latest
+
+
+def ages(dobs, day=None):
+    """age_on() of every date of dobs, vectorized with NumPy for long pages.
+
+    Returns:
+        list: The ages, as ints, in the order of dobs.
+    """
+    day = day or today()
+    if numpy is None or len(dobs) < AGE_NUMPY_THRESHOLD:
+        month_day = (day.month, day.day)
+        return [day.year - dob.year - (month_day < (dob.month, dob.day))
+                for dob in dobs]
+    # Ordinals convert an order of magnitude faster than date objects
+    ordinals = numpy.fromiter((dob.toordinal() for dob in dobs),
+                              dtype=numpy.int64, count=len(dobs))
+    dates = (ordinals - UNIX_EPOCH_ORDINAL).astype('datetime64[D]')
+    months = dates.astype('datetime64[M]')
+    years = months.astype('datetime64[Y]').astype(int) + 1970
+    month_days = (months.astype(int) % 12 + 1) * 100 + \
+        (dates - months).astype(int) + 1
+    not_yet = month_days > day.month * 100 + day.day
+    return (day.year - years - not_yet).tolist()
@@ -0,0 +1,315 @@
+'''
+ASGI entry point, e.g. `uvicorn app.asgi:application` or
+`gunicorn -k uvicorn.workers.UvicornWorker app.asgi:application`.
+
+Flask 1.0 has no async views, so this is a thin native ASGI layer in
+front of the Flask app:
+
+- GET /api/v1/actors/<id> and GET /api/v1/movies/<id> are answered by
+  coroutines: the token is verified without blocking the event loop
+  (auth.verify_decode_jwt_async) and the row is read with asyncpg on
+  PostgreSQL, or through a thread pool on other databases.
+- Every other request runs the Flask app in a bounded thread pool.
+
+Idle keep-alive connections then cost a coroutine rather than a worker
+thread or process. The async handlers read from the primary database,
+bypassing replica routing and the response cache.
+'''
+import os
+import re
+import sys
+import asyncio
+from io import BytesIO
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import text
+from werkzeug.http import parse_etags
+
+from app import app
+from app.models import db, Actor, Movie
+from app.pool import pool_settings
+from app.http_cache import resource_etag, CACHE_CONTROL
+from app.serialization import dumps
+from auth.auth import authenticate_async, AuthError
+from auth.permissions import Permissions
+
+try:
+    import asyncpg
+except ImportError:  # pragma: no cover - optional driver
+    asyncpg = None
+
+# auto uses asyncpg on PostgreSQL when installed, threads everywhere else
+ASYNC_DB_DRIVER = os.getenv('ASYNC_DB_DRIVER', 'auto')
+# Threads running Flask requests and blocking queries
+ASGI_THREADS = int(os.getenv('ASGI_THREADS', 16))
+
+# Async single-row reads: path pattern -> (model, response key, permission)
+ASYNC_ROUTES = [
+    (re.compile(r'^/api/v1/actors/(\d+)$'),
+     (Actor, 'actor', Permissions('get:actors'))),
+    (re.compile(r'^/api/v1/movies/(\d+)$'),
+     (Movie, 'movie', Permissions('get:movies'))),
+]
+
+
+def _named_to_numbered(statement, params):
+    '''Turns :name parameters into asyncpg's $1, $2...'''
+    names = []
+
+    def number(match):
+        names.append(match.group(1))
+        return f'${len(names)}'
+    statement = re.sub(r'(?<!:):(\w+)', number, statement)
+    return statement, [params[name] for name in names]
+
+
+class ThreadPoolDatabase:
+    '''Runs the queries of the async handlers on the SQLAlchemy engine,
+    in the thread pool so the event loop never waits on the database'''
+
+    def __init__(self, engine, executor):
+        self.engine = engine
+        self.executor = executor
+
+    async def connect(self):
+        pass
+
+    async def close(self):
+        pass
+
+    def _fetch_one(self, statement, types, params):
+        # Typed columns get dates back from drivers returning strings
+        statement = text(statement).columns(**types)
+        with self.engine.connect() as connection:
+            row = connection.execute(statement, params).first()
+            return dict(row) if row is not None else None
+
+    async def fetch_one(self, statement, types=None, **params):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, self._fetch_one, statement, types or {}, params)
+
+
+class AsyncpgDatabase:
+    '''Runs the queries of the async handlers on an asyncpg pool sized
+    like the SQLAlchemy one (DB_POOL_SIZE + DB_MAX_OVERFLOW)'''
+
+    def __init__(self, url, config):
+        self.connect_args = {
+            'host': url.host,
+            'port': url.port,
+            'user': url.username,
+            'password': url.password,
+            'database': url.database,
+        }
+        settings = pool_settings(config)
+        self.min_size = settings['DB_POOL_SIZE']
+        self.max_size = settings['DB_POOL_SIZE'] + settings['DB_MAX_OVERFLOW']
+        self.pool = None
+
+    async def connect(self):
+        self.pool = await asyncpg.create_pool(
+            min_size=self.min_size, max_size=self.max_size,
+            **self.connect_args)
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+
+    async def fetch_one(self, statement, types=None, **params):
+        statement, args = _named_to_numbered(statement, params)
+        row = await self.pool.fetchrow(statement, *args)
+        return dict(row) if row is not None else None
+
+
+def create_database(flask_app, executor, driver=ASYNC_DB_DRIVER):
+    with flask_app.app_context():
+        engine = db.engine
+    if driver == 'asyncpg' or (driver == 'auto' and asyncpg is not None and
+                               engine.dialect.name == 'postgresql'):
+        return AsyncpgDatabase(engine.url, flask_app.config)
+    return ThreadPoolDatabase(engine, executor)
+
+
+def json_response(status, body, headers=()):
+    data = dumps(body, sort_keys=True)
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    data += b'\n'
+    return status, data, [(b'content-type', b'application/json'),
+                          (b'content-length', str(len(data)).encode())] + \
+        list(headers)
+
+
+def error_response(status, message):
+    return json_response(status, {
+        'success': False,
+        'error': status,
+        'message': message
+    })
+
+
+class ASGIApplication:
+    '''ASGI application serving the async routes and the Flask app'''
+
+    def __init__(self, wsgi_app, threads=ASGI_THREADS, database=None):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=threads,
+                                           thread_name_prefix='asgi')
+        self.database = database
+        self.started = False
+        self._startup_lock = None
+
+    async def startup(self):
+        if self._startup_lock is None:
+            # Created in the loop serving the app, on its first request
+            self._startup_lock = asyncio.Lock()
+        # Concurrent first requests wait for a single connect()
+        async with self._startup_lock:
+            if self.database is None:
+                self.database = create_database(app, self.executor)
+            if not self.started:
+                await self.database.connect()
+                self.started = True
+
+    async def shutdown(self):
+        if self.started:
+            await self.database.close()
+            self.started = False
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            return
+        if not self.started:
+            await self.startup()
+        if scope['method'] == 'GET':
+            for pattern, route in ASYNC_ROUTES:
+                match = pattern.match(scope['path'])
+                if match:
+                    status, body, headers = await self.retrieve(
+                        scope, int(match.group(1)), *route)
+                    await send({'type': 'http.response.start',
+                                'status': status, 'headers': headers})
+                    await send({'type': 'http.response.body', 'body': body})
+                    return
+        await self.call_wsgi(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await self.startup()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def retrieve(self, scope, id, model, key, permission):
+        '''Async twin of retrieve_actor() and retrieve_movie()'''
+        headers = {name.decode('latin-1').lower(): value.decode('latin-1')
+                   for name, value in scope['headers']}
+        try:
+            await authenticate_async(headers.get('authorization'),
+                                     permission)
+        except AuthError as error:
+            return error_response(
+                error.status_code,
+                f"{error.error['code']}: {error.error['description']}")
+        names = ['version'] + list(model.FIELD_COLUMNS.values())
+        row = await self.database.fetch_one(
+            f"SELECT {', '.join(names)} FROM {model.__tablename__} "
+            'WHERE id = :id',
+            types={name: model.__table__.c[name].type for name in names},
+            id=id)
+        if row is None:
+            return error_response(404, 'resource not found')
+        row = SimpleNamespace(**row)
+        etag = resource_etag(row, model)
+        validators = [(b'etag', f'"{etag}"'.encode('latin-1')),
+                      (b'cache-control', CACHE_CONTROL.encode('latin-1'))]
+        if_none_match = headers.get('if-none-match')
+        if if_none_match and parse_etags(if_none_match).contains_weak(etag):
+            return 304, b'', validators
+        return json_response(200, {
+            'success': True,
+            key: model.format_row(row)
+        }, validators)
+
+    def environ(self, scope, body):
+        server = scope.get('server') or ('localhost', 80)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '')
+            .encode('utf-8').decode('latin-1'),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope['query_string'].decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.input': BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        for name, value in scope['headers']:
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                name = f'HTTP_{name}'
+            if name == 'CONTENT_LENGTH':
+                continue
+            if name in environ:
+                value = f'{environ[name]},{value}'
+            environ[name] = value
+        return environ
+
+    async def call_wsgi(self, scope, receive, send):
+        '''Runs the Flask app in the thread pool, streaming its output'''
+        body = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            body.append(message.get('body', b''))
+            more_body = message.get('more_body', False)
+        loop = asyncio.get_running_loop()
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [
+                (name.lower().encode('latin-1'), value.encode('latin-1'))
+                for name, value in headers]
+
+        iterable = await loop.run_in_executor(
+            self.executor, self.wsgi_app,
+            self.environ(scope, b''.join(body)), start_response)
+        try:
+            chunks = iter(iterable)
+            while True:
+                chunk = await loop.run_in_executor(
+                    self.executor, next, chunks, None)
+                if 'status' in started:
+                    await send({'type': 'http.response.start',
+                                'status': started.pop('status'),
+                                'headers': started.pop('headers')})
+                if chunk is None:
+                    break
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk,
+                                'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(iterable, 'close'):
+                await loop.run_in_executor(self.executor, iterable.close)
+
+
+application = ASGIApplication(app)
@@ -0,0 +1,56 @@
+import os
+
+from sqlalchemy.orm.util import identity_key
+
+from app.models import db
+
+# Largest number of ids accepted by one ?ids= request
+BATCH_MAX_IDS = int(os.getenv('BATCH_MAX_IDS', 100))
+
+
+def parse_ids(value, max_ids=BATCH_MAX_IDS):
+    """Parses a comma separated `ids` parameter.
+
+    Returns:
+        list: The ids in the requested order, without duplicates.
+    Raises ValueError for ids that are not positive integers, an empty
+    list or more than max_ids ids.
+    """
+    ids = []
+    seen = set()
+    for part in value.split(','):
+        part = part.strip()
+        if not part.isdigit() or int(part) < 1:
+            raise ValueError(f'invalid id {part!r}')
+        id = int(part)
+        if id not in seen:
+            seen.add(id)
+            ids.append(id)
+    if len(ids) > max_ids:
+        raise ValueError(f'more than {max_ids} ids')
+    return ids
+
+
+def fetch_by_ids(model, ids, query=None):
+    """Loads the rows of model with the given ids in a single IN query.
+
+    Rows already in the session's identity map are used as they are
+    rather than loaded again. `query` (model.query by default) may carry
+    loader options.
+
+    Returns:
+        tuple: The rows found, in the order of ids, and the ids of the
+        rows that do not exist.
+    """
+    found = {}
+    for id in ids:
+        row = db.session.identity_map.get(identity_key(model, id))
+        if row is not None:
+            found[id] = row
+    pending = [id for id in ids if id not in found]
+    if pending:
+        query = query if query is not None else model.query
+        for row in query.filter(model.id.in_(pending)):
+            found[row.id] = row
+    return ([found[id] for id in ids if id in found],
+            [id for id in ids if id not in found])
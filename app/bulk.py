@@ -0,0 +1,195 @@
+import os
+import json
+from datetime import datetime
+
+from sqlalchemy import bindparam
+
+from app.models import db, notify_table_change, TableVersion
+from app.validation import ValidationError, validate_data
+
+BULK_CHUNK_SIZE = int(os.getenv('BULK_CHUNK_SIZE', 500))
+BULK_MAX_OPERATIONS = int(os.getenv('BULK_MAX_OPERATIONS', 10000))
+
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson')
+
+# Bulk operation -> permission action, i.e. 'create' needs 'post:actors'
+OPERATION_PERMISSIONS = {
+    'create': 'post',
+    'update': 'patch',
+    'delete': 'delete',
+}
+
+
+class BulkError(ValidationError):
+    """Raised for an operation that cannot be applied"""
+
+
+def parse_operations(request):
+    """Reads bulk operations from a JSON array or an NDJSON body.
+
+    Raises ValueError when the body is not a list of operations.
+    """
+    body = request.get_data(as_text=True)
+    if request.mimetype in NDJSON_MIMETYPES:
+        operations = [json.loads(line)
+                      for line in body.splitlines() if line.strip()]
+    else:
+        operations = json.loads(body)
+    if not isinstance(operations, list) or not operations:
+        raise ValueError('expected a non-empty list of operations')
+    if len(operations) > BULK_MAX_OPERATIONS:
+        raise ValueError('too many operations')
+    return operations
+
+
+def required_permissions(model, operations):
+    """Returns the permissions needed to apply every operation"""
+    return sorted({
+        f'{OPERATION_PERMISSIONS[operation["op"]]}:{model.__tablename__}'
+        for operation in operations
+        if isinstance(operation, dict) and
+        operation.get('op') in OPERATION_PERMISSIONS
+    })
+
+
+def _validate_id(operation):
+    id = operation.get('id')
+    if not isinstance(id, int) or isinstance(id, bool):
+        raise BulkError('id must be an integer')
+    return id
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _existing_ids(model, ids):
+    rows = db.session.query(model.id).filter(model.id.in_(ids))
+    return {row.id for row in rows}
+
+
+def _update(model, rows):
+    """Updates rows (column values plus their `_id`) with one executemany
+    UPDATE per set of columns.
+
+    Versions are bumped in SQL: a version read in Python could be written
+    back by a concurrent PATCH too, giving one ETag to two bodies.
+    """
+    table = model.__table__
+    groups = {}
+    for row in rows:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+    for names, group in groups.items():
+        values = {name: bindparam(name) for name in names if name != '_id'}
+        values['version'] = table.c.version + 1
+        statement = table.update() \
+            .where(table.c.id == bindparam('_id')).values(values)
+        db.session.execute(statement, group)
+
+
+def _insert(model, rows):
+    """Inserts rows with one statement, returning their new ids in order"""
+    table = model.__table__
+    if db.engine.dialect.implicit_returning:
+        # Multi-row INSERT ... VALUES (...), (...) RETURNING id
+        result = db.session.execute(
+            table.insert().values(rows).returning(table.c.id))
+        return [row.id for row in result]
+    # Dialects without RETURNING (SQLite) get the ids back row by row
+    db.session.bulk_insert_mappings(model, rows, return_defaults=True)
+    return [row['id'] for row in rows]
+
+
+def apply_operations(model, operations, chunk_size=BULK_CHUNK_SIZE):
+    """Applies bulk operations to model's table in a single transaction.
+
+    Creates, updates and deletes are each batched into statements of at
+    most chunk_size rows and applied in that order. Invalid operations are
+    reported and skipped without affecting the others.
+
+    Returns:
+        list: One result dict per operation, in request order.
+    """
+    results = [None] * len(operations)
+    creates, updates, deletes = [], [], []
+    for index, operation in enumerate(operations):
+        try:
+            if not isinstance(operation, dict):
+                raise BulkError('operation must be an object')
+            op = operation.get('op')
+            if op == 'create':
+                creates.append((index, validate_data(
+                    model, operation.get('data'), partial=False)))
+            elif op == 'update':
+                updates.append((index, _validate_id(operation),
+                                validate_data(model, operation.get('data'),
+                                              partial=True)))
+            elif op == 'delete':
+                deletes.append((index, _validate_id(operation)))
+            else:
+                raise BulkError('op must be one of create, update, delete')
+        except ValidationError as error:
+            results[index] = {
+                'index': index,
+                'op': operation.get('op')
+                if isinstance(operation, dict) else None,
+                'status': error.status_code,
+                'error': error.message,
+            }
+
+    now = datetime.utcnow()
+    for chunk in _chunks(creates, chunk_size):
+        rows = [dict(data, created_at=now, updated_at=now, version=1)
+                for _, data in chunk]
+        for (index, _), id in zip(chunk, _insert(model, rows)):
+            results[index] = {
+                'index': index, 'op': 'create', 'status': 201, 'id': id}
+
+    for chunk in _chunks(updates, chunk_size):
+        existing = _existing_ids(model, [id for _, id, _ in chunk])
+        rows = []
+        for index, id, data in chunk:
+            if id in existing:
+                rows.append(dict(data, _id=id, updated_at=now))
+                results[index] = {
+                    'index': index, 'op': 'update', 'status': 200, 'id': id}
+            else:
+                results[index] = {
+                    'index': index, 'op': 'update', 'status': 404, 'id': id,
+                    'error': 'resource not found'}
+        _update(model, rows)
+
+    deleted = set()
+    for chunk in _chunks(deletes, chunk_size):
+        existing = _existing_ids(model, [id for _, id in chunk]) - deleted
+        ids = []
+        for index, id in chunk:
+            if id in existing and id not in ids:
+                ids.append(id)
+                results[index] = {
+                    'index': index, 'op': 'delete', 'status': 200, 'id': id}
+            else:
+                results[index] = {
+                    'index': index, 'op': 'delete', 'status': 404, 'id': id,
+                    'error': 'resource not found'}
+        if ids:
+            db.session.execute(
+                model.__table__.delete().where(model.id.in_(ids)))
+            deleted.update(ids)
+
+    changes = [action for action, applied in (('insert', creates),
+                                              ('update', updates),
+                                              ('delete', deletes))
+               if applied]
+    if changes:
+        TableVersion.bump(model)
+    try:
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    for action in changes:
+        notify_table_change(model, action)
+    return results
@@ -0,0 +1,82 @@
+import os
+import time
+import threading
+
+from sqlalchemy import func, text
+
+from app.models import db, on_table_change
+
+COUNT_STRATEGY = os.getenv('COUNT_STRATEGY', 'exact')
+COUNT_CACHE_TTL = int(os.getenv('COUNT_CACHE_TTL', 60))
+
+
+def exact_count(model, criteria=()):
+    """Counts rows matching criteria with a single SELECT COUNT(*)"""
+    return db.session.query(func.count(model.id)).filter(*criteria).scalar()
+
+
+def approximate_count(model):
+    """Reads the planner's row estimate, falling back to an exact count.
+
+    PostgreSQL keeps pg_class.reltuples up to date through VACUUM/ANALYZE,
+    so it is a constant time lookup regardless of table size. Other
+    databases, and tables that were never analyzed, get an exact count.
+    """
+    if db.engine.dialect.name == 'postgresql':
+        estimate = db.session.execute(
+            text('SELECT reltuples::bigint FROM pg_class '
+                 'WHERE oid = to_regclass(:table)'),
+            {'table': model.__tablename__}).scalar()
+        if estimate is not None and estimate > 0:
+            return estimate
+    return exact_count(model)
+
+
+class CachedCounter:
+    """Exact counts memoized per table.
+
+    Entries are dropped whenever BaseModel inserts or deletes a row in this
+    process, and expire after `ttl` seconds to pick up writes made by other
+    workers.
+    """
+
+    def __init__(self, ttl=COUNT_CACHE_TTL):
+        self.ttl = ttl
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, model):
+        entry = self._counts.get(model.__tablename__)
+        if entry is not None and time.monotonic() - entry[1] < self.ttl:
+            return entry[0]
+        count = exact_count(model)
+        with self._lock:
+            self._counts[model.__tablename__] = (count, time.monotonic())
+        return count
+
+    def invalidate(self, model, action='delete'):
+        if action not in ('insert', 'delete'):
+            return
+        with self._lock:
+            self._counts.pop(model.__tablename__, None)
+
+
+cached_count = CachedCounter()
+on_table_change(cached_count.invalidate)
+
+COUNT_STRATEGIES = {
+    'exact': exact_count,
+    'cached': cached_count,
+    'approximate': approximate_count,
+}
+
+
+def count_rows(model, strategy=None, criteria=()):
+    """Counts the rows of model using one of COUNT_STRATEGIES.
+
+    Filtered counts (non-empty criteria) are always exact, since neither
+    the cache nor the planner estimate can answer them.
+    """
+    if criteria:
+        return exact_count(model, criteria)
+    return COUNT_STRATEGIES[strategy or COUNT_STRATEGY](model)
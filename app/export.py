@@ -0,0 +1,59 @@
+import os
+import csv
+import json
+from io import StringIO
+
+from flask import Response, stream_with_context
+
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+
+EXPORT_MIMETYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def stream_rows(model):
+    """Iterates over every row of model in primary key order.
+
+    Rows are fetched EXPORT_BATCH_SIZE at a time through a server-side
+    cursor where the driver supports one (psycopg2), so memory use does
+    not grow with the size of the table.
+    """
+    return model.query.order_by(model.id) \
+        .execution_options(stream_results=True) \
+        .yield_per(EXPORT_BATCH_SIZE)
+
+
+def ndjson_lines(model):
+    for row in stream_rows(model):
+        yield json.dumps(row.format()) + '\n'
+
+
+def csv_lines(model):
+    buffer = StringIO()
+    writer = None
+    for row in stream_rows(model):
+        data = row.format()
+        if writer is None:
+            writer = csv.DictWriter(buffer, fieldnames=list(data))
+            writer.writeheader()
+        writer.writerow(data)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def export_response(model, format):
+    """Streams every row of model as NDJSON or CSV.
+
+    Raises ValueError for an unsupported format.
+    """
+    if format not in EXPORT_MIMETYPES:
+        raise ValueError(f'unsupported export format {format!r}')
+    lines = ndjson_lines(model) if format == 'ndjson' else csv_lines(model)
+    filename = f'{model.__tablename__}.{format}'
+    return Response(
+        stream_with_context(lines),
+        mimetype=EXPORT_MIMETYPES[format],
+        headers={'Content-Disposition': f'attachment; filename={filename}'})
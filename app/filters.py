@@ -0,0 +1,127 @@
+from datetime import date
+
+from sqlalchemy.orm import load_only
+
+from app.age import dob_range
+from app.models import Actor, Movie, bytewise_lower
+from app.pagination import sort_columns
+
+
+def _int_arg(args, name):
+    value = args.get(name)
+    if value is None:
+        return None
+    try:
+        value = int(value)
+    except ValueError:
+        raise ValueError(f'{name} must be an integer')
+    if value < 0:
+        raise ValueError(f'{name} must not be negative')
+    return value
+
+
+def _date_arg(args, name):
+    value = args.get(name)
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'{name} must be a YYYY-MM-DD date')
+
+
+def prefix_criteria(column, prefix):
+    """Case-insensitive `column starts with prefix`.
+
+    Written as a range on bytewise_lower(column) so it is answered from
+    the ix_*_lower_* expression indexes on every database; the LIKE only
+    rechecks the rows in the range and drops nothing the index missed.
+    Both compare byte by byte, as the range is only exact under a
+    bytewise collation.
+    """
+    prefix = prefix.lower()
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    escaped = prefix.replace('\\', '\\\\').replace('%', '\\%') \
+        .replace('_', '\\_')
+    lowered = bytewise_lower(column)
+    return [lowered >= prefix, lowered < upper,
+            lowered.like(escaped + '%', escape='\\')]
+
+
+def actor_criteria(args, today=None):
+    """Translates gender, min_age, max_age and name_prefix to criteria.
+
+    Ages become ranges on dob, so they can use ix_actors_dob_id (or
+    ix_actors_gender_dob together with gender) instead of computing the
+    age of every row.
+    """
+    criteria = []
+    gender = args.get('gender')
+    if gender:
+        criteria.append(Actor.gender == gender)
+    earliest, latest = dob_range(_int_arg(args, 'min_age'),
+                                 _int_arg(args, 'max_age'), today)
+    if latest is not None:
+        criteria.append(Actor.dob <= latest)
+    if earliest is not None:
+        criteria.append(Actor.dob > earliest)
+    name_prefix = args.get('name_prefix')
+    if name_prefix:
+        criteria.extend(prefix_criteria(Actor.name, name_prefix))
+    return criteria
+
+
+def movie_criteria(args, today=None):
+    """Translates released_after, released_before and title_prefix"""
+    criteria = []
+    released_after = _date_arg(args, 'released_after')
+    if released_after is not None:
+        criteria.append(Movie.release_date > released_after)
+    released_before = _date_arg(args, 'released_before')
+    if released_before is not None:
+        criteria.append(Movie.release_date < released_before)
+    title_prefix = args.get('title_prefix')
+    if title_prefix:
+        criteria.extend(prefix_criteria(Movie.title, title_prefix))
+    return criteria
+
+
+LIST_FILTERS = {
+    Actor: actor_criteria,
+    Movie: movie_criteria,
+}
+
+
+def list_criteria(model, args):
+    """Returns the filter criteria requested by the query args of a listing.
+
+    Raises ValueError for malformed filter values.
+    """
+    return LIST_FILTERS[model](args)
+
+
+def parse_fields(model, value):
+    """Parses a comma separated `fields` parameter.
+
+    Returns:
+        list: The requested fields of model.format(), or None for all.
+    Raises ValueError for unknown fields.
+    """
+    if not value:
+        return None
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in model.FIELD_COLUMNS]
+    if unknown or not fields:
+        raise ValueError(f'unknown fields {unknown!r}')
+    return fields
+
+
+def load_fields(model, fields, sort='id'):
+    """Loader option fetching only the columns behind fields.
+
+    The sort columns are loaded too, as keyset cursors are built from them.
+    """
+    columns, _ = sort_columns(model, sort)
+    names = {model.FIELD_COLUMNS[field] for field in fields}
+    names.update(column.name for column in columns)
+    return load_only(*names)
@@ -0,0 +1,104 @@
+import os
+import hashlib
+from datetime import datetime, time
+
+from flask import request, current_app
+
+from app.models import TableVersion
+
+# Responses depend on the bearer token, so shared caches must revalidate
+CACHE_CONTROL = os.getenv('CACHE_CONTROL', 'private, no-cache')
+
+
+def resource_etag(row, model=None):
+    """Returns the strong ETag of a single row.
+
+    Derived from the row version bumped by BaseModel.update, plus the date
+    for models whose representation changes with the calendar. `model`
+    is needed when row is a plain row tuple rather than a model instance.
+    """
+    model = model or type(row)
+    etag = f'{model.__tablename__}-{row.id}-v{row.version}'
+    derived_from = model.derived_from_date()
+    if derived_from is not None:
+        etag += f'-{derived_from.isoformat()}'
+    return etag
+
+
+def list_validators(model, *related):
+    """Returns the weak ETag and Last-Modified of a listing of model.
+
+    Both come from the table-level versions of model and of the related
+    models embedded in the listing, so one primary key lookup per table
+    on table_versions decides whether the listing could have changed.
+
+    Last-Modified has a one second resolution: while the second of the
+    last change is not over, another write could land in it under the
+    same value, so Last-Modified is None until then and clients
+    revalidate with the ETag.
+    """
+    args = '&'.join(f'{key}={value}'
+                    for key, value in sorted(request.args.items(multi=True)))
+    digest = hashlib.sha1(args.encode('utf-8')).hexdigest()[:16]
+    versions = []
+    last_modified = None
+    derived_from = None
+    for table in (model,) + related:
+        version, updated_at = TableVersion.current(table)
+        versions.append(f'{table.__tablename__}-v{version}')
+        last_modified = updated_at if last_modified is None \
+            else max(last_modified, updated_at)
+        derived_from = derived_from or table.derived_from_date()
+    etag = f'{"-".join(versions)}-{digest}'
+    if derived_from is not None:
+        etag += f'-{derived_from.isoformat()}'
+        last_modified = max(last_modified,
+                            datetime.combine(derived_from, time.min))
+    last_modified = last_modified.replace(microsecond=0)
+    if last_modified >= datetime.utcnow().replace(microsecond=0):
+        return etag, None
+    return etag, last_modified
+
+
+def if_match_version(model, id):
+    """Returns the version of row `id` that the If-Match header requires.
+
+    Returns:
+        int: The version, or None without If-Match (or with If-Match: *).
+    Raises ValueError when no strong ETag of If-Match is one of the row's
+    resource_etag(), which can then never match.
+    """
+    if not request.if_match or request.if_match.star_tag:
+        return None
+    prefix = f'{model.__tablename__}-{id}-v'
+    for etag in request.if_match.as_set():
+        if etag.startswith(prefix):
+            # The date suffix of calendar dependent models is ignored
+            version = etag[len(prefix):].split('-', 1)[0]
+            if version.isdigit():
+                return int(version)
+    raise ValueError('If-Match names no version of this row')
+
+
+def is_fresh(etag, last_modified=None):
+    """Tells whether the client's cached copy is still current"""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if last_modified is not None and request.if_modified_since:
+        return last_modified <= request.if_modified_since.replace(tzinfo=None)
+    return False
+
+
+def with_validators(response, etag, weak=False, last_modified=None):
+    """Adds ETag, Last-Modified and Cache-Control headers to response"""
+    response.set_etag(etag, weak=weak)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    return response
+
+
+def not_modified(etag, weak=False, last_modified=None):
+    """Builds a bodyless 304 response carrying the validators"""
+    response = current_app.response_class(status=304)
+    return with_validators(response, etag, weak, last_modified)
@@ -0,0 +1,321 @@
+import os
+import json
+import time
+import uuid
+import fcntl
+import threading
+from bisect import bisect_left
+
+from flask import g, request
+
+from app.models import db
+from app.pool import pool_status
+from app.query_stats import query_stats
+from auth.auth import on_authentication
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'false').lower() in \
+    ('1', 'true', 'yes')
+# Directory shared by the workers of a multi-process server (gunicorn);
+# unset, /metrics only reports the worker answering it
+METRICS_DIR = os.getenv('METRICS_DIR')
+# Seconds between writes of a worker's metrics to METRICS_DIR
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 1))
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+SECONDS = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+STATEMENTS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# name -> (help, label names, buckets)
+HISTOGRAMS = {
+    'http_request_duration_seconds': (
+        'Request latency by route, method and status',
+        ('route', 'method', 'status'), SECONDS),
+    'http_request_db_seconds': (
+        'Time spent in SQL statements per request',
+        ('route', 'method'), SECONDS),
+    'http_request_db_statements': (
+        'SQL statements per request',
+        ('route', 'method'), STATEMENTS),
+    'http_response_encode_seconds': (
+        'Time spent encoding JSON responses per request',
+        ('route', 'method'), SECONDS),
+    'auth_duration_seconds': (
+        'Token authentication latency by outcome (ok or the AuthError '
+        'code) and verified token cache result',
+        ('outcome', 'cache'), SECONDS),
+}
+
+# name -> (help, pool_status() key); reported per worker process
+GAUGES = {
+    'db_pool_checked_out': (
+        'Connections in use', 'checked_out'),
+    'db_pool_size': (
+        'Persistent connections of the pool', 'size'),
+    'db_pool_overflow': (
+        'Connections opened beyond the pool size', 'overflow'),
+    'db_pool_max_overflow': (
+        'Connections allowed beyond the pool size', 'max_overflow'),
+}
+
+# name -> (help, pool_status() key); running totals of each worker process
+COUNTERS = {
+    'db_pool_wait_seconds_total': (
+        'Time spent waiting for a connection', 'wait_time_total'),
+    'db_pool_timeouts_total': (
+        'Checkouts that timed out waiting for a connection', 'timeouts'),
+}
+
+ARCHIVE = 'archive.json'
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def merge_histograms(into, histograms):
+    """Adds the [name, labels, counts, sum] rows of histograms to the
+    {(name, labels): [counts, sum]} mapping into"""
+    for name, labels, counts, total in histograms:
+        value = into.setdefault((name, tuple(labels)),
+                                [[0] * len(counts), 0.0])
+        value[0] = [a + b for a, b in zip(value[0], counts)]
+        value[1] += total
+    return into
+
+
+def _histogram_rows(values):
+    return [[name, list(labels), list(counts), total]
+            for (name, labels), (counts, total) in values.items()]
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"') \
+        .replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    return '{' + ','.join(f'{name}="{_escape(value)}"'
+                          for name, value in pairs) + '}'
+
+
+class Metrics:
+    """Histograms of request, authentication and database timings.
+
+    Each worker records into its own memory. With METRICS_DIR set, it
+    also writes them to a file of its own at most every flush_interval
+    seconds, and /metrics sums the files of every worker, so whichever
+    worker answers a scrape reports the whole server. Files of dead
+    workers are folded into an archive so counts never go backwards; a
+    worker exiting cleanly flushes first (gunicorn's worker_exit hook),
+    so its last observations are not lost.
+
+    Disabled, the request hooks return after a single attribute check.
+    """
+
+    def __init__(self, directory=METRICS_DIR,
+                 flush_interval=METRICS_FLUSH_INTERVAL):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._values = {}
+        self._pid = os.getpid()
+        self._path = None
+        if self.directory:
+            self._path = os.path.join(
+                self.directory, f'{self._pid}-{uuid.uuid4().hex}.json')
+        self._flushed_at = 0.0
+
+    def init_app(self, app, enabled=METRICS_ENABLED):
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        on_authentication(self.observe_authentication)
+        if enabled:
+            self.enable()
+
+    def enable(self):
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+        # Database time per request comes from the statement hooks,
+        # without turning on their Server-Timing header and slow log
+        query_stats.enable(collect_only=True)
+        self.enabled = True
+
+    def disable(self):
+        query_stats.disable(collect_only=True)
+        self.enabled = False
+
+    def _check_fork(self):
+        if os.getpid() != self._pid:
+            # Forked: start from scratch, in a file of our own
+            self._reset()
+
+    def observe(self, name, labels, value):
+        buckets = HISTOGRAMS[name][2]
+        index = bisect_left(buckets, value)
+        with self._lock:
+            self._check_fork()
+            entry = self._values.get((name, labels))
+            if entry is None:
+                entry = self._values[name, labels] = \
+                    [[0] * (len(buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def observe_authentication(self, outcome, cache, seconds):
+        if self.enabled:
+            self.observe('auth_duration_seconds', (outcome, cache), seconds)
+
+    def _start_request(self):
+        if not self.enabled:
+            return
+        g.metrics_started = time.perf_counter()
+        g.encode_seconds = 0.0
+
+    def _finish_request(self, response):
+        if 'metrics_started' not in g:
+            return response
+        rule = request.url_rule
+        route = rule.rule if rule is not None else '<unmatched>'
+        method = request.method
+        self.observe('http_request_duration_seconds',
+                     (route, method, str(response.status_code)),
+                     time.perf_counter() - g.metrics_started)
+        self.observe('http_response_encode_seconds', (route, method),
+                     g.encode_seconds)
+        queries = g.get('sql_queries')
+        if queries is not None:
+            self.observe('http_request_db_seconds', (route, method),
+                         queries.duration)
+            self.observe('http_request_db_statements', (route, method),
+                         queries.count)
+        if self.directory and \
+                time.monotonic() - self._flushed_at >= self.flush_interval:
+            self.flush()
+        return response
+
+    def gauges(self):
+        """This worker's connection pool gauges and counters"""
+        status = pool_status(db.engine)
+        return {name: status.get(key, 0)
+                for name, (_, key) in {**GAUGES, **COUNTERS}.items()}
+
+    def snapshot(self):
+        with self._lock:
+            self._check_fork()
+            histograms = _histogram_rows(self._values)
+        return {'pid': os.getpid(), 'written': time.time(),
+                'histograms': histograms, 'gauges': self.gauges()}
+
+    def flush(self):
+        """Writes this worker's metrics to its file in the directory"""
+        snapshot = self.snapshot()
+        temporary = f'{self._path}.tmp'
+        with open(temporary, 'w') as metrics_file:
+            json.dump(snapshot, metrics_file)
+        os.replace(temporary, self._path)
+        self._flushed_at = time.monotonic()
+
+    def _read(self, path):
+        try:
+            with open(path) as metrics_file:
+                return json.load(metrics_file)
+        except (OSError, ValueError):
+            return None
+
+    def _fold_dead_workers(self, names):
+        """Moves the histograms of dead workers into the archive"""
+        archive_path = os.path.join(self.directory, ARCHIVE)
+        archive = self._read(archive_path) or {'histograms': []}
+        values = merge_histograms({}, archive['histograms'])
+        dead = []
+        for name in names:
+            pid = int(name.split('-', 1)[0])
+            if pid == os.getpid() or _pid_alive(pid):
+                continue
+            snapshot = self._read(os.path.join(self.directory, name))
+            if snapshot is not None:
+                merge_histograms(values, snapshot['histograms'])
+            dead.append(name)
+        if not dead:
+            return
+        temporary = f'{archive_path}.tmp'
+        with open(temporary, 'w') as archive_file:
+            json.dump({'histograms': _histogram_rows(values)}, archive_file)
+        os.replace(temporary, archive_path)
+        for name in dead:
+            os.remove(os.path.join(self.directory, name))
+
+    def collect(self):
+        """Returns the ({(name, labels): [counts, sum]},
+        {pid: gauges}) of every worker"""
+        if not self.directory:
+            snapshot = self.snapshot()
+            return (merge_histograms({}, snapshot['histograms']),
+                    {snapshot['pid']: snapshot['gauges']})
+        self.flush()
+        with open(os.path.join(self.directory, '.lock'), 'w') as lock:
+            # Folding and reading must not interleave, or a dead worker
+            # would be counted twice
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            names = [name for name in os.listdir(self.directory)
+                     if name.endswith('.json') and name != ARCHIVE]
+            self._fold_dead_workers(names)
+            values, gauges, written = {}, {}, {}
+            for name in os.listdir(self.directory):
+                if not name.endswith('.json'):
+                    continue
+                snapshot = self._read(os.path.join(self.directory, name))
+                if snapshot is None:
+                    continue
+                merge_histograms(values, snapshot['histograms'])
+                pid = snapshot.get('pid')
+                if pid is not None and \
+                        snapshot['written'] > written.get(pid, 0):
+                    gauges[pid] = snapshot['gauges']
+                    written[pid] = snapshot['written']
+        return values, gauges
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format"""
+        values, gauges = self.collect()
+        lines = []
+        for name, (description, names, buckets) in HISTOGRAMS.items():
+            lines += [f'# HELP {name} {description}',
+                      f'# TYPE {name} histogram']
+            for (metric, labels), (counts, total) in sorted(values.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(list(buckets) + ['+Inf'], counts):
+                    cumulative += count
+                    bucket = _labels(names, labels, [('le', bound)])
+                    lines.append(f'{name}_bucket{bucket} {cumulative}')
+                lines.append(f'{name}_sum{_labels(names, labels)} {total}')
+                lines.append(f'{name}_count{_labels(names, labels)} '
+                             f'{cumulative}')
+        pool = [(name, description, 'gauge')
+                for name, (description, _) in GAUGES.items()]
+        pool += [(name, description, 'counter')
+                 for name, (description, _) in COUNTERS.items()]
+        for name, description, kind in pool:
+            lines += [f'# HELP {name} {description}',
+                      f'# TYPE {name} {kind}']
+            for pid, worker in sorted(gauges.items()):
+                lines.append(f'{name}{_labels(["pid"], [pid])} '
+                             f'{worker.get(name, 0)}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
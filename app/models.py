@@ -1,19 +1,132 @@
 import os
-from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime, timedelta
+import sqlite3
+from datetime import datetime
+from operator import attrgetter
+
+from sqlalchemy import event, String
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+from app.age import today, age_on, ages
+from app.pool import pool_settings
+from app.routing import RoutingSQLAlchemy, router, record_request_write
 
 database_uri = os.getenv('DATABASE_URI')
+replica_uris = [uri for uri in
+                os.getenv('DATABASE_REPLICA_URIS', '').split(',') if uri]
+# false when the schema is managed by migrations (manage.py db upgrade)
+create_tables = os.getenv('DB_CREATE_ALL', 'true').lower() in \
+    ('1', 'true', 'yes')
+
+db = RoutingSQLAlchemy()
+
+_change_listeners = []
+
+
+def on_table_change(listener):
+    """Registers listener(model, action) to run after BaseModel writes"""
+    _change_listeners.append(listener)
+    return listener
+
+
+def notify_table_change(model, action):
+    """Tells listeners that rows of model were inserted/updated/deleted"""
+    for listener in _change_listeners:
+        listener(model, action)
+
+
+on_table_change(record_request_write)
+
+
+@event.listens_for(Engine, 'connect')
+def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    """SQLite only enforces foreign keys (and ON DELETE) when asked to"""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.close()
+
+
+def dispose_engines(app):
+    """Closes the pooled connections of every engine bound to app.
+
+    Forked processes must not share connections: gunicorn.conf.py calls
+    this around each fork when the app is preloaded.
+    """
+    if 'sqlalchemy' not in app.extensions:
+        return
+    for connector in app.extensions['sqlalchemy'].connectors.values():
+        if connector._engine is not None:
+            connector._engine.dispose()
 
-db = SQLAlchemy()
 
+def setup_db(app, database_path=database_uri, replica_paths=replica_uris,
+             create_all=create_tables, **pool_options):
+    """Binds a flask application and a SQLAlchemy service
 
-def setup_db(app, database_path=database_uri):
-    """Binds a flask application and a SQLAlchemy service"""
+    Read-only requests are served by the replica_paths databases when
+    given (see app.routing). Pool settings (DB_POOL_SIZE, DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING,
+    DB_STATEMENT_TIMEOUT) come from the keyword arguments, then app.config,
+    then the environment. Missing tables are created unless create_all
+    is false (DB_CREATE_ALL).
+    """
+    # Rebinding: release the connections of the previous engine
+    dispose_engines(app)
     app.config['SQLALCHEMY_DATABASE_URI'] = database_path
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config.update(pool_settings(app.config))
+    app.config.update(pool_options)
+    router.configure(app, replica_paths)
     db.app = app
     db.init_app(app)
-    db.create_all()
+    if create_all:
+        db.create_all(bind=None)
+
+
+class TableVersion(db.Model):
+    """Change counter of a table, bumped in the transaction of every write"""
+    __tablename__ = 'table_versions'
+
+    name = db.Column(db.String(250), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False,
+                           default=datetime.utcnow)
+
+    @classmethod
+    def bump(cls, model):
+        """Records a change to the table of model in the current session"""
+        table = cls.__table__
+        now = datetime.utcnow()
+        result = db.session.execute(
+            table.update()
+            .where(table.c.name == model.__tablename__)
+            .values(version=table.c.version + 1, updated_at=now))
+        if result.rowcount == 0:
+            db.session.execute(table.insert().values(
+                name=model.__tablename__, version=1, updated_at=now))
+
+    @classmethod
+    def current(cls, model):
+        """Returns the (version, updated_at) of the table of model"""
+        row = db.session.query(cls.version, cls.updated_at) \
+            .filter(cls.name == model.__tablename__).first()
+        if row is None:
+            return 0, datetime(1970, 1, 1)
+        return row.version, row.updated_at
+
+    @classmethod
+    def versions(cls, models):
+        """Returns the versions of the tables of models, in one query"""
+        names = [model.__tablename__ for model in models]
+        found = dict(db.session.query(cls.name, cls.version)
+                     .filter(cls.name.in_(names)))
+        return [found.get(name, 0) for name in names]
+
+
+class StaleVersion(Exception):
+    """Raised when a row is no longer at the version a write expected"""
 
 
 class BaseModel(db.Model):
@@ -21,59 +134,257 @@ class BaseModel(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow,
+                           onupdate=datetime.utcnow)
+    version = db.Column(db.Integer, nullable=False, default=1,
+                        server_default='1')
+
+    @classmethod
+    def derived_from_date(cls):
+        """Date that values computed by format() depend on, if any"""
+        return None
 
     def insert(self):
         db.session.add(self)
+        TableVersion.bump(type(self))
         db.session.commit()
+        notify_table_change(type(self), 'insert')
 
     def update(self):
+        # Bumped in SQL: a version read here may be stale, and two writers
+        # must never leave one version (one strong ETag) on two bodies
+        self.version = type(self).version + 1
+        TableVersion.bump(type(self))
+        db.session.commit()
+        notify_table_change(type(self), 'update')
+
+    @classmethod
+    def update_by_id(cls, id, values, version=None):
+        """Updates a row with a single UPDATE, without loading it first.
+
+        With `version`, only a row still at that version is updated (see
+        the If-Match header). The version is bumped like update() does.
+        Returns:
+            The updated row with every column (a row tuple, see
+            format_row), or None if no row has `id`.
+        Raises StaleVersion when the row exists at another version.
+        """
+        table = cls.__table__
+        condition = table.c.id == id
+        if version is not None:
+            condition &= table.c.version == version
+        statement = table.update().where(condition).values({
+            **values, 'updated_at': datetime.utcnow(),
+            'version': table.c.version + 1})
+        if db.engine.dialect.implicit_returning:
+            # UPDATE ... RETURNING: one round trip
+            row = db.session.execute(statement.returning(*table.c)).first()
+        else:
+            # Dialects without RETURNING (SQLite) read the row back in the
+            # same transaction
+            row = None
+            if db.session.execute(statement).rowcount:
+                row = db.session.execute(
+                    table.select().where(table.c.id == id)).first()
+        if row is None:
+            db.session.rollback()
+            if version is not None and \
+                    db.session.query(cls.id).filter(cls.id == id).first():
+                raise StaleVersion(f'{cls.__tablename__} {id} is no longer '
+                                   f'at version {version}')
+            return None
+        TableVersion.bump(cls)
         db.session.commit()
+        notify_table_change(cls, 'update')
+        return row
 
     def delete(self):
         db.session.delete(self)
+        TableVersion.bump(type(self))
         db.session.commit()
+        notify_table_change(type(self), 'delete')
 
 
 class Actor(BaseModel):
     __tablename__ = 'actors'
+    __table_args__ = (
+        db.Index('ix_actors_created_at_id', 'created_at', 'id'),
+        db.Index('ix_actors_name_id', 'name', 'id'),
+        db.Index('ix_actors_dob_id', 'dob', 'id'),
+        db.Index('ix_actors_gender_dob', 'gender', 'dob'),
+    )
+    # Columns behind each field of format(), for sparse fieldsets
+    FIELD_COLUMNS = {'id': 'id', 'name': 'name', 'age': 'dob',
+                     'gender': 'gender'}
 
     name = db.Column(db.String(250), nullable=False)
     dob = db.Column(db.Date, nullable=False)
     gender = db.Column(db.String(250), nullable=False)
 
+    castings = db.relationship('Casting', back_populates='actor',
+                               cascade='all, delete-orphan',
+                               passive_deletes=True)
+
     def __init__(self, name, dob, gender):
         self.name = name
         self.dob = dob
         self.gender = gender
 
+    @classmethod
+    def derived_from_date(cls):
+        # Ages change with the calendar, not only with the row
+        return today()
+
     def get_age(self):
-        today = datetime.now().date()
-        days_in_year = 365.2425
-        age = (today - self.dob) // timedelta(days=days_in_year)
-        return age
+        return age_on(self.dob, today())
+
+    def format(self, fields=None):
+        return self.format_row(self, fields)
+
+    @classmethod
+    def format_row(cls, row, fields=None):
+        """Formats anything carrying the actor columns, including the row
+        tuples of app.serialization.row_query"""
+        values = cls.FIELD_VALUES
+        return {field: values[field](row) for field in fields or values}
+
+    @classmethod
+    def format_rows(cls, rows, fields=None):
+        """format_row() of a whole page, with the ages computed in a batch"""
+        fields = fields or list(cls.FIELD_VALUES)
+        others = [field for field in fields if field != 'age']
+        data = [cls.format_row(row, others) for row in rows]
+        if len(others) < len(fields):
+            for actor, age in zip(data, ages([row.dob for row in rows])):
+                actor['age'] = age
+        return data
+
+
+Actor.FIELD_VALUES = {
+    'id': attrgetter('id'),
+    'name': attrgetter('name'),
+    'age': lambda row: age_on(row.dob, today()),
+    'gender': attrgetter('gender'),
+}
+
+
+class bytewise_lower(FunctionElement):
+    """lower(column), compared byte by byte.
+
+    Prefix ranges and LIKE 'prefix%' only hold, and only use a btree
+    index, under a bytewise collation. That is SQLite's default; on
+    PostgreSQL the expression carries COLLATE "C" both in the indexes
+    and in the queries, whatever the collation of the database.
+    """
+    type = String()
+    name = 'bytewise_lower'
+
+
+@compiles(bytewise_lower)
+def _compile_bytewise_lower(element, compiler, **kw):
+    return f'lower({compiler.process(element.clauses, **kw)})'
+
+
+@compiles(bytewise_lower, 'postgresql')
+def _compile_bytewise_lower_postgresql(element, compiler, **kw):
+    return f'lower({compiler.process(element.clauses, **kw)}) COLLATE "C"'
 
-    def format(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'age': self.get_age(),
-            'gender': self.gender,
-        }
+
+# Case-insensitive name and title prefix filters range-scan these
+db.Index('ix_actors_lower_name', bytewise_lower(Actor.name))
 
 
 class Movie(BaseModel):
     __tablename__ = 'movies'
+    __table_args__ = (
+        db.Index('ix_movies_created_at_id', 'created_at', 'id'),
+        db.Index('ix_movies_title_id', 'title', 'id'),
+        db.Index('ix_movies_release_date_id', 'release_date', 'id'),
+    )
+    FIELD_COLUMNS = {'id': 'id', 'title': 'title',
+                     'release_date': 'release_date'}
 
     title = db.Column(db.String(250), nullable=False)
     release_date = db.Column(db.Date, nullable=False)
 
+    castings = db.relationship('Casting', back_populates='movie',
+                               cascade='all, delete-orphan',
+                               passive_deletes=True,
+                               order_by='Casting.billing_order')
+
     def __init__(self, title, release_date):
         self.title = title
         self.release_date = release_date
 
+    def format(self, fields=None):
+        return self.format_row(self, fields)
+
+    @classmethod
+    def format_row(cls, row, fields=None):
+        """Formats anything carrying the movie columns, including the row
+        tuples of app.serialization.row_query"""
+        values = cls.FIELD_VALUES
+        return {field: values[field](row) for field in fields or values}
+
+    def format_with_cast(self, fields=None):
+        movie = self.format(fields)
+        movie['cast'] = [casting.format_for_movie()
+                         for casting in self.castings]
+        return movie
+
+
+Movie.FIELD_VALUES = {
+    'id': attrgetter('id'),
+    'title': attrgetter('title'),
+    'release_date': lambda row: row.release_date.strftime("%Y-%m-%d"),
+}
+
+db.Index('ix_movies_lower_title', bytewise_lower(Movie.title))
+
+
+class Casting(BaseModel):
+    __tablename__ = 'castings'
+    __table_args__ = (
+        db.UniqueConstraint('movie_id', 'actor_id', 'role',
+                            name='uq_castings_movie_actor_role'),
+        db.Index('ix_castings_movie_id_billing_order',
+                 'movie_id', 'billing_order'),
+        db.Index('ix_castings_actor_id', 'actor_id'),
+    )
+
+    movie_id = db.Column(
+        db.Integer, db.ForeignKey('movies.id', ondelete='CASCADE'),
+        nullable=False)
+    actor_id = db.Column(
+        db.Integer, db.ForeignKey('actors.id', ondelete='CASCADE'),
+        nullable=False)
+    role = db.Column(db.String(250), nullable=False)
+    billing_order = db.Column(db.Integer, nullable=False, default=0)
+
+    movie = db.relationship('Movie', back_populates='castings')
+    actor = db.relationship('Actor', back_populates='castings')
+
+    def __init__(self, movie_id, actor_id, role, billing_order=0):
+        self.movie_id = movie_id
+        self.actor_id = actor_id
+        self.role = role
+        self.billing_order = billing_order
+
     def format(self):
         return {
             'id': self.id,
-            'title': self.title,
-            "release_date": self.release_date.strftime("%Y-%m-%d"),
+            'movie_id': self.movie_id,
+            'actor_id': self.actor_id,
+            'role': self.role,
+            'billing_order': self.billing_order,
         }
+
+    def format_for_movie(self):
+        casting = self.format()
+        casting['actor'] = self.actor.format()
+        return casting
+
+    def format_for_actor(self):
+        casting = self.format()
+        casting['movie'] = self.movie.format()
+        return casting
@@ -0,0 +1,122 @@
+import os
+import hashlib
+from datetime import date, datetime
+
+from sqlalchemy import tuple_, types as sa_types
+from itsdangerous import URLSafeSerializer, BadSignature
+
+# Must be identical across workers and restarts for cursors to stay
+# valid; defaults to a key derived from the database URI (and password)
+# that every worker of a deployment shares
+CURSOR_SECRET = os.getenv('CURSOR_SECRET') or hashlib.sha256(
+    f"keyset-cursor:{os.getenv('DATABASE_URI', '')}".encode('utf-8')
+).hexdigest()
+
+# Orderings: `sort` value -> columns forming a unique, indexed key.
+# Prefixing the value with '-' sorts in descending order.
+KEYSET_SORTS = {
+    'id': ('id',),
+    'created_at': ('created_at', 'id'),
+    'name': ('name', 'id'),
+    'dob': ('dob', 'id'),
+    'title': ('title', 'id'),
+    'release_date': ('release_date', 'id'),
+}
+
+serializer = URLSafeSerializer(CURSOR_SECRET, salt='keyset-cursor')
+
+
+def _dump_value(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def _load_value(column, value):
+    if isinstance(column.type, sa_types.DateTime):
+        return datetime.fromisoformat(value)
+    if isinstance(column.type, sa_types.Date):
+        return date.fromisoformat(value)
+    return value
+
+
+def sort_columns(model, sort):
+    """Returns the columns ordering model by sort, and whether descending.
+
+    Raises ValueError for orderings model has no index for.
+    """
+    descending = sort.startswith('-')
+    names = KEYSET_SORTS.get(sort.lstrip('-'), ())
+    if not names or not all(name in model.__table__.c for name in names):
+        raise ValueError(f'unsupported sort {sort!r}')
+    return [model.__table__.c[name] for name in names], descending
+
+
+def order_by_sort(query, model, sort):
+    """Orders query by sort, see sort_columns()"""
+    columns, descending = sort_columns(model, sort)
+    if descending:
+        return query.order_by(*(column.desc() for column in columns))
+    return query.order_by(*columns)
+
+
+def encode_cursor(model, sort, row):
+    """Returns an opaque, signed cursor pointing just after row"""
+    columns, _ = sort_columns(model, sort)
+    values = [_dump_value(getattr(row, column.name)) for column in columns]
+    return serializer.dumps([model.__tablename__, sort, values])
+
+
+def decode_cursor(model, sort, cursor):
+    """Returns the key values stored in cursor.
+
+    Raises ValueError for tampered cursors and for cursors issued by
+    another endpoint or for another sort order.
+    """
+    try:
+        table, cursor_sort, values = serializer.loads(cursor)
+    except (BadSignature, TypeError, ValueError):
+        raise ValueError('invalid cursor')
+    if table != model.__tablename__ or cursor_sort != sort:
+        raise ValueError('cursor does not match this listing')
+    columns, _ = sort_columns(model, sort)
+    try:
+        return [_load_value(column, value)
+                for column, value in zip(columns, values)]
+    except (TypeError, ValueError):
+        raise ValueError('invalid cursor')
+
+
+def keyset_page(model, sort, cursor, limit, query=None):
+    """Fetches the page of model rows following cursor.
+
+    An empty cursor starts from the beginning. The query seeks straight to
+    the cursor position through the index backing the sort (see
+    KEYSET_SORTS), so its cost does not depend on how deep the page is.
+    `query` defaults to model.query and may carry filters and loader
+    options.
+
+    Returns:
+        tuple: The rows and the cursor of the next page (None on the last).
+    Raises ValueError for an invalid cursor or a limit below 1.
+    """
+    if limit < 1:
+        raise ValueError('limit must be at least 1')
+    columns, descending = sort_columns(model, sort)
+    if query is None:
+        query = model.query
+    query = order_by_sort(query, model, sort)
+    if cursor:
+        values = decode_cursor(model, sort, cursor)
+        if len(columns) == 1:
+            key, position = columns[0], values[0]
+        else:
+            key, position = tuple_(*columns), tuple_(*values)
+        query = query.filter(key < position if descending
+                             else key > position)
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(model, sort, rows[-1])
+    return rows, next_cursor
@@ -0,0 +1,110 @@
+import os
+import time
+
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+
+def _env_bool(name, default):
+    return os.getenv(name, str(default)).lower() in ('1', 'true', 'yes')
+
+
+# Defaults for the DB_* keys of app.config, see pool_settings()
+POOL_DEFAULTS = {
+    'DB_POOL_SIZE': int(os.getenv('DB_POOL_SIZE', 5)),
+    'DB_MAX_OVERFLOW': int(os.getenv('DB_MAX_OVERFLOW', 10)),
+    'DB_POOL_TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', 30)),
+    'DB_POOL_RECYCLE': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+    'DB_POOL_PRE_PING': _env_bool('DB_POOL_PRE_PING', True),
+    # Milliseconds, 0 leaves the server default (PostgreSQL only)
+    'DB_STATEMENT_TIMEOUT': int(os.getenv('DB_STATEMENT_TIMEOUT', 0)),
+}
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait for a connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+        self.timeouts = 0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            self.checkouts += 1
+            self.wait_time += waited
+            if waited > self.max_wait:
+                self.max_wait = waited
+
+
+def pool_settings(config):
+    """Returns the DB_* pool settings of a Flask config, with defaults"""
+    return {key: config.get(key, default)
+            for key, default in POOL_DEFAULTS.items()}
+
+
+def engine_options(sa_url, config):
+    """Builds create_engine() pool options for the database at sa_url"""
+    settings = pool_settings(config)
+    options = {'pool_pre_ping': settings['DB_POOL_PRE_PING']}
+    connect_args = {}
+    if sa_url.drivername.startswith('sqlite'):
+        if sa_url.database in (None, '', ':memory:'):
+            # In-memory databases live in a single connection
+            return options
+        # Pooled SQLite connections are handed between threads
+        connect_args['check_same_thread'] = False
+    if sa_url.drivername.startswith('postgresql') and \
+            settings['DB_STATEMENT_TIMEOUT']:
+        connect_args['options'] = \
+            f"-c statement_timeout={settings['DB_STATEMENT_TIMEOUT']}"
+    options.update(
+        poolclass=TimedQueuePool,
+        pool_size=settings['DB_POOL_SIZE'],
+        max_overflow=settings['DB_MAX_OVERFLOW'],
+        pool_timeout=settings['DB_POOL_TIMEOUT'],
+        pool_recycle=settings['DB_POOL_RECYCLE'])
+    if connect_args:
+        options['connect_args'] = connect_args
+    return options
+
+
+class PooledSQLAlchemy(SQLAlchemy):
+    """Flask-SQLAlchemy configured with the DB_* pool settings"""
+
+    def apply_driver_hacks(self, app, sa_url, options):
+        result = super().apply_driver_hacks(app, sa_url, options)
+        options.update(engine_options(sa_url, app.config))
+        return result
+
+
+def pool_status(engine):
+    """Returns connection pool usage counters for engine"""
+    pool = engine.pool
+    status = {'class': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=pool._max_overflow)
+    if isinstance(pool, TimedQueuePool):
+        status.update(
+            checkouts=pool.checkouts,
+            wait_time_total=pool.wait_time,
+            wait_time_max=pool.max_wait,
+            wait_time_mean=pool.wait_time / pool.checkouts
+            if pool.checkouts else 0.0,
+            timeouts=pool.timeouts)
+    return status
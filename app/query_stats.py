@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import logging
+import threading
+
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+SQL_INSTRUMENTATION = os.getenv('SQL_INSTRUMENTATION', 'false').lower() in \
+    ('1', 'true', 'yes')
+# Statements slower than this are logged, in milliseconds
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 100))
+# Characters of a statement kept in logs and reports
+STATEMENT_MAX_LENGTH = 500
+
+
+class RequestQueries:
+    """Statements run by one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.count = 0
+        self.duration = 0.0
+        self.slowest = 0.0
+        self.slowest_statement = None
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.duration += duration
+        if duration > self.slowest:
+            self.slowest = duration
+            self.slowest_statement = statement
+
+
+class EndpointQueries:
+    """Statements run by all the requests of one endpoint"""
+
+    def __init__(self):
+        self.requests = 0
+        self.count = 0
+        self.max_count = 0
+        self.duration = 0.0
+        self.slowest = 0.0
+        self.slowest_statement = None
+
+    def add(self, queries):
+        self.requests += 1
+        self.count += queries.count
+        self.max_count = max(self.max_count, queries.count)
+        self.duration += queries.duration
+        if queries.slowest > self.slowest:
+            self.slowest = queries.slowest
+            self.slowest_statement = queries.slowest_statement
+
+    def summary(self):
+        return {
+            'requests': self.requests,
+            'queries_per_request': self.count / self.requests,
+            'max_queries': self.max_count,
+            'db_ms_per_request': self.duration * 1000 / self.requests,
+            'db_ms_total': self.duration * 1000,
+            'slowest_ms': self.slowest * 1000,
+            'slowest_statement': self.slowest_statement,
+        }
+
+
+class QueryInstrumentation:
+    """Counts and times the SQL statements of every request.
+
+    Each response gets a Server-Timing header with its statement count,
+    database time and slowest statement; statements slower than
+    `slow_query_ms` are logged as JSON lines; report() aggregates the
+    requests of this worker per endpoint.
+
+    Enabled with collect_only, statements are only timed into
+    g.sql_queries for other consumers such as app.metrics: no header,
+    log or report. Disabled in both modes, no engine listener is
+    registered and the request hooks return after two attribute checks.
+    """
+
+    def __init__(self, slow_query_ms=SLOW_QUERY_MS):
+        self.slow_query_ms = slow_query_ms
+        self.enabled = False
+        self.collecting = False
+        self._listening = False
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app, enabled=SQL_INSTRUMENTATION):
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        if enabled:
+            self.enable()
+
+    def enable(self, collect_only=False):
+        if collect_only:
+            self.collecting = True
+        else:
+            self.enabled = True
+        self._listen()
+
+    def disable(self, collect_only=False):
+        if collect_only:
+            self.collecting = False
+        else:
+            self.enabled = False
+        self._listen()
+
+    def _listen(self):
+        wanted = self.enabled or self.collecting
+        if wanted and not self._listening:
+            event.listen(Engine, 'before_cursor_execute', self._before)
+            event.listen(Engine, 'after_cursor_execute', self._after)
+        elif self._listening and not wanted:
+            event.remove(Engine, 'before_cursor_execute', self._before)
+            event.remove(Engine, 'after_cursor_execute', self._after)
+        self._listening = wanted
+
+    def _before(self, conn, cursor, statement, parameters, context,
+                executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context,
+               executemany):
+        duration = time.perf_counter() - conn.info['query_started'].pop()
+        statement = statement[:STATEMENT_MAX_LENGTH]
+        in_request = has_request_context()
+        if in_request and 'sql_queries' in g:
+            g.sql_queries.record(statement, duration)
+        if self.enabled and duration * 1000 >= self.slow_query_ms:
+            logger.warning(json.dumps({
+                'event': 'slow_query',
+                'duration_ms': round(duration * 1000, 3),
+                'endpoint': request.endpoint if in_request else None,
+                'method': request.method if in_request else None,
+                'path': request.path if in_request else None,
+                'statement': statement,
+            }))
+
+    def _start_request(self):
+        if self.enabled or self.collecting:
+            g.sql_queries = RequestQueries()
+
+    def _finish_request(self, response):
+        if not self.enabled or 'sql_queries' not in g:
+            return response
+        queries = g.sql_queries
+        total = time.perf_counter() - queries.started
+        response.headers.add(
+            'Server-Timing',
+            f'db;desc="{queries.count} queries";'
+            f'dur={queries.duration * 1000:.3f}, '
+            f'db-slowest;dur={queries.slowest * 1000:.3f}, '
+            f'app;dur={total * 1000:.3f}')
+        with self._lock:
+            endpoint = self._endpoints.setdefault(
+                request.endpoint or '<unmatched>', EndpointQueries())
+            endpoint.add(queries)
+        return response
+
+    def report(self):
+        """Per-endpoint statement counts and timings of this worker,
+        the endpoints spending the most database time first"""
+        with self._lock:
+            summaries = {name: endpoint.summary()
+                         for name, endpoint in self._endpoints.items()}
+        return dict(sorted(summaries.items(),
+                           key=lambda item: -item[1]['db_ms_total']))
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+query_stats = QueryInstrumentation()
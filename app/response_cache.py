@@ -0,0 +1,218 @@
+import os
+import json
+import time
+import threading
+from functools import wraps
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+from flask import request, current_app
+from werkzeug.http import unquote_etag, parse_date
+
+from app.models import TableVersion, on_table_change
+from app.http_cache import is_fresh, not_modified
+
+RESPONSE_CACHE_BACKEND = os.getenv('RESPONSE_CACHE_BACKEND', 'none')
+RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', 30))
+RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', 1024))
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+
+# Response headers replayed from the cache
+CACHED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Cache-Control')
+
+
+class LRUBackend:
+    """In-process LRU of cached responses, local to each worker.
+
+    A worker never hears of the writes of the others, so listings cached
+    here are keyed by the table_versions rows instead of by generation
+    counters (see ResponseCache.versions).
+    """
+    shared = False
+
+    def __init__(self, maxsize=RESPONSE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+class RedisBackend:
+    """Cache shared by every worker through a Redis-compatible client.
+
+    `client` needs get(key), set(key, value, ex=seconds, nx=flag) and
+    incr(key), as provided by redis.Redis.
+    """
+    shared = True
+
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, value, ttl):
+        self.client.set(key, value, ex=ttl)
+
+    def get_counter(self, key):
+        value = self.client.get(key)
+        return int(value) if value is not None else None
+
+    def init_counter(self, key, value):
+        self.client.set(key, value, nx=True)
+
+    def incr(self, key):
+        return self.client.incr(key)
+
+
+class ResponseCache:
+    """Caches whole responses of list endpoints per endpoint and query.
+
+    Keys embed a per-table generation number; a write bumps the generation
+    of its table (see on_table_change), which makes every cached listing
+    of that table unreachable at once without scanning for keys. Backends
+    that are not shared between workers use the table_versions row as
+    the generation, so a write in one worker reaches the others too.
+    """
+
+    def __init__(self, backend=None, ttl=RESPONSE_CACHE_TTL,
+                 prefix='agency:responses'):
+        self.backend = backend
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self.hit_time = 0.0
+        self.miss_time = 0.0
+
+    def generation(self, table):
+        key = f'{self.prefix}:generation:{table}'
+        generation = self.backend.get_counter(key)
+        if generation is None:
+            # Start past any generation an evicted counter could have had
+            self.backend.init_counter(key, int(time.time() * 1000))
+            generation = self.backend.get_counter(key)
+        return generation
+
+    def versions(self, models):
+        """The generations of the tables of models in cache keys"""
+        if not self.backend.shared:
+            # One query on table_versions sees the writes of every worker
+            return [f'v{version}'
+                    for version in TableVersion.versions(models)]
+        return [str(self.generation(model.__tablename__))
+                for model in models]
+
+    def invalidate(self, model, action=None):
+        if self.backend is not None and self.backend.shared:
+            table = getattr(model, '__tablename__', model)
+            self.generation(table)
+            self.backend.incr(f'{self.prefix}:generation:{table}')
+
+    def key(self, models):
+        args = urlencode(sorted(request.args.items(multi=True)))
+        versions = self.versions(models)
+        versions.extend(str(model.derived_from_date()) for model in models
+                        if model.derived_from_date() is not None)
+        return f'{self.prefix}:{request.endpoint}:{".".join(versions)}:{args}'
+
+    def load(self, key):
+        value = self.backend.get(key)
+        if value is None:
+            return None
+        if isinstance(value, bytes):
+            value = value.decode('utf-8')
+        return json.loads(value)
+
+    def store(self, key, response):
+        value = json.dumps({
+            'body': response.get_data(as_text=True),
+            'headers': {name: response.headers[name]
+                        for name in CACHED_HEADERS
+                        if name in response.headers},
+        })
+        self.backend.set(key, value, self.ttl)
+
+    def stats(self):
+        requests = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / requests if requests else 0.0,
+            'hit_time_mean': self.hit_time / self.hits if self.hits else 0.0,
+            'miss_time_mean':
+                self.miss_time / self.misses if self.misses else 0.0,
+        }
+
+
+def create_backend(name=RESPONSE_CACHE_BACKEND):
+    if name == 'none':
+        return None
+    if name == 'memory':
+        return LRUBackend()
+    if name == 'redis':
+        import redis
+        return RedisBackend(redis.Redis.from_url(REDIS_URL))
+    raise ValueError(f'unknown response cache backend {name!r}')
+
+
+response_cache = ResponseCache(create_backend())
+on_table_change(response_cache.invalidate)
+
+
+def cached_response(*models):
+    """Serves a GET view from the response cache.
+
+    The cache is invalidated by writes to the tables of models. Only 200
+    responses are stored; conditional requests are answered from the
+    cached validators without calling the view.
+    """
+    def cached_response_decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if response_cache.backend is None:
+                return f(*args, **kwargs)
+            start = time.perf_counter()
+            key = response_cache.key(models)
+            entry = response_cache.load(key)
+            if entry is not None:
+                headers = entry['headers']
+                etag, weak = unquote_etag(headers.get('ETag'))
+                last_modified = parse_date(headers.get('Last-Modified'))
+                if last_modified is not None:
+                    last_modified = last_modified.replace(tzinfo=None)
+                if etag and is_fresh(etag, last_modified):
+                    response = not_modified(etag, weak, last_modified)
+                else:
+                    response = current_app.response_class(
+                        entry['body'], status=200, headers=headers)
+                response_cache.hits += 1
+                response_cache.hit_time += time.perf_counter() - start
+                return response
+            response = current_app.make_response(f(*args, **kwargs))
+            if response.status_code == 200:
+                response_cache.store(key, response)
+            response_cache.misses += 1
+            response_cache.miss_time += time.perf_counter() - start
+            return response
+        return wrapper
+    return cached_response_decorator
@@ -0,0 +1,248 @@
+import os
+import math
+import time
+import logging
+import itertools
+import weakref
+import threading
+
+from flask import g, request, has_request_context
+from flask_sqlalchemy import SignallingSession
+from sqlalchemy import event, orm, text
+from sqlalchemy.sql.dml import UpdateBase
+
+from app.pool import PooledSQLAlchemy
+from auth.auth import get_current_payload
+
+logger = logging.getLogger(__name__)
+
+REPLICA_STRATEGY = os.getenv('REPLICA_STRATEGY', 'round_robin')
+# Seconds of replication lag after which a replica stops receiving reads
+REPLICA_MAX_LAG = float(os.getenv('REPLICA_MAX_LAG', 5))
+REPLICA_CHECK_INTERVAL = float(os.getenv('REPLICA_CHECK_INTERVAL', 5))
+# Seconds a failing replica is left out before it is probed again
+REPLICA_RETRY_AFTER = float(os.getenv('REPLICA_RETRY_AFTER', 30))
+# Seconds during which a client's reads follow its writes to the primary
+READ_YOUR_WRITES_SECONDS = float(os.getenv('READ_YOUR_WRITES_SECONDS', 5))
+
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Cookie carrying the time of a client's last write, so its next reads
+# stay on the primary whichever worker serves them
+WRITE_COOKIE = 'last_write'
+
+# A replica still streaming from the primary that replayed all it
+# received is not lagging, however long ago the primary last committed.
+# Once its WAL receiver is down both positions stop moving, so the lag
+# is the age of the last replayed transaction again.
+LAG_QUERIES = {
+    'postgresql': 'SELECT CASE WHEN pg_last_wal_receive_lsn() = '
+                  'pg_last_wal_replay_lsn() AND EXISTS ('
+                  'SELECT 1 FROM pg_stat_wal_receiver '
+                  "WHERE status = 'streaming') THEN 0 "
+                  'ELSE COALESCE(EXTRACT(EPOCH FROM '
+                  'now() - pg_last_xact_replay_timestamp()), 0) END',
+}
+
+
+class ReplicaRouter:
+    """Picks the database engine that serves the reads of a request.
+
+    Replicas are registered as SQLALCHEMY_BINDS entries named replica_<n>
+    so they share the pool settings of the primary. A replica is skipped
+    while its replication lag exceeds `max_lag` or for `retry_after`
+    seconds after it failed, in which case reads fall back to the primary.
+
+    After a write, the client's reads go to the primary for
+    `read_your_writes` seconds. Each worker remembers the writes it
+    served; the WRITE_COOKIE set on the response carries the guarantee
+    to the other workers, for clients that send cookies back. The
+    cookie holds a wall clock time, so the hosts' clocks must agree.
+    """
+
+    def __init__(self, strategy=REPLICA_STRATEGY, max_lag=REPLICA_MAX_LAG,
+                 check_interval=REPLICA_CHECK_INTERVAL,
+                 retry_after=REPLICA_RETRY_AFTER,
+                 read_your_writes=READ_YOUR_WRITES_SECONDS):
+        self.strategy = strategy
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.retry_after = retry_after
+        self.read_your_writes = read_your_writes
+        self.keys = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._checked_at = {}
+        self._lag = {}
+        self._down_until = {}
+        self._last_writes = {}
+        self._pruned_at = float('-inf')
+        self._watched = weakref.WeakSet()
+
+    def configure(self, app, replica_paths):
+        """Registers replica_paths as binds of app and resets all state"""
+        binds = app.config.get('SQLALCHEMY_BINDS') or {}
+        binds = {key: uri for key, uri in binds.items()
+                 if not key.startswith('replica_')}
+        self.keys = []
+        for index, path in enumerate(replica_paths or ()):
+            key = f'replica_{index}'
+            binds[key] = path
+            self.keys.append(key)
+        app.config['SQLALCHEMY_BINDS'] = binds or None
+        self._checked_at.clear()
+        self._lag.clear()
+        self._down_until.clear()
+        self._last_writes.clear()
+
+    def init_app(self, app):
+        app.after_request(self._finish_request)
+
+    def _finish_request(self, response):
+        if self.keys and 'wrote_at' in g:
+            response.set_cookie(WRITE_COOKIE, f'{g.wrote_at:.3f}',
+                                max_age=math.ceil(self.read_your_writes),
+                                httponly=True)
+        return response
+
+    def mark_down(self, key):
+        logger.warning('Replica %s unavailable, reading from the primary',
+                       key)
+        self._down_until[key] = time.monotonic() + self.retry_after
+
+    def watch(self, key, engine):
+        """Marks the replica down as soon as engine loses its connection"""
+        if engine in self._watched:
+            return
+        self._watched.add(engine)
+
+        def on_error(context):
+            if context.is_disconnect:
+                self.mark_down(key)
+        event.listen(engine, 'handle_error', on_error)
+
+    def _probe(self, db, key):
+        engine = db.get_engine(db.get_app(), bind=key)
+        query = LAG_QUERIES.get(engine.dialect.name)
+        if query is None:
+            with engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+            return 0.0
+        with engine.connect() as connection:
+            return float(connection.execute(text(query)).scalar() or 0)
+
+    def is_available(self, db, key):
+        now = time.monotonic()
+        if self._down_until.get(key, 0) > now:
+            return False
+        if now - self._checked_at.get(key, float('-inf')) >= \
+                self.check_interval:
+            self._checked_at[key] = now
+            try:
+                self._lag[key] = self._probe(db, key)
+            except Exception:
+                self.mark_down(key)
+                return False
+        return self._lag.get(key, 0.0) <= self.max_lag
+
+    def choose(self, db):
+        """Returns the engine for the next read, or None for the primary"""
+        available = [key for key in self.keys if self.is_available(db, key)]
+        if not available:
+            return None
+        app = db.get_app()
+        if self.strategy == 'least_connections':
+            def checked_out(key):
+                pool = db.get_engine(app, bind=key).pool
+                return pool.checkedout() if hasattr(pool, 'checkedout') \
+                    else 0
+            key = min(available, key=checked_out)
+        else:
+            with self._lock:
+                key = available[next(self._counter) % len(available)]
+        return db.get_engine(app, bind=key)
+
+    def record_write(self, client):
+        if client is None:
+            return
+        now = time.monotonic()
+        self._last_writes[client] = now
+        if now - self._pruned_at >= self.read_your_writes:
+            self._prune(now)
+
+    def _prune(self, now):
+        """Forgets the writes of clients that have not read since"""
+        with self._lock:
+            self._pruned_at = now
+            for client, written_at in list(self._last_writes.items()):
+                if now - written_at > self.read_your_writes:
+                    self._last_writes.pop(client, None)
+
+    def reads_follow_writes(self, client):
+        """Tells whether the reads of the current request must go to the
+        primary, after a write of its client here or in another worker"""
+        try:
+            written_at = float(request.cookies.get(WRITE_COOKIE, ''))
+        except ValueError:
+            written_at = None
+        if written_at is not None and \
+                time.time() - written_at <= self.read_your_writes:
+            return True
+        return self.wrote_recently(client)
+
+    def wrote_recently(self, client):
+        written_at = self._last_writes.get(client)
+        if written_at is None:
+            return False
+        if time.monotonic() - written_at > self.read_your_writes:
+            self._last_writes.pop(client, None)
+            return False
+        return True
+
+
+router = ReplicaRouter()
+
+
+def current_client():
+    """Identifies the authenticated client of the current request"""
+    payload = get_current_payload()
+    return payload.get('sub') if payload else None
+
+
+def record_request_write(model, action):
+    """on_table_change listener pinning the writer's reads to the primary"""
+    if has_request_context():
+        g.wrote_at = time.time()
+        router.record_write(current_client())
+
+
+class RoutingSession(SignallingSession):
+    """Session sending the reads of read-only requests to a replica"""
+
+    def __init__(self, db, **options):
+        self.db = db
+        super().__init__(db, **options)
+
+    def get_bind(self, mapper=None, clause=None):
+        if router.keys and not self._flushing and \
+                not isinstance(clause, UpdateBase) and has_request_context():
+            if 'db_replica' not in g:
+                g.db_replica = None
+                if request.method in READ_METHODS and \
+                        not router.reads_follow_writes(current_client()):
+                    g.db_replica = router.choose(self.db)
+            if g.db_replica is not None:
+                return g.db_replica
+        return super().get_bind(mapper, clause)
+
+
+class RoutingSQLAlchemy(PooledSQLAlchemy):
+    """PooledSQLAlchemy whose sessions route reads to replicas"""
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def get_engine(self, app=None, bind=None):
+        engine = super().get_engine(app, bind)
+        if bind in router.keys:
+            router.watch(bind, engine)
+        return engine
@@ -0,0 +1,348 @@
+import os
+import re
+import time
+import sqlite3
+import threading
+from bisect import bisect_left
+from heapq import nsmallest
+
+from sqlalchemy import event, text
+
+from app.models import db, on_table_change, Actor, Movie
+
+# auto picks PostgreSQL full-text search, SQLite FTS5 or the in-process
+# inverted index depending on the database; memory forces the latter
+SEARCH_BACKEND = os.getenv('SEARCH_BACKEND', 'auto')
+# Seconds before the in-process index is rebuilt to pick up writes made
+# by other workers
+SEARCH_INDEX_TTL = int(os.getenv('SEARCH_INDEX_TTL', 300))
+SEARCH_MAX_LIMIT = int(os.getenv('SEARCH_MAX_LIMIT', 100))
+# Matches of each type that are ranked, or the results up to the page
+# asked for if more: a broad prefix ranks the first ones the index yields
+# instead of every row of the table
+SEARCH_MAX_CANDIDATES = int(os.getenv('SEARCH_MAX_CANDIDATES', 200))
+
+# Result type -> (model, searched column) in the order results are merged
+SEARCHABLE = {
+    'actor': (Actor, 'name'),
+    'movie': (Movie, 'title'),
+}
+
+# Letters and digits, like the FTS5 unicode61 and PostgreSQL parsers
+TOKEN = re.compile(r'[^\W_]+')
+
+# Prefix lengths FTS5 keeps an index of, so they are read as a stream
+# rather than expanded over every matching word
+FTS5_PREFIXES = (1, 2, 3, 4)
+
+
+def tokenize(value):
+    return TOKEN.findall(value.lower())
+
+
+def matches(terms, tokens):
+    """Tells whether every term starts one of tokens"""
+    return all(any(token.startswith(term) for token in tokens)
+               for term in terms)
+
+
+def score(terms, tokens):
+    """Favors whole-word matches and names made mostly of the terms"""
+    exact = sum(term in tokens for term in terms)
+    return (exact + len(terms)) / (len(tokens) or 1)
+
+
+def best(results, offset, limit):
+    """The page of (type, id, text, score) results, best first"""
+    page = nsmallest(offset + limit, results,
+                     key=lambda row: (-row[3], row[2], row[1]))
+    return page[offset:]
+
+
+def _search_ddl(dialect):
+    if dialect == 'postgresql':
+        return [
+            f'CREATE INDEX IF NOT EXISTS ix_{model.__tablename__}_{column}'
+            f"_search ON {model.__tablename__} USING gin "
+            f"(to_tsvector('simple', {column}))"
+            for model, column in SEARCHABLE.values()]
+    if dialect == 'sqlite' and fts5_available():
+        statements = []
+        for model, column in SEARCHABLE.values():
+            table = model.__tablename__
+            fts = f'{table}_search'
+            statements += [
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5('
+                f"{column}, content='{table}', content_rowid='id', "
+                f"prefix='{' '.join(map(str, FTS5_PREFIXES))}')",
+                f'CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT '
+                f'ON {table} BEGIN INSERT INTO {fts}(rowid, {column}) '
+                f'VALUES (new.id, new.{column}); END',
+                f'CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE '
+                f'ON {table} BEGIN INSERT INTO {fts}({fts}, rowid, {column}) '
+                f"VALUES ('delete', old.id, old.{column}); END",
+                f'CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE '
+                f'OF {column} ON {table} BEGIN '
+                f'INSERT INTO {fts}({fts}, rowid, {column}) '
+                f"VALUES ('delete', old.id, old.{column}); "
+                f'INSERT INTO {fts}(rowid, {column}) '
+                f'VALUES (new.id, new.{column}); END',
+                # Index the rows written before the triggers existed
+                f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+            ]
+        return statements
+    return []
+
+
+@event.listens_for(db.Model.metadata, 'after_create')
+def create_search_indexes(metadata, connection, **kwargs):
+    """Adds the full-text indexes that db.create_all() cannot express"""
+    dialect = connection.dialect.name
+    if dialect == 'sqlite' and fts5_available() and connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = 'actors_search'")
+    ).scalar():
+        return
+    for statement in _search_ddl(dialect):
+        connection.execute(text(statement))
+
+
+_fts5 = None
+
+
+def fts5_available():
+    """Tells whether the sqlite3 module was built with FTS5"""
+    global _fts5
+    if _fts5 is None:
+        connection = sqlite3.connect(':memory:')
+        try:
+            connection.execute('CREATE VIRTUAL TABLE probe USING fts5(value)')
+            _fts5 = True
+        except sqlite3.OperationalError:
+            _fts5 = False
+        finally:
+            connection.close()
+    return _fts5
+
+
+class PostgresSearch:
+    """Prefix full-text search on the to_tsvector('simple', ...) GIN
+    indexes, ranked with ts_rank.
+
+    Only the first `candidates` matches of each table are ranked, so the
+    cost of a broad prefix is bounded by the candidates and not by the
+    number of rows it matches.
+    """
+
+    def __init__(self, candidates=SEARCH_MAX_CANDIDATES):
+        self.candidates = candidates
+
+    def search(self, terms, types, offset, limit):
+        query = ' & '.join(f'{term}:*' for term in terms)
+        selects = [
+            f"SELECT '{kind}' AS type, id, text, "
+            f"ts_rank(to_tsvector('simple', text), query) AS score "
+            f'FROM (SELECT id, {column} AS text '
+            f'FROM {model.__tablename__} '
+            f"WHERE to_tsvector('simple', {column}) @@ "
+            f"to_tsquery('simple', :query) LIMIT :candidates) candidates, "
+            f"to_tsquery('simple', :query) query"
+            for kind, (model, column) in SEARCHABLE.items() if kind in types]
+        statement = ' UNION ALL '.join(selects) + \
+            ' ORDER BY score DESC, text, id LIMIT :limit OFFSET :offset'
+        return db.session.execute(text(statement), {
+            'query': query, 'candidates': max(self.candidates, offset + limit),
+            'limit': limit, 'offset': offset}).fetchall()
+
+
+class SQLiteSearch:
+    """Prefix search on the FTS5 tables kept in sync by triggers.
+
+    Terms are looked up by their first FTS5_PREFIXES characters, whose
+    indexes stream their rows, so a broad prefix stops after the first
+    `candidates` matches of each table instead of being expanded over
+    every row; longer terms are then checked on the rows read. Should
+    `scan` times the candidates go by without enough matches, the long
+    term that matched the fewest of them is looked up in full. Matches
+    are ranked like the in-process index ranks them.
+    """
+
+    scan = 1
+
+    def __init__(self, candidates=SEARCH_MAX_CANDIDATES):
+        self.candidates = candidates
+
+    def _matches(self, kind, terms, wanted):
+        model, column = SEARCHABLE[kind]
+        fts = f'{model.__tablename__}_search'
+        statement = text(f'SELECT rowid, {column} FROM {fts} '
+                         f'WHERE {fts} MATCH :query LIMIT :limit')
+
+        length = max(FTS5_PREFIXES)
+        prefixes = [term[:length] for term in terms]
+        # The prefix indexes only vouch for the first characters
+        checks = {term: re.compile(r'(?<![^\W_])' + re.escape(term))
+                  for term in terms if len(term) > length}
+
+        def select(limit):
+            """The rows read and those matching every term, read until
+            `wanted` of them match"""
+            query = ' AND '.join(f'"{prefix}"*' for prefix in prefixes)
+            result = db.session.execute(
+                statement, {'query': query, 'limit': limit})
+            rows, found = [], []
+            while len(found) < wanted:
+                chunk = [(id, value, value.lower())
+                         for id, value in result.fetchmany(wanted)]
+                if not chunk:
+                    break
+                rows += chunk
+                found += [row for row in chunk if all(
+                    check.search(row[2]) for check in checks.values())]
+            result.close()
+            return rows, found[:wanted]
+
+        scan = wanted * self.scan
+        rows, found = select(scan)
+        if len(found) < wanted and len(rows) == scan and checks:
+            rarest = min(checks, key=lambda term: sum(
+                bool(checks[term].search(lowered)) for _, _, lowered in rows))
+            prefixes[terms.index(rarest)] = rarest
+            _, found = select(scan)
+        return [(kind, id, value, score(terms, tokenize(value)))
+                for id, value, _ in found]
+
+    def search(self, terms, types, offset, limit):
+        wanted = max(self.candidates, offset + limit)
+        results = []
+        for kind in SEARCHABLE:
+            if kind in types:
+                results.extend(self._matches(kind, terms, wanted))
+        return best(results, offset, limit)
+
+
+class InvertedIndexSearch:
+    """In-process inverted index, for databases without full-text search.
+
+    The index is built on the first search and dropped whenever BaseModel
+    writes to a searched table in this process; it also expires after
+    `ttl` seconds to pick up writes made by other workers. Each type has
+    its own index whose terms are kept sorted, so a prefix is found by
+    bisection. As with the database backends, only the first
+    `candidates` matches of each type are ranked.
+    """
+
+    # Words of a prefix whose postings are counted to find the rarest term
+    COUNTED_WORDS = 64
+
+    def __init__(self, ttl=SEARCH_INDEX_TTL,
+                 candidates=SEARCH_MAX_CANDIDATES):
+        self.ttl = ttl
+        self.candidates = candidates
+        self._index = None
+        self._lock = threading.Lock()
+
+    def invalidate(self, model, action=None):
+        if any(model is searched for searched, _ in SEARCHABLE.values()):
+            self._index = None
+
+    def build(self):
+        indexes = {}
+        for kind, (model, column) in SEARCHABLE.items():
+            postings = {}
+            documents = {}
+            rows = db.session.query(model.id, getattr(model, column)) \
+                .yield_per(10000)
+            for id, value in rows:
+                tokens = tuple(tokenize(value))
+                documents[id] = (value, tokens)
+                for token in tokens:
+                    postings.setdefault(token, []).append(id)
+            indexes[kind] = (sorted(postings), postings, documents)
+        return indexes, time.monotonic()
+
+    def index(self):
+        index = self._index
+        if index is None or time.monotonic() - index[1] >= self.ttl:
+            with self._lock:
+                index = self._index
+                if index is None or time.monotonic() - index[1] >= self.ttl:
+                    index = self._index = self.build()
+        return index[0]
+
+    def _matches(self, kind, terms, wanted, vocabulary, postings,
+                 documents):
+        ranges = []
+        for term in terms:
+            start = bisect_left(vocabulary, term)
+            stop = bisect_left(vocabulary,
+                               term[:-1] + chr(ord(term[-1]) + 1), start)
+            if start == stop:
+                return []
+            # Postings of the first words, one for each of the others
+            counted = min(stop, start + self.COUNTED_WORDS)
+            size = sum(len(postings[word])
+                       for word in vocabulary[start:counted])
+            ranges.append((size + stop - counted, term, start, stop))
+        # Only the rarest term is looked up, the others are checked on the
+        # documents it yields
+        ranges.sort()
+        _, rarest, start, stop = ranges[0]
+        others = [term for _, term, _, _ in ranges[1:]]
+        found = {}
+        for position in range(start, stop):
+            for id in postings[vocabulary[position]]:
+                value, tokens = documents[id]
+                if id not in found and matches(others, tokens):
+                    found[id] = (kind, id, value, score(terms, tokens))
+                    if len(found) == wanted:
+                        return list(found.values())
+        return list(found.values())
+
+    def search(self, terms, types, offset, limit):
+        indexes = self.index()
+        wanted = max(self.candidates, offset + limit)
+        results = []
+        for kind in SEARCHABLE:
+            if kind in types:
+                results.extend(
+                    self._matches(kind, terms, wanted, *indexes[kind]))
+        return best(results, offset, limit)
+
+
+inverted_index = InvertedIndexSearch()
+on_table_change(inverted_index.invalidate)
+
+SEARCH_BACKENDS = {
+    'postgresql': PostgresSearch(),
+    'sqlite': SQLiteSearch(),
+    'memory': inverted_index,
+}
+
+
+def search_backend(name=None):
+    """Returns the backend serving searches on the current database"""
+    name = name or SEARCH_BACKEND
+    if name == 'auto':
+        name = db.engine.dialect.name
+        if name == 'sqlite' and not fts5_available():
+            name = 'memory'
+    return SEARCH_BACKENDS.get(name, inverted_index)
+
+
+def search(q, types, offset=0, limit=10, backend=None):
+    """Finds actors by name and movies by title.
+
+    Every word of q must start a word of the name or title. Results are
+    ranked best first and paged with offset/limit.
+
+    Returns:
+        list: (type, id, name or title, score) tuples.
+    Raises ValueError when q has no words to search for.
+    """
+    terms = tokenize(q or '')
+    if not terms:
+        raise ValueError('nothing to search for')
+    if not types:
+        return []
+    return [tuple(row) for row in
+            search_backend(backend).search(terms, types, offset, limit)]
@@ -0,0 +1,91 @@
+import json
+import time
+
+from flask import current_app, g, json as flask_json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+from app.pagination import sort_columns
+
+
+def _default(obj):
+    """Encodes what JSON has no type for (dates, UUIDs...) like Flask"""
+    return flask_json.JSONEncoder().default(obj)
+
+
+def dumps(obj, sort_keys=False, indent=None):
+    """Encodes obj with orjson when installed, else with the stdlib.
+
+    Both produce the same compact JSON, so responses do not depend on
+    which encoder a worker happens to have.
+    """
+    if orjson is not None:
+        # Dates go through _default to keep Flask's HTTP date format
+        option = orjson.OPT_PASSTHROUGH_DATETIME
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option)
+    return json.dumps(obj, default=_default, sort_keys=sort_keys,
+                      indent=indent, ensure_ascii=False,
+                      separators=None if indent else (',', ':'))
+
+
+def jsonify(*args, **kwargs):
+    """flask.jsonify built on dumps(), honoring JSON_SORT_KEYS and
+    JSONIFY_PRETTYPRINT_REGULAR"""
+    if args and kwargs:
+        raise TypeError('jsonify() takes either args or kwargs, not both')
+    data = args[0] if len(args) == 1 else args or kwargs
+    app = current_app
+    indent = 2 if app.config.get('JSONIFY_PRETTYPRINT_REGULAR') or \
+        app.debug else None
+    started = time.perf_counter()
+    body = dumps(data, sort_keys=app.config.get('JSON_SORT_KEYS', True),
+                 indent=indent)
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    if 'encode_seconds' in g:
+        # Requests timed by app.metrics
+        g.encode_seconds += time.perf_counter() - started
+    return app.response_class(
+        body + b'\n',
+        mimetype=app.config.get('JSONIFY_MIMETYPE', 'application/json'))
+
+
+def init_app(app):
+    """Makes dumps() the JSON provider of Flask 2.2 and later.
+
+    Older Flask versions have no provider hook; their views use jsonify()
+    from this module instead of flask.jsonify.
+    """
+    provider = getattr(flask_json, 'provider', None)
+    if provider is None:
+        return
+
+    class FastJSONProvider(provider.DefaultJSONProvider):
+        def dumps(self, obj, **kwargs):
+            body = dumps(obj, sort_keys=kwargs.get('sort_keys', False),
+                         indent=kwargs.get('indent'))
+            return body.decode('utf-8') if isinstance(body, bytes) else body
+
+    app.json = FastJSONProvider(app)
+
+
+def row_query(query, model, fields=None, sort='id'):
+    """Turns a query of model into a query of plain row tuples.
+
+    Only the columns behind fields (all of FIELD_COLUMNS by default) and
+    the sort columns, needed by keyset cursors, are selected. The rows
+    skip ORM instantiation and the identity map entirely and are turned
+    into dicts by model.format_row().
+    """
+    names = [model.FIELD_COLUMNS[field] for field in fields or
+             model.FIELD_COLUMNS]
+    columns, _ = sort_columns(model, sort)
+    names.extend(column.name for column in columns if column.name not in names)
+    return query.with_entities(*(getattr(model, name) for name in names))
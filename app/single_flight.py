@@ -0,0 +1,142 @@
+import os
+import threading
+from functools import wraps
+from urllib.parse import urlencode
+
+from flask import request, current_app
+
+from app.models import on_table_change
+
+SINGLE_FLIGHT = os.getenv('SINGLE_FLIGHT', 'false').lower() in \
+    ('1', 'true', 'yes')
+# Seconds a request waits for an identical one in flight before
+# running the view itself
+SINGLE_FLIGHT_TIMEOUT = float(os.getenv('SINGLE_FLIGHT_TIMEOUT', 5))
+
+# Request headers that change the response of an otherwise identical read
+VARYING_HEADERS = ('If-None-Match', 'If-Modified-Since')
+
+
+class Flight:
+    """One call in progress, and what its waiting callers get"""
+    __slots__ = ('tables', 'done', 'result', 'error')
+
+    def __init__(self, tables):
+        self.tables = tables
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Collapses concurrent identical calls into one.
+
+    The first caller of a key runs the call; callers arriving while it
+    is in flight wait for it and share its result, or its exception.
+    A caller that waits longer than the timeout gives up and runs the
+    call itself, so a stuck call never blocks the others for good.
+
+    A write to a table (see on_table_change) detaches the flights that
+    read it: they still answer the callers already waiting, but later
+    callers start a new flight and see the write.
+    """
+
+    def __init__(self, enabled=SINGLE_FLIGHT, timeout=SINGLE_FLIGHT_TIMEOUT):
+        self.enabled = enabled
+        self.timeout = timeout
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.shared = 0
+        self.timeouts = 0
+
+    def do(self, key, func, tables=(), timeout=None):
+        """Returns func(), or the result of the identical call in flight"""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Flight(frozenset(tables))
+                self.calls += 1
+        if leader:
+            try:
+                flight.result = func()
+                return flight.result
+            except BaseException as error:
+                flight.error = error
+                raise
+            finally:
+                with self._lock:
+                    if self._flights.get(key) is flight:
+                        del self._flights[key]
+                flight.done.set()
+        if not flight.done.wait(self.timeout if timeout is None else timeout):
+            with self._lock:
+                self.timeouts += 1
+            return func()
+        with self._lock:
+            self.shared += 1
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def invalidate(self, model, action=None):
+        table = getattr(model, '__tablename__', model)
+        with self._lock:
+            for key, flight in list(self._flights.items()):
+                if table in flight.tables:
+                    del self._flights[key]
+
+    def in_flight(self):
+        return len(self._flights)
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'calls': self.calls,
+            'shared': self.shared,
+            'timeouts': self.timeouts,
+            'in_flight': self.in_flight(),
+        }
+
+
+single_flight = SingleFlight()
+on_table_change(single_flight.invalidate)
+
+
+def request_key():
+    args = urlencode(sorted(request.args.items(multi=True)))
+    view_args = urlencode(sorted((request.view_args or {}).items()))
+    headers = '|'.join(request.headers.get(name, '')
+                       for name in VARYING_HEADERS)
+    return f'{request.endpoint}:{view_args}:{args}:{headers}'
+
+
+def coalesced(*models, timeout=None):
+    """Shares the response of a GET view between identical requests
+    running at the same time in this worker.
+
+    Only the first request runs the view; the others get a copy of its
+    status, headers and body, or its exception (a 404 stays a 404).
+    Writes to the tables of models stop new requests from joining a
+    view already running. Authorization must happen before, as every
+    request sharing a response must be allowed to see it.
+    """
+    tables = [model.__tablename__ for model in models]
+
+    def coalesced_decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if not single_flight.enabled:
+                return f(*args, **kwargs)
+
+            def render():
+                response = current_app.make_response(f(*args, **kwargs))
+                return (response.get_data(), response.status_code,
+                        list(response.headers.items()))
+            body, status, headers = single_flight.do(
+                request_key(), render, tables, timeout)
+            return current_app.response_class(body, status=status,
+                                              headers=headers)
+        return wrapper
+    return coalesced_decorator
@@ -0,0 +1,59 @@
+from datetime import date
+
+from dateutil.parser import parse
+
+# Columns managed by the database rather than by clients
+READ_ONLY_COLUMNS = ('id', 'created_at', 'updated_at', 'version')
+
+
+class ValidationError(Exception):
+    """Raised for column values a write cannot store"""
+    def __init__(self, message, status_code=422):
+        self.message = message
+        self.status_code = status_code
+
+
+def writable_columns(model):
+    return {column.name: column for column in model.__table__.columns
+            if column.name not in READ_ONLY_COLUMNS}
+
+
+def _coerce(column, value):
+    if value is None:
+        if not column.nullable:
+            raise ValidationError(f'{column.name} may not be null')
+        return value
+    python_type = column.type.python_type
+    if python_type is date and not isinstance(value, date):
+        try:
+            return parse(value).date()
+        except (ValueError, TypeError, OverflowError):
+            raise ValidationError(f'{column.name} must be a date')
+    if python_type is str and not isinstance(value, str):
+        raise ValidationError(f'{column.name} must be a string')
+    return value
+
+
+def validate_data(model, data, partial):
+    """Checks the column values of a create (or, partial, an update).
+
+    Returns:
+        dict: The values, dates parsed.
+    Raises ValidationError for unknown or read-only columns, missing
+    required columns and values of the wrong type.
+    """
+    columns = writable_columns(model)
+    if not isinstance(data, dict) or not data:
+        raise ValidationError('data must be a non-empty object')
+    unknown = set(data) - set(columns)
+    if unknown:
+        raise ValidationError(
+            f'unknown fields: {", ".join(sorted(unknown))}')
+    if not partial:
+        missing = [name for name, column in columns.items()
+                   if name not in data and not column.nullable and
+                   column.default is None and column.server_default is None]
+        if missing:
+            raise ValidationError(f'missing fields: {", ".join(missing)}')
+    return {name: _coerce(columns[name], value)
+            for name, value in data.items()}
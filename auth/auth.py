@@ -1,14 +1,73 @@
 import os
-import json
+import time
 from flask import request, _request_ctx_stack
 from functools import wraps
 from jose import jwt
-from urllib.request import urlopen
+
+from auth.jwks import JWKSKeyStore
+from auth.keys import JWKSKeyProvider, PinnedKeyProvider, LocalSigningProvider
+from auth.permissions import Permissions, granted_permissions
+from auth.token_cache import VerifiedTokenCache
 
 
 AUTH0_DOMAIN = os.getenv('AUTH0_DOMAIN')
 ALGORITHMS = os.getenv('ALGORITHMS')
 API_AUDIENCE = os.getenv('API_AUDIENCE')
+# Empty (as in .env-example) falls back to the Auth0 tenant's key set
+JWKS_URL = os.getenv('JWKS_URL') or \
+    f'https://{AUTH0_DOMAIN}/.well-known/jwks.json'
+JWKS_CACHE_TTL = int(os.getenv('JWKS_CACHE_TTL', 600))
+JWKS_MIN_REFRESH_INTERVAL = int(os.getenv('JWKS_MIN_REFRESH_INTERVAL', 30))
+
+jwks_store = JWKSKeyStore(
+    JWKS_URL,
+    ttl=JWKS_CACHE_TTL,
+    min_refresh_interval=JWKS_MIN_REFRESH_INTERVAL)
+
+# jwks (Auth0, through jwks_store), pinned (the JWKS file at
+# AUTH_PINNED_JWKS, no network) or local (keys generated at startup,
+# tokens minted with key_provider.mint(), for tests and benchmarks)
+AUTH_KEY_PROVIDER = os.getenv('AUTH_KEY_PROVIDER', 'jwks')
+AUTH_PINNED_JWKS = os.getenv('AUTH_PINNED_JWKS')
+
+
+def create_key_provider(name=AUTH_KEY_PROVIDER):
+    if name == 'pinned':
+        return PinnedKeyProvider(AUTH_PINNED_JWKS)
+    if name == 'local':
+        return LocalSigningProvider(issuer=f'https://{AUTH0_DOMAIN}/',
+                                    audience=API_AUDIENCE)
+    return JWKSKeyProvider(jwks_store)
+
+
+key_provider = create_key_provider()
+
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 1024))
+TOKEN_CACHE_MAX_TTL = int(os.getenv('TOKEN_CACHE_MAX_TTL', 3600))
+
+token_cache = VerifiedTokenCache(
+    maxsize=TOKEN_CACHE_SIZE,
+    max_ttl=TOKEN_CACHE_MAX_TTL)
+
+_authentication_listeners = []
+
+
+def on_authentication(listener):
+    '''Registers listener(outcome, cache, seconds) to run after each
+    authentication: outcome is 'ok' or the AuthError code, cache 'hit',
+    'miss' or 'none' when no token was read.'''
+    _authentication_listeners.append(listener)
+    return listener
+
+
+def notify_authentication(outcome, cached, started):
+    if not _authentication_listeners:
+        return
+    seconds = time.perf_counter() - started
+    cache = 'none' if cached is None else 'hit' if cached else 'miss'
+    for listener in _authentication_listeners:
+        listener(outcome, cache, seconds)
+
 
 # AuthError Exception
 '''
@@ -40,7 +99,14 @@ def get_token_from_auth_header():
     Returns:
         str: The token string.
     '''
-    headers = request.headers.get('Authorization', None)
+    return parse_auth_header(request.headers.get('Authorization', None))
+
+
+def parse_auth_header(headers):
+    '''Extracts the bearer token from an Authorization header value.
+    Returns:
+        str: The token string.
+    '''
     if not headers:
         raise AuthError({
                 'code': 'invalid_header',
@@ -80,14 +146,20 @@ def get_token_from_auth_header():
 '''
 
 
-def check_permissions(permission, payload):
-    if 'permissions' not in payload:
+def check_permissions(permission, payload, granted=None):
+    '''`permission` is a permission string or compiled Permissions, and
+    `granted` the payload's granted_permissions(), when already known.'''
+    if granted is None:
+        granted = granted_permissions(payload)
+    if granted is None:
         raise AuthError({
             'code': 'invalid_payload',
             'description': 'Permissions not included in JWT payload'
         }, 400)
 
-    if permission not in payload['permissions']:
+    if not isinstance(permission, Permissions):
+        permission = Permissions(permission)
+    if not permission.allows(granted):
         raise AuthError({
             'code': 'forbidden',
             'description': 'Permission not found'
@@ -102,6 +174,7 @@ def check_permissions(permission, payload):
 
     it should be an Auth0 token with key id (kid)
     it should verify the token using Auth0 /.well-known/jwks.json
+        (the parsed key of its kid, from key_provider)
     it should decode the payload from the token
     it should validate the claims
     return the decoded payload
@@ -113,11 +186,7 @@ def check_permissions(permission, payload):
 '''
 
 
-def verify_decode_jwt(token):
-    # Get public key from Auth0
-    jsonurl = urlopen(f'https://{AUTH0_DOMAIN}/.well-known/jwks.json')
-    jwks = json.loads(jsonurl.read())
-
+def get_key_id(token):
     # Get the data in the header
     unverified_header = jwt.get_unverified_header(token)
 
@@ -127,27 +196,17 @@ def verify_decode_jwt(token):
             'code': 'invalid_header',
             'description': 'Authorization malformed'
         }, 401)
+    return unverified_header['kid']
+
 
-    rsa_key = {}
-
-    for key in jwks['keys']:
-        if key['kid'] == unverified_header['kid']:
-            rsa_key = {
-                'kty': key['kty'],
-                'kid': key['kid'],
-                'use': key['use'],
-                'n': key['n'],
-                'e': key['e']
-            }
-            break
-
-    # verify the token
-    if rsa_key:
+def decode_jwt(token, key):
+    # key is the parsed public key of the token's kid, if known
+    if key is not None:
         try:
-            # Validate the token using the rsa_key
+            # Validate the token; a tuple keeps jose from re-parsing key
             payload = jwt.decode(
                 token,
-                rsa_key,
+                (key,),
                 algorithms=ALGORITHMS,
                 audience=API_AUDIENCE,
                 issuer=f'https://{AUTH0_DOMAIN}/'
@@ -182,27 +241,99 @@ def verify_decode_jwt(token):
     }, 400)
 
 
+def verify_decode_jwt(token):
+    return decode_jwt(token, key_provider.get_key(get_key_id(token)))
+
+
+async def verify_decode_jwt_async(token):
+    '''verify_decode_jwt() that never blocks the event loop on Auth0.'''
+    return decode_jwt(token,
+                      await key_provider.get_key_async(get_key_id(token)))
+
+
 '''
 @TODO implement @requires_auth(permission) decorator method
     @INPUTS
         permission: string permission (i.e. 'post:drink')
+        any_of: permissions of which the token needs at least one
+        all_of: permissions the token needs every one of
 
     it should use the get_token_auth_header method to get the token
     it should use the verify_decode_jwt method to decode the jwt
+        unless the token was already verified and is in token_cache
     it should use the check_permissions method validate claims
     and check the requested permission
+        an empty permission only requires a valid token, leaving the
+        checks to the decorated method (see get_current_payload)
     return the decorator which passes the
     decoded payload to the decorated method
 '''
 
 
-def requires_auth(permission=''):
+def requires_auth(permission='', any_of=(), all_of=()):
+    required = Permissions(permission, any_of, all_of)
+
     def requires_auth_decorator(f):
         @wraps(f)
         def wrapper(*args, **kwargs):
-            token = get_token_from_auth_header()
-            payload = verify_decode_jwt(token)
-            check_permissions(permission, payload)
+            started = time.perf_counter()
+            cached = None
+            try:
+                token = get_token_from_auth_header()
+                payload, granted = token_cache.lookup(token)
+                cached = payload is not None
+                if not cached:
+                    payload = verify_decode_jwt(token)
+                    granted = granted_permissions(payload)
+                    token_cache.put(token, payload, granted)
+                if required:
+                    check_permissions(required, payload, granted)
+            except Exception as error:
+                notify_authentication(
+                    error.error['code'] if isinstance(error, AuthError)
+                    else 'error', cached, started)
+                raise
+            notify_authentication('ok', cached, started)
+            _request_ctx_stack.top.current_user = payload
+            _request_ctx_stack.top.current_permissions = granted
             return f(*args, **kwargs)
         return wrapper
     return requires_auth_decorator
+
+
+async def authenticate_async(authorization, permission=''):
+    '''requires_auth() for ASGI handlers; `permission` may be compiled
+    Permissions.
+    Returns:
+        dict: The verified payload of the token in `authorization`.
+    '''
+    started = time.perf_counter()
+    cached = None
+    try:
+        token = parse_auth_header(authorization)
+        payload, granted = token_cache.lookup(token)
+        cached = payload is not None
+        if not cached:
+            payload = await verify_decode_jwt_async(token)
+            granted = granted_permissions(payload)
+            token_cache.put(token, payload, granted)
+        if permission:
+            check_permissions(permission, payload, granted)
+    except Exception as error:
+        notify_authentication(
+            error.error['code'] if isinstance(error, AuthError)
+            else 'error', cached, started)
+        raise
+    notify_authentication('ok', cached, started)
+    return payload
+
+
+def get_current_payload():
+    '''Returns the verified JWT payload of the current request.'''
+    return getattr(_request_ctx_stack.top, 'current_user', None)
+
+
+def get_current_permissions():
+    '''Returns the permissions of the current request's token as a
+    frozenset, or None if its payload has none.'''
+    return getattr(_request_ctx_stack.top, 'current_permissions', None)
@@ -0,0 +1,186 @@
+import json
+import asyncio
+import logging
+import threading
+import time
+from urllib.request import urlopen
+
+from auth.keys import public_keys
+
+logger = logging.getLogger(__name__)
+
+
+class JWKSKeyStore:
+    '''In-process cache of a JSON Web Key Set, indexed by key id (kid).
+
+    - Keys older than `ttl` seconds are refreshed in a background thread
+      while the stale set keeps answering lookups (stale-while-revalidate).
+    - A lookup for an unknown kid forces a synchronous refresh.
+    - Fetches of every kind (first load, background and forced refreshes)
+      start at most once every `min_refresh_interval` seconds, so neither
+      a flood of tokens carrying bogus kids nor a failing key endpoint
+      can hammer it.
+    - Only the very first lookup blocks on the network; while it keeps
+      failing, lookups find no key rather than retrying it.
+    - RSA keys are parsed once per refresh, for get_public_key().
+    - Fetching and parsing run without the lock lookups take, so a
+      stale lookup never waits for the network.
+
+    `url` may be any URL understood by urlopen, including `file://` paths,
+    which makes the store usable with a local JWKS file.
+    '''
+
+    def __init__(self, url, ttl=600, min_refresh_interval=30, timeout=5):
+        self.url = url
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self._keys = {}
+        self._public_keys = {}
+        self._fetched_at = None
+        self._last_attempt = None
+        # Guards the state above, never held during a fetch
+        self._lock = threading.Lock()
+        # Lets one first load or forced refresh fetch at a time
+        self._fetch_lock = threading.Lock()
+        self._refreshing = False
+
+    def fetch(self):
+        '''Downloads and parses the key set.
+        Returns:
+            dict: The JWKS document.
+        '''
+        with urlopen(self.url, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+    def refresh(self):
+        '''Fetches the key set and swaps in a new kid index.'''
+        with self._lock:
+            self._last_attempt = time.monotonic()
+        self._swap(self.fetch())
+
+    def _swap(self, jwks):
+        # Parsed outside the lock; only the swap itself holds it, so
+        # lookups never wait on the network or on key parsing
+        parsed = public_keys(jwks)
+        keys = {
+            key['kid']: key for key in jwks.get('keys', []) if 'kid' in key
+        }
+        with self._lock:
+            # Parsed keys first: a kid found in _keys is always parsed too
+            self._public_keys = parsed
+            self._keys = keys
+            self._fetched_at = time.monotonic()
+
+    def _attempt_allowed_locked(self):
+        last = self._last_attempt
+        return last is None or \
+            time.monotonic() - last >= self.min_refresh_interval
+
+    def _claim_attempt(self):
+        '''Records a fetch attempt if min_refresh_interval allows one.
+        Returns:
+            bool: Whether the caller may fetch now.
+        '''
+        with self._lock:
+            if not self._attempt_allowed_locked():
+                return False
+            self._last_attempt = time.monotonic()
+            return True
+
+    def _background_refresh(self):
+        try:
+            self._swap(self.fetch())
+        except Exception:
+            logger.exception('Background JWKS refresh from %s failed',
+                             self.url)
+        finally:
+            self._refreshing = False
+
+    def _schedule_refresh(self):
+        # Never waits: a stale lookup that finds the lock taken keeps
+        # its key, a later one schedules the refresh
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            scheduled = not self._refreshing and \
+                self._attempt_allowed_locked()
+            if scheduled:
+                self._refreshing = True
+                self._last_attempt = time.monotonic()
+        finally:
+            self._lock.release()
+        if scheduled:
+            thread = threading.Thread(target=self._background_refresh,
+                                      name='jwks-refresh', daemon=True)
+            thread.start()
+
+    def _load_initial(self):
+        with self._fetch_lock:
+            # Another thread may have finished the first fetch meanwhile
+            if self._fetched_at is None and self._claim_attempt():
+                self._swap(self.fetch())
+
+    def _force_refresh(self):
+        with self._fetch_lock:
+            if not self._claim_attempt():
+                return
+            try:
+                self._swap(self.fetch())
+            except Exception:
+                logger.exception('Forced JWKS refresh from %s failed',
+                                 self.url)
+
+    def get_key(self, kid):
+        '''Looks up a key by its id.
+        Returns:
+            dict: The JWK, or None if the key set does not contain `kid`.
+        '''
+        if self._fetched_at is None:
+            self._load_initial()
+        elif time.monotonic() - self._fetched_at > self.ttl:
+            self._schedule_refresh()
+
+        key = self._keys.get(kid)
+        if key is None:
+            self._force_refresh()
+            key = self._keys.get(kid)
+        return key
+
+    async def get_key_async(self, kid):
+        '''get_key() for coroutines: never blocks the event loop.
+
+        Keys already cached are returned at once (scheduling the usual
+        background refresh when stale); first loads and forced refreshes
+        run in the loop's default executor.
+        '''
+        key = self._keys.get(kid)
+        if key is not None and self._fetched_at is not None:
+            if time.monotonic() - self._fetched_at > self.ttl:
+                self._schedule_refresh()
+            return key
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.get_key, kid)
+
+    def get_public_key(self, kid):
+        '''get_key(), parsed.
+        Returns:
+            The key, as returned by auth.keys.public_key(), or None if
+            the key set has no RSA signing key `kid`.
+        '''
+        if self.get_key(kid) is None:
+            return None
+        return self._public_keys.get(kid)
+
+    async def get_public_key_async(self, kid):
+        if await self.get_key_async(kid) is None:
+            return None
+        return self._public_keys.get(kid)
+
+    def clear(self):
+        '''Drops the cached keys so the next lookup fetches them again.'''
+        with self._lock:
+            self._keys = {}
+            self._public_keys = {}
+            self._fetched_at = None
+            self._last_attempt = None
@@ -0,0 +1,153 @@
+'''
+Key providers hand verify_decode_jwt() the public key of a token's kid,
+already parsed, so verifying a token never re-parses its JWK:
+
+- JWKSKeyProvider reads Auth0's key set through the JWKSKeyStore cache.
+- PinnedKeyProvider reads a JWKS file once, and never uses the network.
+- LocalSigningProvider generates its own key pair and mints the tokens
+  it verifies, for tests and benchmarks.
+
+Each provides get_key(kid) and get_key_async(kid), returning None for
+unknown key ids.
+'''
+import json
+import time
+import base64
+import logging
+
+from jose import jwt
+from jose.backends import RSAKey
+from jose.constants import ALGORITHMS
+from jose.exceptions import JWKError
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+logger = logging.getLogger(__name__)
+
+
+def _int_to_b64(number):
+    data = number.to_bytes((number.bit_length() + 7) // 8, 'big')
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def public_key(jwk):
+    '''Parses an RSA JWK into the native key of jose's RSA backend
+    (cryptography, or python-rsa when cryptography is unavailable), which
+    jwt.decode() uses as is.
+    Returns:
+        The key, or None if the JWK is not a usable RSA signing key.
+    '''
+    if jwk.get('kty') != 'RSA' or jwk.get('use', 'sig') != 'sig':
+        return None
+    try:
+        key = RSAKey(jwk, ALGORITHMS.RS256)
+    except (JWKError, KeyError, ValueError, TypeError):
+        logger.warning('Ignoring unparsable JWK %s', jwk.get('kid'))
+        return None
+    # The cryptography backend exposes its key, the python-rsa one does not
+    return getattr(key, 'prepared_key', None) or key._prepared_key
+
+
+def public_keys(jwks):
+    '''Parses every RSA signing key of a JWKS document.
+    Returns:
+        dict: kid -> key, as returned by public_key().
+    '''
+    keys = {}
+    for jwk in jwks.get('keys', []):
+        if 'kid' in jwk:
+            key = public_key(jwk)
+            if key is not None:
+                keys[jwk['kid']] = key
+    return keys
+
+
+class JWKSKeyProvider:
+    '''Keys of a JWKSKeyStore, parsed once per key set refresh.'''
+
+    def __init__(self, store):
+        self.store = store
+
+    def get_key(self, kid):
+        return self.store.get_public_key(kid)
+
+    async def get_key_async(self, kid):
+        return await self.store.get_public_key_async(kid)
+
+
+class PinnedKeyProvider:
+    '''Keys of a JWKS file, loaded and parsed when created.
+
+    Rotating keys means updating the file and restarting the workers.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        with open(path) as jwks_file:
+            self.keys = public_keys(json.load(jwks_file))
+        if not self.keys:
+            raise ValueError(f'{path} holds no RSA signing key')
+
+    def get_key(self, kid):
+        return self.keys.get(kid)
+
+    async def get_key_async(self, kid):
+        return self.keys.get(kid)
+
+
+class LocalSigningProvider:
+    '''Generates an RSA key pair and mints tokens the API will accept.
+
+    `issuer` and `audience` must match the ones verify_decode_jwt()
+    checks; no audience claim is added when audience is None.
+    '''
+
+    def __init__(self, kid='local-key', issuer=None, audience=None,
+                 key_size=2048):
+        self.kid = kid
+        self.issuer = issuer
+        self.audience = audience
+        self.private_key = rsa.generate_private_key(
+            public_exponent=65537, key_size=key_size,
+            backend=default_backend())
+        self.private_pem = self.private_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption())
+        self.public_key = public_key(self.jwks()['keys'][0])
+
+    def get_key(self, kid):
+        return self.public_key if kid == self.kid else None
+
+    async def get_key_async(self, kid):
+        return self.get_key(kid)
+
+    def jwks(self):
+        numbers = self.private_key.public_key().public_numbers()
+        return {'keys': [{
+            'kty': 'RSA',
+            'kid': self.kid,
+            'use': 'sig',
+            'alg': 'RS256',
+            'n': _int_to_b64(numbers.n),
+            'e': _int_to_b64(numbers.e),
+        }]}
+
+    def write_jwks(self, path):
+        with open(path, 'w') as jwks_file:
+            json.dump(self.jwks(), jwks_file)
+
+    def mint(self, permissions=(), ttl=3600, subject='local'):
+        now = int(time.time())
+        claims = {
+            'iss': self.issuer,
+            'sub': subject,
+            'iat': now,
+            'exp': now + ttl,
+            'permissions': list(permissions),
+        }
+        if self.audience is not None:
+            claims['aud'] = self.audience
+        return jwt.encode(claims, self.private_pem, algorithm='RS256',
+                          headers={'kid': self.kid})
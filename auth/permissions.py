@@ -0,0 +1,39 @@
+def granted_permissions(payload):
+    '''The `permissions` claim of a verified payload as a frozenset.
+    Returns:
+        frozenset: The permissions, or None if the claim is missing.
+    '''
+    permissions = payload.get('permissions')
+    if permissions is None:
+        return None
+    return frozenset(permissions)
+
+
+class Permissions:
+    '''Permissions an endpoint requires, compiled once when it is decorated.
+
+    A token is allowed when it holds every permission of `all_of` (which
+    includes `permission`) and, if `any_of` is not empty, at least one of
+    `any_of`. allows() takes granted_permissions() of the token, so the
+    check neither scans a list nor allocates.
+    '''
+    __slots__ = ('all_of', 'any_of')
+
+    def __init__(self, permission='', any_of=(), all_of=()):
+        if isinstance(any_of, str) or isinstance(all_of, str):
+            raise TypeError('any_of and all_of take a collection of '
+                            'permissions, not a string')
+        self.all_of = frozenset(all_of) | \
+            (frozenset((permission,)) if permission else frozenset())
+        self.any_of = frozenset(any_of)
+
+    def __bool__(self):
+        return bool(self.all_of or self.any_of)
+
+    def __repr__(self):
+        return f'Permissions(all_of={sorted(self.all_of)}, ' \
+            f'any_of={sorted(self.any_of)})'
+
+    def allows(self, granted):
+        return self.all_of <= granted and \
+            (not self.any_of or not self.any_of.isdisjoint(granted))
@@ -0,0 +1,88 @@
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class VerifiedTokenCache:
+    '''Bounded LRU cache of already verified JWT payloads.
+
+    Entries are keyed by a SHA-256 digest of the raw token, so the bearer
+    tokens themselves are never held in memory, and are dropped once the
+    token's `exp` claim (capped at `max_ttl` seconds) has passed.
+
+    Each payload is kept with its permissions compiled to a frozenset (see
+    auth.permissions), so cache hits skip that work too.
+    '''
+
+    def __init__(self, maxsize=1024, max_ttl=3600, clock=time.time):
+        self.maxsize = maxsize
+        self.max_ttl = max_ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _key(token):
+        return hashlib.sha256(token.encode('utf-8')).digest()
+
+    def get(self, token):
+        '''Returns the cached payload for `token`, or None on a miss.'''
+        return self.lookup(token)[0]
+
+    def lookup(self, token):
+        '''Returns the cached (payload, permissions) for `token`, or
+        (None, None) on a miss.'''
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, None
+            payload, permissions, expires_at = entry
+            if expires_at <= self.clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload, permissions
+
+    def put(self, token, payload, permissions=None):
+        '''Caches a verified payload, and the permissions compiled from
+        it, until the token expires.'''
+        if self.maxsize <= 0:
+            return
+        now = self.clock()
+        expires_at = now + self.max_ttl
+        if 'exp' in payload:
+            expires_at = min(expires_at, payload['exp'])
+        if expires_at <= now:
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (payload, permissions, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        '''Returns the cache counters as a dict.'''
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
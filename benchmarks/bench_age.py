@@ -0,0 +1,54 @@
+'''
+Ages of a 10,000 row page: the former per-row datetime.now() and
+timedelta division, per-row calendar ages, and the batched ages of
+app.age (plain Python and NumPy).
+
+    python -m benchmarks.bench_age [iterations] [rows]
+'''
+import sys
+from datetime import datetime, timedelta
+from unittest import mock
+
+from benchmarks.common import (
+    configure_environment, actor_rows, timed, summarize, report)
+
+configure_environment()
+
+from app import app, age  # noqa: E402
+from app.age import age_on, ages  # noqa: E402
+
+
+def main(iterations=50, rows=10000):
+    dobs = [row['dob'] for row in actor_rows(0, rows)]
+    day = datetime.now().date()
+
+    def per_row_timedelta():
+        return [(datetime.now().date() - dob) //
+                timedelta(days=365.2425) for dob in dobs]
+
+    def per_row_calendar():
+        return [age_on(dob, day) for dob in dobs]
+
+    def batch_python():
+        with mock.patch.object(age, 'numpy', None):
+            return ages(dobs, day)
+
+    def batch_numpy():
+        with mock.patch.object(age, 'AGE_NUMPY_THRESHOLD', 0):
+            return ages(dobs, day)
+
+    cases = {
+        'per row, now() + timedelta': per_row_timedelta,
+        'per row, calendar': per_row_calendar,
+        'batch, python': batch_python,
+    }
+    if age.numpy is not None:
+        cases['batch, numpy'] = batch_numpy
+    with app.test_request_context():
+        report(f'Ages of {rows:,} actors', {
+            label: summarize(timed(func, iterations))
+            for label, func in cases.items()})
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,88 @@
+'''
+Per-request cost of the requires_auth wrapper with and without the
+verified-token cache, of decoding a token with its JWK parsed per call
+or parsed once by the key provider, and of the permission check with
+and without the permissions compiled once per token.
+
+    python -m benchmarks.bench_auth [iterations]
+'''
+import sys
+
+from benchmarks.common import configure_environment, timed, summarize, report
+
+signer = configure_environment()
+
+from flask import Flask  # noqa: E402
+from jose import jwt  # noqa: E402
+from auth import auth  # noqa: E402
+from auth.permissions import Permissions, granted_permissions  # noqa: E402
+
+
+def main(iterations=2000):
+    app = Flask(__name__)
+    token = signer.mint()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    @auth.requires_auth(permission='get:actors')
+    def endpoint():
+        return None
+
+    @auth.requires_auth(any_of=['post:movies', 'patch:movies'],
+                        all_of=['get:actors', 'get:movies'])
+    def any_of_endpoint():
+        return None
+
+    def call():
+        with app.test_request_context('/', headers=headers):
+            endpoint()
+
+    def call_any_of():
+        with app.test_request_context('/', headers=headers):
+            any_of_endpoint()
+
+    def uncached():
+        auth.token_cache.clear()
+        call()
+
+    jwk = signer.jwks()['keys'][0]
+
+    def decode_jwk():
+        jwt.decode(token, jwk, algorithms=auth.ALGORITHMS,
+                   audience=auth.API_AUDIENCE,
+                   issuer=f'https://{auth.AUTH0_DOMAIN}/')
+
+    def decode_parsed():
+        auth.decode_jwt(token, signer.get_key(signer.kid))
+
+    payload = auth.verify_decode_jwt(token)
+    required = Permissions('get:actors')
+    granted = granted_permissions(payload)
+
+    def check_string():
+        auth.check_permissions('get:actors', payload)
+
+    def check_compiled():
+        auth.check_permissions(required, payload, granted)
+
+    # Warm the JWKS store so neither case pays for the first key fetch
+    call()
+    rows = {
+        'verify every request': summarize(timed(uncached, iterations)),
+        'verified-token cache hit': summarize(timed(call, iterations)),
+        'cache hit, any_of + all_of': summarize(
+            timed(call_any_of, iterations)),
+        'check, permission string': summarize(
+            timed(check_string, iterations)),
+        'check, compiled permissions': summarize(
+            timed(check_compiled, iterations)),
+        'decode, JWK parsed per call': summarize(
+            timed(decode_jwk, iterations)),
+        'decode, key parsed once': summarize(
+            timed(decode_parsed, iterations)),
+    }
+    report(f'requires_auth, {iterations} calls', rows)
+    print('token cache:', auth.token_cache.stats())
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
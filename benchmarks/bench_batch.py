@@ -0,0 +1,63 @@
+'''
+Fetching 500 actors: one GET /api/v1/actors/<id> per actor against a
+single GET /api/v1/actors?ids=..., in latency and queries per fetch.
+
+    python -m benchmarks.bench_batch [iterations] [ids]
+'''
+import os
+import sys
+
+from sqlalchemy import event
+
+from benchmarks.common import (
+    configure_environment, seed, actor_rows, timed, summarize, report)
+
+signer = configure_environment()
+IDS = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+os.environ.setdefault('BATCH_MAX_IDS', str(IDS))
+
+from app import app  # noqa: E402
+from app.models import db, Actor  # noqa: E402
+
+
+def main(iterations=10, ids=IDS):
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {signer.mint()}'}
+    queries = {'count': 0}
+
+    def count(*args):
+        queries['count'] += 1
+
+    with app.app_context():
+        db.create_all()
+        seed(Actor, actor_rows, ids)
+        actor_ids = [id for id, in db.session.query(Actor.id).limit(ids)]
+    path = f"/api/v1/actors?ids={','.join(map(str, actor_ids))}"
+
+    def single():
+        for id in actor_ids:
+            response = client.get(f'/api/v1/actors/{id}', headers=headers)
+            assert response.status_code == 200, response.data
+
+    def batch():
+        response = client.get(path, headers=headers)
+        assert response.status_code == 200, response.data
+
+    rows = {}
+    per_fetch = {}
+    for label, func in ((f'{ids} single GETs', single),
+                        ('one ?ids= GET', batch)):
+        func()
+        event.listen(db.engine, 'before_cursor_execute', count)
+        queries['count'] = 0
+        func()
+        per_fetch[label] = queries['count']
+        event.remove(db.engine, 'before_cursor_execute', count)
+        rows[label] = summarize(timed(func, iterations))
+    report(f'{ids} actors by id', rows)
+    for label, count_ in per_fetch.items():
+        print(f'{label:<32}{count_:>8} queries per fetch')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
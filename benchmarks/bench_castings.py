@@ -0,0 +1,78 @@
+'''
+Listing 100 movies with large casts: eager loading against per-movie
+lazy loads (the N+1 pattern), in latency and queries per listing.
+
+    python -m benchmarks.bench_castings [iterations] [cast_size]
+'''
+import sys
+
+from sqlalchemy import event
+
+from benchmarks.common import (
+    configure_environment, seed, actor_rows, movie_rows, timed, summarize,
+    report)
+
+signer = configure_environment()
+
+from app import app  # noqa: E402
+from app.models import db, Actor, Movie, Casting  # noqa: E402
+
+MOVIES = 100
+
+
+def seed_castings(cast_size):
+    if db.session.query(Casting).count():
+        return
+    actor_ids = [id for id, in db.session.query(Actor.id).limit(cast_size)]
+    movie_ids = [id for id, in db.session.query(Movie.id).limit(MOVIES)]
+    db.session.execute(Casting.__table__.insert(), [
+        {'movie_id': movie_id, 'actor_id': actor_id, 'role': f'Role {order}',
+         'billing_order': order}
+        for movie_id in movie_ids
+        for order, actor_id in enumerate(actor_ids)])
+    db.session.commit()
+
+
+def main(iterations=30, cast_size=50):
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {signer.mint()}'}
+    queries = {'count': 0}
+
+    def count(*args):
+        queries['count'] += 1
+
+    with app.app_context():
+        db.create_all()
+        seed(Actor, actor_rows, cast_size)
+        seed(Movie, movie_rows, MOVIES)
+        seed_castings(cast_size)
+
+        def eager():
+            response = client.get(
+                f'/api/v1/movies?include=cast&limit={MOVIES}&count=cached',
+                headers=headers)
+            assert response.status_code == 200, response.data
+
+        def lazy():
+            movies = Movie.query.limit(MOVIES).all()
+            [movie.format_with_cast() for movie in movies]
+            db.session.remove()
+
+        rows = {}
+        per_listing = {}
+        for label, func in (('include=cast (eager)', eager),
+                            ('lazy loading (N+1)', lazy)):
+            func()
+            event.listen(db.engine, 'before_cursor_execute', count)
+            queries['count'] = 0
+            func()
+            per_listing[label] = queries['count']
+            event.remove(db.engine, 'before_cursor_execute', count)
+            rows[label] = summarize(timed(func, iterations))
+        report(f'{MOVIES} movies x {cast_size} cast members', rows)
+        for label, count_ in per_listing.items():
+            print(f'{label:<32}{count_:>8} queries per listing')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,82 @@
+'''
+Editing an actor: loading the row then flushing the changed attributes
+(the database work of the former PATCH) against the PATCH endpoint's
+single UPDATE, with and without If-Match, in latency and statements
+per edit.
+
+    python -m benchmarks.bench_conditional_update [iterations]
+
+Set BENCH_DATABASE_URI to a local PostgreSQL database for realistic
+numbers: SQLite has no UPDATE ... RETURNING and reads the row back.
+'''
+import sys
+
+from sqlalchemy import event
+
+from benchmarks.common import (
+    configure_environment, seed, actor_rows, timed, summarize, report)
+
+signer = configure_environment()
+
+from app import app  # noqa: E402
+from app.models import db, Actor  # noqa: E402
+
+
+def main(iterations=500):
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {signer.mint()}',
+               'Content-Type': 'application/json'}
+    statements = {'count': 0}
+
+    def count(*args):
+        statements['count'] += 1
+
+    with app.app_context():
+        db.create_all()
+        seed(Actor, actor_rows, 100)
+        id = db.session.query(Actor.id).first().id
+
+        def load_and_update():
+            actor = Actor.query.get(id)
+            actor.name = 'Loaded'
+            actor.update()
+            db.session.remove()
+
+        etag = {}
+
+        def conditional_update():
+            if not etag:
+                etag['value'] = client.get(f'/api/v1/actors/{id}',
+                                           headers=headers).headers['ETag']
+            # Each edit sends the ETag the previous one returned
+            response = client.patch(
+                f'/api/v1/actors/{id}', data='{"name": "Conditional"}',
+                headers=dict(headers, **{'If-Match': etag['value']}))
+            assert response.status_code == 200, response.data
+            etag['value'] = response.headers['ETag']
+
+        def unconditional_update():
+            response = client.patch(
+                f'/api/v1/actors/{id}', data='{"name": "Unconditional"}',
+                headers=headers)
+            assert response.status_code == 200, response.data
+
+        rows = {}
+        per_edit = {}
+        for label, func in (('load, then update()', load_and_update),
+                            ('PATCH', unconditional_update),
+                            ('PATCH with If-Match', conditional_update)):
+            func()
+            event.listen(db.engine, 'before_cursor_execute', count)
+            statements['count'] = 0
+            func()
+            per_edit[label] = statements['count']
+            event.remove(db.engine, 'before_cursor_execute', count)
+            rows[label] = summarize(timed(func, iterations))
+    report(f'{iterations} edits of one actor', rows)
+    for label, count_ in per_edit.items():
+        print(f'{label:<32}{count_:>8} statements per edit')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,52 @@
+'''
+List endpoint latency as the actors table grows, per count strategy.
+
+    python -m benchmarks.bench_counts [iterations] [max_rows]
+
+The legacy `len(Actor.query.all())` total is only measured up to
+100,000 rows; past that a single call takes seconds.
+'''
+import sys
+
+from benchmarks.common import (
+    configure_environment, seed, actor_rows, timed, summarize, report)
+
+signer = configure_environment()
+
+from app import app  # noqa: E402
+from app.models import db, Actor  # noqa: E402
+
+SIZES = (1000, 10000, 100000, 1000000)
+LEGACY_MAX = 100000
+
+
+def main(iterations=20, max_rows=SIZES[-1]):
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {signer.mint()}'}
+    with app.app_context():
+        db.create_all()
+        for size in SIZES:
+            if size > max_rows:
+                break
+            seed(Actor, actor_rows, size)
+            rows = {}
+            for strategy in ('exact', 'cached', 'approximate'):
+                url = f'/api/v1/actors?page=1&count={strategy}'
+
+                def get():
+                    response = client.get(url, headers=headers)
+                    assert response.status_code == 200, response.data
+                rows[strategy] = summarize(timed(get, iterations))
+            if size <= LEGACY_MAX:
+                def legacy():
+                    Actor.query.offset(0).limit(10).all()
+                    len(Actor.query.all())
+                    db.session.remove()
+                rows['legacy len(query.all())'] = summarize(
+                    timed(legacy, max(1, iterations // 4)))
+            report(f'GET /api/v1/actors with {size:,} rows', rows)
+            print()
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,72 @@
+'''
+Latency and query plans of the list filters over a large table.
+Each case prints the plan of its SELECT so it is visible which index
+answers it (EXPLAIN on PostgreSQL, EXPLAIN QUERY PLAN on SQLite).
+
+    python -m benchmarks.bench_filters [iterations] [rows]
+'''
+import sys
+
+from benchmarks.common import (
+    configure_environment, seed, actor_rows, movie_rows, timed, summarize,
+    report)
+
+signer = configure_environment()
+
+from app import app  # noqa: E402
+from app.models import db, Actor, Movie  # noqa: E402
+from app.filters import list_criteria  # noqa: E402
+from app.pagination import order_by_sort  # noqa: E402
+
+CASES = {
+    'gender + age range': (
+        Actor, '/api/v1/actors',
+        {'gender': 'female', 'min_age': '30', 'max_age': '35'}),
+    'name prefix': (Actor, '/api/v1/actors', {'name_prefix': 'actor 00012'}),
+    'sort by -dob': (Actor, '/api/v1/actors', {'sort': '-dob'}),
+    'released after, by date': (
+        Movie, '/api/v1/movies', {'released_after': '2018-06-01',
+                                  'sort': 'release_date'}),
+    'title prefix, sort by title': (
+        Movie, '/api/v1/movies', {'title_prefix': 'movie 0004',
+                                  'sort': 'title'}),
+}
+
+
+def explain(model, args):
+    query = order_by_sort(model.query.filter(*list_criteria(model, args)),
+                          model, args.get('sort', 'id')).limit(10)
+    statement = query.statement.compile(
+        db.engine, compile_kwargs={'literal_binds': True})
+    prefix = 'EXPLAIN QUERY PLAN' if db.engine.dialect.name == 'sqlite' \
+        else 'EXPLAIN'
+    rows = db.session.execute(f'{prefix} {statement}').fetchall()
+    return [' '.join(str(value) for value in row) for row in rows]
+
+
+def main(iterations=50, rows=200000):
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {signer.mint()}'}
+    with app.app_context():
+        db.create_all()
+        seed(Actor, actor_rows, rows)
+        seed(Movie, movie_rows, rows)
+        db.session.execute('ANALYZE')
+        db.session.commit()
+        results = {}
+        for label, (model, url, args) in CASES.items():
+            query = '&'.join(f'{key}={value}' for key, value in args.items())
+
+            def get():
+                response = client.get(f'{url}?{query}&count=cached',
+                                      headers=headers)
+                assert response.status_code in (200, 404), response.data
+            results[label] = summarize(timed(get, iterations))
+            print(f'{label}: {url}?{query}')
+            for line in explain(model, args):
+                print(f'    {line}')
+        report(f'Filtered listings over {rows:,} rows', results)
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
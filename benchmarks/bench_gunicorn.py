@@ -0,0 +1,76 @@
+'''
+Sweeps gunicorn worker and thread counts: each combination serves the
+same keep-alive load through gunicorn.conf.py, and the table shows
+throughput, p99 latency and total server memory.
+
+    python -m benchmarks.bench_gunicorn [connections] [seconds] [path]
+
+Combinations come from BENCH_WORKER_COUNTS and BENCH_THREAD_COUNTS
+(comma separated, defaults derived from the usable CPUs). Set
+BENCH_DATABASE_URI to a local PostgreSQL database for realistic numbers;
+SQLite serializes writes and flatters single-process settings.
+'''
+import os
+import sys
+import time
+import signal
+import asyncio
+import subprocess
+from itertools import product
+
+from benchmarks.common import seed, actor_rows, summarize
+from benchmarks.load_test import signer, load, wait_for_port, PORT
+
+from app import app  # noqa: E402
+from app.models import db, Actor  # noqa: E402
+
+CPUS = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') \
+    else os.cpu_count() or 1
+
+
+def _counts(name, default):
+    return [int(count) for count in os.getenv(name, default).split(',')]
+
+
+WORKERS = _counts('BENCH_WORKER_COUNTS', f'1,{CPUS},{CPUS * 2 + 1}')
+THREADS = _counts('BENCH_THREAD_COUNTS', '1,2,4,8')
+
+
+def main(connections=64, seconds=10, path='/api/v1/actors?limit=10'):
+    with app.app_context():
+        db.create_all()
+        seed(Actor, actor_rows, 10000)
+    token = signer.mint()
+    url = f'http://127.0.0.1:{PORT}{path}'
+
+    print(f'{connections} connections x {seconds}s on {path}')
+    print(f"{'workers':>8}{'threads':>8}{'req/s':>10}{'errors':>8}"
+          f"{'p50 ms':>10}{'p99 ms':>10}{'RSS MB':>10}")
+    for workers, threads in product(WORKERS, THREADS):
+        environment = dict(os.environ,
+                           WEB_CONCURRENCY=str(workers),
+                           GUNICORN_THREADS=str(threads),
+                           GUNICORN_BIND=f'127.0.0.1:{PORT}')
+        server = subprocess.Popen(
+            ['gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+            env=environment, stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL)
+        try:
+            if not wait_for_port(PORT):
+                print(f'{workers:>8}{threads:>8}  the server did not start')
+                continue
+            start = time.perf_counter()
+            durations, errors, _, loaded = asyncio.run(load(
+                url, token, connections, seconds, server.pid))
+            elapsed = time.perf_counter() - start
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait()
+        summary = summarize(durations or [0])
+        print(f'{workers:>8}{threads:>8}{len(durations) / elapsed:>10.0f}'
+              f"{len(errors):>8}{summary['p50_ms']:>10.1f}"
+              f"{summary['p99_ms']:>10.1f}{loaded / 1024:>10.1f}")
+
+
+if __name__ == '__main__':
+    main(*[int(arg) if arg.isdigit() else arg for arg in sys.argv[1:]])
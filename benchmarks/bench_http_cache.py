@@ -0,0 +1,44 @@
+'''
+Full responses versus 304 Not Modified for single resources and lists.
+
+    python -m benchmarks.bench_http_cache [iterations] [rows]
+'''
+import sys
+
+from benchmarks.common import (
+    configure_environment, seed, movie_rows, timed, summarize, report)
+
+signer = configure_environment()
+
+from app import app  # noqa: E402
+from app.models import db, Movie  # noqa: E402
+
+
+def main(iterations=500, rows=10000):
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {signer.mint()}'}
+    with app.app_context():
+        db.create_all()
+        seed(Movie, movie_rows, rows)
+
+    results = {}
+    for label, url in (('movie', '/api/v1/movies/1'),
+                       ('list', '/api/v1/movies?page=50&limit=100')):
+        etag = client.get(url, headers=headers).headers['ETag']
+        conditional = dict(headers, **{'If-None-Match': etag})
+
+        def full():
+            response = client.get(url, headers=headers)
+            assert response.status_code == 200
+
+        def revalidate():
+            response = client.get(url, headers=conditional)
+            assert response.status_code == 304
+
+        results[f'{label} 200'] = summarize(timed(full, iterations))
+        results[f'{label} 304'] = summarize(timed(revalidate, iterations))
+    report(f'Conditional GET over {rows:,} movies', results)
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
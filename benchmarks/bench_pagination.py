@@ -0,0 +1,47 @@
+'''
+Latency of a deep page (page 10,000 by default) in offset and keyset modes.
+
+    python -m benchmarks.bench_pagination [iterations] [page]
+'''
+import sys
+
+from benchmarks.common import (
+    configure_environment, seed, actor_rows, timed, summarize, report)
+
+signer = configure_environment()
+
+from app import app, PER_PAGE  # noqa: E402
+from app.models import db, Actor  # noqa: E402
+from app.pagination import encode_cursor  # noqa: E402
+
+
+def main(iterations=50, page=10000):
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {signer.mint()}'}
+    skipped = (page - 1) * PER_PAGE
+    with app.app_context():
+        db.create_all()
+        seed(Actor, actor_rows, skipped + 10 * PER_PAGE)
+        ordered = Actor.query.order_by(Actor.id)
+        before = ordered.offset(skipped - 1).first()
+        cursors = {
+            sort: encode_cursor(Actor, sort, before)
+            for sort in ('id', 'created_at')
+        }
+        urls = {
+            'offset page': f'/api/v1/actors?page={page}',
+            'keyset by id': f'/api/v1/actors?sort=id&cursor={cursors["id"]}',
+            'keyset by created_at': '/api/v1/actors?sort=created_at'
+                                    f'&cursor={cursors["created_at"]}',
+        }
+        rows = {}
+        for label, url in urls.items():
+            def get():
+                response = client.get(f'{url}&count=cached', headers=headers)
+                assert response.status_code == 200, response.data
+            rows[label] = summarize(timed(get, iterations))
+        report(f'GET /api/v1/actors page {page:,}', rows)
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
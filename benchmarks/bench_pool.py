@@ -0,0 +1,67 @@
+'''
+Throughput of the actor list endpoint against connection pool size.
+
+    python -m benchmarks.bench_pool [threads] [requests_per_thread]
+
+Set BENCH_DATABASE_URI to a local PostgreSQL database for realistic
+numbers; the default SQLite file mostly measures the GIL.
+'''
+import os
+import sys
+import time
+import threading
+
+from benchmarks.common import configure_environment, seed, actor_rows
+
+signer = configure_environment()
+
+from app import app  # noqa: E402
+from app.models import db, setup_db, Actor  # noqa: E402
+from app.pool import pool_status  # noqa: E402
+
+POOL_SIZES = (1, 2, 4, 8, 16)
+
+
+def run(threads, requests_per_thread, headers):
+    errors = []
+
+    def worker():
+        client = app.test_client()
+        for _ in range(requests_per_thread):
+            response = client.get('/api/v1/actors?page=1&count=exact',
+                                  headers=headers)
+            if response.status_code != 200:
+                errors.append(response.status_code)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - start, errors
+
+
+def main(threads=16, requests_per_thread=50):
+    database_uri = os.environ['DATABASE_URI']
+    headers = {'Authorization': f'Bearer {signer.mint()}'}
+    with app.app_context():
+        db.create_all()
+        seed(Actor, actor_rows, 10000)
+
+    print(f'{threads} threads x {requests_per_thread} requests')
+    print(f"{'pool size':>10}{'req/s':>12}{'errors':>8}"
+          f"{'mean wait ms':>15}{'max wait ms':>14}")
+    for size in POOL_SIZES:
+        setup_db(app, database_uri, DB_POOL_SIZE=size, DB_MAX_OVERFLOW=0)
+        elapsed, errors = run(threads, requests_per_thread, headers)
+        with app.app_context():
+            status = pool_status(db.engine)
+        total = threads * requests_per_thread
+        print(f'{size:>10}{total / elapsed:>12.1f}{len(errors):>8}'
+              f"{status.get('wait_time_mean', 0) * 1000:>15.3f}"
+              f"{status.get('wait_time_max', 0) * 1000:>14.3f}")
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,43 @@
+'''
+Cost of the SQL instrumentation: single actor and list requests with
+app.query_stats disabled and enabled.
+
+    python -m benchmarks.bench_query_stats [iterations] [rows]
+'''
+import sys
+
+from benchmarks.common import (
+    configure_environment, seed, actor_rows, timed, summarize, report)
+
+signer = configure_environment()
+
+from app import app  # noqa: E402
+from app.models import db, Actor  # noqa: E402
+from app.query_stats import query_stats  # noqa: E402
+
+
+def main(iterations=1000, rows=10000):
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {signer.mint()}'}
+    with app.app_context():
+        db.create_all()
+        seed(Actor, actor_rows, rows)
+
+    results = {}
+    for label, url in (('actor', '/api/v1/actors/1'),
+                       ('list', '/api/v1/actors?page=50&limit=100')):
+        def get():
+            response = client.get(url, headers=headers)
+            assert response.status_code == 200
+
+        for enabled in (False, True):
+            (query_stats.enable if enabled else query_stats.disable)()
+            get()
+            state = 'enabled' if enabled else 'disabled'
+            results[f'{label} {state}'] = summarize(timed(get, iterations))
+    query_stats.disable()
+    report(f'SQL instrumentation over {rows:,} actors', results)
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,62 @@
+'''
+Latency of /api/v1/search over a million actors and a million movies,
+with the database's full-text index and with the in-process index.
+
+    python -m benchmarks.bench_search [iterations] [rows]
+'''
+import sys
+import importlib
+
+from benchmarks.common import (
+    configure_environment, seed, actor_rows, movie_rows, timed, summarize,
+    report)
+
+signer = configure_environment()
+
+from app import app  # noqa: E402
+from app.models import db, Actor, Movie  # noqa: E402
+
+# app re-exports the search() function under the module's name
+search_module = importlib.import_module('app.search')
+
+QUERIES = {
+    'exact name': 'actor 0123456',
+    'name prefix': 'actor 012345',
+    'two words': 'movie 09999',
+    'no match': 'zebra',
+    # Prefixes matching every row of a table
+    'one letter': 'a',
+    'common word': 'actor',
+    'broad two words': 'movie 0',
+}
+
+
+def main(iterations=200, rows=1000000):
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {signer.mint()}'}
+    with app.app_context():
+        db.create_all()
+        seed(Actor, actor_rows, rows)
+        seed(Movie, movie_rows, rows)
+        backend = search_module.SEARCH_BACKEND
+        results = {}
+        for name in ('auto', 'memory'):
+            search_module.SEARCH_BACKEND = name
+            label_backend = type(search_module.search_backend()).__name__
+            for label, query in QUERIES.items():
+                url = f'/api/v1/search?q={query}'
+                # Warm up, which builds the in-process index
+                client.get(url, headers=headers)
+
+                def get():
+                    response = client.get(url, headers=headers)
+                    assert response.status_code == 200, response.data
+                results[f'{label_backend} {label}'] = \
+                    summarize(timed(get, iterations))
+        search_module.SEARCH_BACKEND = backend
+        report(f'GET /api/v1/search over {rows:,} actors and movies',
+               results)
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,57 @@
+'''
+Building and serializing a page of actors of 10, 100 and 1,000 rows:
+ORM objects with flask.jsonify, ORM objects with the fast encoder, and
+row tuples (app.serialization.row_query) with the fast encoder.
+
+    python -m benchmarks.bench_serialization [iterations]
+'''
+import sys
+
+import flask
+
+from benchmarks.common import (
+    configure_environment, seed, actor_rows, timed, summarize, report)
+
+configure_environment()
+
+from app import app  # noqa: E402
+from app.models import db, Actor  # noqa: E402
+from app import serialization  # noqa: E402
+
+PAGE_SIZES = (10, 100, 1000)
+
+
+def main(iterations=200):
+    encoder = 'orjson' if serialization.orjson is not None else 'stdlib json'
+    with app.app_context(), app.test_request_context():
+        db.create_all()
+        seed(Actor, actor_rows, max(PAGE_SIZES))
+        rows = {}
+        for size in PAGE_SIZES:
+            def orm_flask():
+                actors = Actor.query.limit(size).all()
+                flask.jsonify({'actors': [actor.format() for actor in actors]})
+                db.session.remove()
+
+            def orm_fast():
+                actors = Actor.query.limit(size).all()
+                serialization.jsonify(
+                    {'actors': [actor.format() for actor in actors]})
+                db.session.remove()
+
+            def rows_fast():
+                actors = serialization.row_query(Actor.query, Actor) \
+                    .limit(size).all()
+                serialization.jsonify(
+                    {'actors': [Actor.format_row(actor) for actor in actors]})
+                db.session.remove()
+
+            for label, func in (('ORM + flask.jsonify', orm_flask),
+                                ('ORM + fast jsonify', orm_fast),
+                                ('row tuples + fast jsonify', rows_fast)):
+                rows[f'{size:>5} {label}'] = summarize(timed(func, iterations))
+        report(f'Page of actors, encoder: {encoder}', rows)
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
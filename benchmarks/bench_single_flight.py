@@ -0,0 +1,79 @@
+'''
+Thundering herd on one movie: bursts of threads requesting the same
+movie (and the same listing) at once, with and without SINGLE_FLIGHT,
+in SQL statements and requests per second.
+
+    python -m benchmarks.bench_single_flight [threads] [bursts]
+
+Set BENCH_DATABASE_URI to a local PostgreSQL database for realistic
+numbers; the default SQLite file mostly measures the GIL.
+'''
+import sys
+import time
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from benchmarks.common import (
+    configure_environment, seed, actor_rows, movie_rows)
+
+signer = configure_environment()
+
+from app import app  # noqa: E402
+from app.models import db, Actor, Movie  # noqa: E402
+from app.single_flight import single_flight  # noqa: E402
+
+PATHS = ('/api/v1/movies/1', '/api/v1/movies?page=1&count=exact')
+
+
+def herd(path, threads, bursts, headers):
+    statements = {'count': 0}
+    errors = []
+
+    def count(*args):
+        statements['count'] += 1
+
+    def worker(barrier):
+        client = app.test_client()
+        for _ in range(bursts):
+            barrier.wait()
+            response = client.get(path, headers=headers)
+            if response.status_code != 200:
+                errors.append(response.status_code)
+
+    barrier = threading.Barrier(threads)
+    workers = [threading.Thread(target=worker, args=(barrier,))
+               for _ in range(threads)]
+    event.listen(Engine, 'before_cursor_execute', count)
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    event.remove(Engine, 'before_cursor_execute', count)
+    return statements['count'], threads * bursts / elapsed, errors
+
+
+def main(threads=32, bursts=20):
+    headers = {'Authorization': f'Bearer {signer.mint()}'}
+    with app.app_context():
+        db.create_all()
+        seed(Actor, actor_rows, 100)
+        seed(Movie, movie_rows, 100)
+
+    print(f'{threads} threads x {bursts} simultaneous bursts')
+    print(f"{'path':<38}{'single flight':>14}{'statements':>12}"
+          f"{'req/s':>10}{'errors':>8}")
+    for path in PATHS:
+        for enabled in (False, True):
+            single_flight.enabled = enabled
+            statements, rate, errors = herd(path, threads, bursts, headers)
+            print(f"{path:<38}{'on' if enabled else 'off':>14}"
+                  f"{statements:>12}{rate:>10.0f}{len(errors):>8}")
+    print('single flight:', single_flight.stats())
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
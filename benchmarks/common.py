@@ -0,0 +1,134 @@
+'''
+Shared helpers for the benchmark scripts.
+
+Benchmarks never talk to Auth0: they generate a throwaway RSA key, publish
+it as a local JWKS file and mint RS256 tokens signed with it. Call
+configure_environment() before importing `app` or `auth`, since both read
+their configuration from the environment at import time.
+'''
+import os
+import time
+import tempfile
+import statistics
+from datetime import date, datetime, timedelta
+
+from auth.keys import LocalSigningProvider
+
+KID = 'benchmark-key'
+AUDIENCE = 'agency'
+DOMAIN = 'benchmark.local'
+
+ALL_PERMISSIONS = [
+    'get:actors', 'post:actors', 'patch:actors', 'delete:actors',
+    'get:movies', 'post:movies', 'patch:movies', 'delete:movies',
+]
+
+
+class LocalSigner(LocalSigningProvider):
+    '''Signs benchmark tokens, with every permission by default.'''
+
+    def __init__(self, kid=KID):
+        super().__init__(kid, issuer=f'https://{DOMAIN}/', audience=AUDIENCE)
+
+    def mint(self, permissions=ALL_PERMISSIONS, ttl=3600, subject='bench'):
+        return super().mint(permissions, ttl, subject)
+
+
+def configure_environment(database_uri=None):
+    '''Points auth at a local JWKS file and the app at `database_uri`.
+
+    The database defaults to BENCH_DATABASE_URI, or to a fresh SQLite file.
+    Returns:
+        LocalSigner: The signer whose tokens will verify.
+    '''
+    if database_uri is None:
+        database_uri = os.getenv('BENCH_DATABASE_URI')
+    if database_uri is None:
+        directory = tempfile.mkdtemp(prefix='agency-bench-')
+        database_uri = f'sqlite:///{directory}/agency.db'
+    signer = LocalSigner()
+    handle, path = tempfile.mkstemp(prefix='jwks-', suffix='.json')
+    os.close(handle)
+    signer.write_jwks(path)
+    os.environ['AUTH0_DOMAIN'] = DOMAIN
+    os.environ['API_AUDIENCE'] = AUDIENCE
+    os.environ['ALGORITHMS'] = 'RS256'
+    os.environ['JWKS_URL'] = f'file://{path}'
+    os.environ['DATABASE_URI'] = database_uri
+    return signer
+
+
+def actor_rows(start, stop):
+    epoch = datetime(2020, 1, 1)
+    for i in range(start, stop):
+        yield {
+            'name': f'Actor {i:07d}',
+            'dob': date(1940 + i % 60, 1 + i % 12, 1 + i % 28),
+            'gender': ('male', 'female')[i % 2],
+            'created_at': epoch + timedelta(seconds=i),
+        }
+
+
+def movie_rows(start, stop):
+    epoch = datetime(2020, 1, 1)
+    for i in range(start, stop):
+        yield {
+            'title': f'Movie {i:07d}',
+            'release_date': date(1950 + i % 70, 1 + i % 12, 1 + i % 28),
+            'created_at': epoch + timedelta(seconds=i),
+        }
+
+
+def seed(model, rows_factory, total, chunk_size=10000):
+    '''Tops the table of `model` up to `total` rows with executemany.
+
+    Must run inside an application context.
+    '''
+    from app.models import db
+    existing = db.session.query(model).count()
+    for start in range(existing, total, chunk_size):
+        stop = min(start + chunk_size, total)
+        db.session.execute(model.__table__.insert(),
+                           list(rows_factory(start, stop)))
+    db.session.commit()
+
+
+def timed(func, iterations):
+    '''Calls `func` repeatedly.
+    Returns:
+        list: Per-call durations in seconds.
+    '''
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def summarize(durations):
+    '''Summarizes durations (seconds) as milliseconds percentiles.'''
+    ordered = sorted(durations)
+
+    def percentile(p):
+        index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+        return ordered[index] * 1000
+
+    return {
+        'count': len(ordered),
+        'mean_ms': statistics.mean(ordered) * 1000,
+        'p50_ms': percentile(50),
+        'p95_ms': percentile(95),
+        'p99_ms': percentile(99),
+    }
+
+
+def report(title, rows):
+    '''Prints a {label: summary} mapping as an aligned table.'''
+    print(title)
+    print(f"{'case':<32}{'n':>8}{'mean ms':>12}{'p50 ms':>12}"
+          f"{'p95 ms':>12}{'p99 ms':>12}")
+    for label, summary in rows.items():
+        print(f"{label:<32}{summary['count']:>8}{summary['mean_ms']:>12.4f}"
+              f"{summary['p50_ms']:>12.4f}{summary['p95_ms']:>12.4f}"
+              f"{summary['p99_ms']:>12.4f}")
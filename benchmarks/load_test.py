@@ -0,0 +1,196 @@
+'''
+Many concurrent keep-alive clients against the sync (gunicorn) and the
+async (uvicorn, app.asgi) servers: throughput, latency percentiles and
+server memory per open connection.
+
+    python -m benchmarks.load_test [connections] [seconds] [path]
+
+Both servers are started on a seeded database, trusting the benchmark
+signing key; modes whose server is not installed are skipped. The sync
+server runs `gunicorn -w BENCH_WORKERS app:app`, the async one
+`uvicorn app.asgi:application`. uvicorn, and asyncpg for the async
+reads on PostgreSQL, are optional extras left out of requirements.txt:
+
+    pip install uvicorn asyncpg
+
+Against a server started by hand, pass its URL and a token instead:
+
+    BENCH_URL=http://127.0.0.1:8000 BENCH_TOKEN=... \\
+        python -m benchmarks.load_test 1000 30
+'''
+import os
+import sys
+import time
+import shutil
+import signal
+import asyncio
+import subprocess
+from urllib.parse import urlsplit
+
+from benchmarks.common import (
+    configure_environment, seed, actor_rows, summarize, report)
+
+signer = configure_environment()
+
+from app import app  # noqa: E402
+from app.models import db, Actor  # noqa: E402
+
+PORT = 8765
+WORKERS = int(os.getenv('BENCH_WORKERS', os.cpu_count() or 1))
+
+SERVERS = {
+    'sync': ['gunicorn', '-w', str(WORKERS), '-b', f'127.0.0.1:{PORT}',
+             'app:app'],
+    'async': ['uvicorn', '--host', '127.0.0.1', '--port', str(PORT),
+              '--no-access-log', 'app.asgi:application'],
+}
+
+
+def rss_kb(pid):
+    '''Resident memory of pid and all its descendants, in kB.'''
+    total = 0
+    pids = [pid]
+    while pids:
+        current = pids.pop()
+        try:
+            with open(f'/proc/{current}/status') as status:
+                for line in status:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1])
+            for task in os.listdir(f'/proc/{current}/task'):
+                with open(f'/proc/{current}/task/{task}/children') as children:
+                    pids.extend(map(int, children.read().split()))
+        except FileNotFoundError:
+            continue
+    return total
+
+
+async def client(host, port, request, deadline, durations, errors):
+    '''Sends request over a keep-alive connection until deadline,
+    reconnecting whenever the server closes it (gunicorn sync workers
+    do after every response).'''
+    writer = None
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            writer.write(request)
+            status = int((await reader.readline()).split()[1])
+            length, chunked, close = 0, False, False
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b''):
+                    break
+                name, _, value = line.partition(b':')
+                name, value = name.lower(), value.strip().lower()
+                if name == b'content-length':
+                    length = int(value)
+                elif name == b'transfer-encoding':
+                    chunked = b'chunked' in value
+                elif name == b'connection':
+                    close = value == b'close'
+            if chunked:
+                while True:
+                    size = int((await reader.readline()).split(b';')[0], 16)
+                    await reader.readexactly(size + 2)
+                    if not size:
+                        break
+            else:
+                await reader.readexactly(length)
+        except (OSError, ValueError, IndexError,
+                asyncio.IncompleteReadError):
+            errors.append('connection')
+            close = True
+        else:
+            durations.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+        if close and writer is not None:
+            writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def load(url, token, connections, seconds, server_pid=None):
+    parts = urlsplit(url)
+    request = (f'GET {parts.path or "/"} HTTP/1.1\r\n'
+               f'Host: {parts.netloc}\r\n'
+               f'Authorization: Bearer {token}\r\n\r\n').encode('latin-1')
+    durations, errors = [], []
+    deadline = time.perf_counter() + seconds
+    baseline = rss_kb(server_pid) if server_pid else 0
+    tasks = [asyncio.ensure_future(client(
+        parts.hostname, parts.port or 80, request, deadline,
+        durations, errors)) for _ in range(connections)]
+    await asyncio.sleep(seconds / 2)
+    peak = rss_kb(server_pid) if server_pid else 0
+    await asyncio.gather(*tasks)
+    return durations, errors, baseline, peak
+
+
+def wait_for_port(port, timeout=30):
+    async def probe():
+        _, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.close()
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            asyncio.run(probe())
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def main(connections=200, seconds=10, path='/api/v1/actors/1'):
+    results = {}
+    if os.getenv('BENCH_URL'):
+        targets = {'server': (os.environ['BENCH_URL'].rstrip('/') + path,
+                              None)}
+    else:
+        with app.app_context():
+            db.create_all()
+            seed(Actor, actor_rows, 10000)
+        targets = {mode: (f'http://127.0.0.1:{PORT}{path}', command)
+                   for mode, command in SERVERS.items()}
+    token = os.getenv('BENCH_TOKEN') or signer.mint()
+
+    print(f'{connections} connections x {seconds}s on {path}')
+    print(f"{'mode':<10}{'req/s':>10}{'errors':>8}"
+          f"{'idle MB':>10}{'loaded MB':>11}{'kB/conn':>10}")
+    for mode, (url, command) in targets.items():
+        server = None
+        if command:
+            if shutil.which(command[0]) is None:
+                print(f'{mode:<10}skipped, {command[0]} is not installed')
+                continue
+            server = subprocess.Popen(command, stdout=subprocess.DEVNULL,
+                                      stderr=subprocess.DEVNULL)
+            if not wait_for_port(PORT):
+                server.kill()
+                print(f'{mode:<10}skipped, the server did not start')
+                continue
+        try:
+            start = time.perf_counter()
+            durations, errors, idle, loaded = asyncio.run(load(
+                url, token, connections, seconds,
+                server.pid if server else None))
+            elapsed = time.perf_counter() - start
+        finally:
+            if server:
+                server.send_signal(signal.SIGTERM)
+                server.wait()
+        per_connection = (loaded - idle) / connections
+        print(f'{mode:<10}{len(durations) / elapsed:>10.0f}{len(errors):>8}'
+              f'{idle / 1024:>10.1f}{loaded / 1024:>11.1f}'
+              f'{per_connection:>10.1f}')
+        if durations:
+            results[mode] = summarize(durations)
+    report('latency', results)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) if arg.isdigit() else arg for arg in sys.argv[1:]])
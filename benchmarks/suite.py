@@ -0,0 +1,304 @@
+'''
+Benchmark suite: every endpoint of the API under concurrent clients.
+
+    python -m benchmarks.suite [--actors N] [--movies N] [--cast N]
+        [--clients N] [--requests N] [--only TEXT]
+        [--json results.json] [--compare baseline.json]
+
+Seeds the database (a fresh SQLite file, or BENCH_DATABASE_URI) with the
+given volumes, mints local RS256 tokens against a stub JWKS, then sends
+--requests requests per endpoint from --clients threads, each with its
+own test client. Every endpoint reports p50/p95/p99 latency, throughput,
+SQL statements per request and errors.
+
+--json writes the results with the commit they were measured on;
+--compare prints the change against such a file, e.g. between commits:
+
+    git checkout main && python -m benchmarks.suite --json main.json
+    git checkout topic && python -m benchmarks.suite --compare main.json
+'''
+import sys
+import json
+import time
+import argparse
+import platform
+import threading
+import subprocess
+from collections import deque
+from datetime import datetime
+from itertools import count
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from benchmarks.common import (
+    configure_environment, seed, actor_rows, movie_rows, summarize)
+
+signer = configure_environment()
+
+from app import app  # noqa: E402
+from app.models import db, Actor, Movie, Casting  # noqa: E402
+
+_statements = threading.local()
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def count_statement(*args):
+    _statements.count = getattr(_statements, 'count', 0) + 1
+
+
+class Case:
+    '''One endpoint: `path(i)` and `body(i)` build the i-th request.'''
+
+    def __init__(self, name, method, path, body=None, status=200,
+                 scale=1, sqlite=True, collect=None):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.body = body
+        self.status = status
+        # Fraction of --requests sent, for the heavy endpoints
+        self.scale = scale
+        # False when the endpoint cannot run on SQLite
+        self.sqlite = sqlite
+        # Called with each response, e.g. to keep the ids it created
+        self.collect = collect
+
+
+def seed_castings(movies, actors, cast):
+    '''Gives every movie `cast` actors, spread over all the actors.'''
+    if db.session.query(Casting).count():
+        return
+    rows = [{'movie_id': movie_id,
+             'actor_id': (movie_id * 7 + order) % actors + 1,
+             'role': f'Role {order}', 'billing_order': order}
+            for movie_id in range(1, movies + 1)
+            for order in range(min(cast, actors))]
+    for start in range(0, len(rows), 10000):
+        db.session.execute(Casting.__table__.insert(),
+                           rows[start:start + 10000])
+    db.session.commit()
+
+
+def seed_disposable(model, rows_factory, start, total):
+    '''Adds `total` rows for the delete cases to consume.
+    Returns:
+        deque: Their ids.
+    '''
+    first = db.session.query(db.func.max(model.id)).scalar() or 0
+    db.session.execute(model.__table__.insert(),
+                       list(rows_factory(start, start + total)))
+    db.session.commit()
+    return deque(id for id, in db.session.query(model.id)
+                 .filter(model.id > first).order_by(model.id))
+
+
+def build_cases(options, disposable_actors, disposable_movies):
+    actors, movies = options.actors, options.movies
+    castings = deque()
+
+    def actor(i):
+        return i * 7919 % actors + 1
+
+    def movie(i):
+        return i * 7919 % movies + 1
+
+    def keep_casting(response):
+        castings.append(response.get_json()['casting']['id'])
+
+    def bulk(i):
+        return [{'op': 'create', 'data': {
+            'name': f'Suite {i} {n}', 'dob': '1990-01-01',
+            'gender': 'female'}} for n in range(10)]
+
+    return [
+        Case('GET actors', 'GET',
+             lambda i: f'/api/v1/actors?page={i % 50 + 1}'),
+        Case('GET actors filtered', 'GET',
+             lambda i: '/api/v1/actors?gender=female&min_age=30'
+                       '&max_age=50&sort=-dob&fields=id,name'),
+        Case('GET actors cursor', 'GET',
+             lambda i: '/api/v1/actors?cursor=&sort=name&limit=20'),
+        Case('GET actor', 'GET', lambda i: f'/api/v1/actors/{actor(i)}'),
+        Case('GET actor movies', 'GET',
+             lambda i: f'/api/v1/actors/{actor(i)}/movies'),
+        Case('GET movies', 'GET',
+             lambda i: f'/api/v1/movies?page={i % 50 + 1}'),
+        Case('GET movies include=cast', 'GET',
+             lambda i: f'/api/v1/movies?include=cast&page={i % 50 + 1}'),
+        Case('GET movie', 'GET', lambda i: f'/api/v1/movies/{movie(i)}'),
+        Case('GET movie cast', 'GET',
+             lambda i: f'/api/v1/movies/{movie(i)}/cast'),
+        Case('GET search', 'GET',
+             lambda i: f'/api/v1/search?q={("actor", "movie 00")[i % 2]}'),
+        Case('GET actors export', 'GET',
+             lambda i: '/api/v1/actors/export', scale=0.02),
+        Case('POST actor', 'POST', lambda i: '/api/v1/actors',
+             lambda i: {'name': f'Suite {i}', 'dob': '1990-01-01',
+                        'gender': 'male'},
+             status=201, sqlite=False),
+        Case('PATCH actor', 'PATCH', lambda i: f'/api/v1/actors/{actor(i)}',
+             lambda i: {'name': f'Actor {actor(i) - 1:07d}'}),
+        Case('DELETE actor', 'DELETE',
+             lambda i: f'/api/v1/actors/{disposable_actors.popleft()}'),
+        Case('POST actors bulk x10', 'POST', lambda i: '/api/v1/actors/bulk',
+             bulk, scale=0.2),
+        Case('POST movie', 'POST', lambda i: '/api/v1/movies',
+             lambda i: {'title': f'Suite {i}', 'release_date': '2000-01-01'},
+             status=201, sqlite=False),
+        Case('PATCH movie', 'PATCH', lambda i: f'/api/v1/movies/{movie(i)}',
+             lambda i: {'title': f'Movie {movie(i) - 1:07d}'}),
+        Case('DELETE movie', 'DELETE',
+             lambda i: f'/api/v1/movies/{disposable_movies.popleft()}'),
+        Case('POST cast', 'POST', lambda i: f'/api/v1/movies/{movie(i)}/cast',
+             lambda i: {'actor_id': actor(i), 'role': f'Suite {i}'},
+             status=201, collect=keep_casting),
+        Case('DELETE cast', 'DELETE',
+             lambda i: '/api/v1/movies/{}/cast/{}'.format(
+                 *Casting.query.with_entities(Casting.movie_id, Casting.id)
+                 .filter(Casting.id == castings.popleft()).one())),
+    ]
+
+
+def run(case, total, clients, headers):
+    '''Sends `total` requests of case from `clients` threads.
+    Returns:
+        dict: The summary of the latencies, plus throughput, statements
+        per request and errors.
+    '''
+    numbers = count()
+    lock = threading.Lock()
+    durations, statements, errors = [], [], []
+
+    def client():
+        test_client = app.test_client()
+        while True:
+            with lock:
+                i = next(numbers)
+            if i >= total:
+                return
+            with app.app_context():
+                # Builds the path, which may query, outside the timing
+                path = case.path(i)
+            body = case.body(i) if case.body else None
+            _statements.count = 0
+            start = time.perf_counter()
+            response = test_client.open(path, method=case.method,
+                                        headers=headers, json=body)
+            elapsed = time.perf_counter() - start
+            if response.status_code != case.status:
+                errors.append(response.status_code)
+                continue
+            durations.append(elapsed)
+            statements.append(_statements.count)
+            if case.collect:
+                case.collect(response)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    summary = summarize(durations or [0])
+    summary.update(
+        count=len(durations),
+        throughput=len(durations) / elapsed,
+        statements_per_request=sum(statements) / len(statements)
+        if statements else 0,
+        errors=len(errors))
+    return summary
+
+
+def commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results, baseline=None):
+    print(f"{'endpoint':<28}{'n':>6}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'p99 ms':>9}{'sql/req':>9}{'errors':>8}"
+          + (f"{'p50 vs base':>13}{'req/s vs base':>15}" if baseline else ''))
+    for name, result in results.items():
+        line = (f"{name:<28}{result['count']:>6}{result['throughput']:>9.0f}"
+                f"{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}"
+                f"{result['p99_ms']:>9.2f}"
+                f"{result['statements_per_request']:>9.1f}"
+                f"{result['errors']:>8}")
+        before = (baseline or {}).get(name)
+        if before:
+            def change(key):
+                if not before[key]:
+                    return '-'
+                return f'{(result[key] / before[key] - 1) * 100:+.1f}%'
+            line += f"{change('p50_ms'):>13}{change('throughput'):>15}"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--actors', type=int, default=10000)
+    parser.add_argument('--movies', type=int, default=10000)
+    parser.add_argument('--cast', type=int, default=10,
+                        help='cast members per movie')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=500,
+                        help='requests per endpoint')
+    parser.add_argument('--only', help='run the endpoints containing TEXT')
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--compare', help='results file to compare with')
+    options = parser.parse_args(argv)
+
+    headers = {'Authorization': f'Bearer {signer.mint()}'}
+    with app.app_context():
+        db.create_all()
+        seed(Actor, actor_rows, options.actors)
+        seed(Movie, movie_rows, options.movies)
+        seed_castings(options.movies, options.actors, options.cast)
+        dialect = db.engine.dialect.name
+        disposable_actors = seed_disposable(
+            Actor, actor_rows, options.actors, options.requests)
+        disposable_movies = seed_disposable(
+            Movie, movie_rows, options.movies, options.requests)
+        db.session.remove()
+
+    results = {}
+    for case in build_cases(options, disposable_actors, disposable_movies):
+        if options.only and options.only.lower() not in case.name.lower():
+            continue
+        if dialect == 'sqlite' and not case.sqlite:
+            print(f'{case.name}: skipped, SQLite rejects the JSON dates '
+                  'of this endpoint')
+            continue
+        total = max(1, int(options.requests * case.scale))
+        results[case.name] = run(case, total, options.clients, headers)
+
+    baseline = None
+    if options.compare:
+        with open(options.compare) as baseline_file:
+            baseline = json.load(baseline_file)['results']
+    print(f'{options.requests} requests per endpoint from {options.clients} '
+          f'clients, {options.actors:,} actors, {options.movies:,} movies '
+          f'on {dialect}')
+    print_results(results, baseline)
+
+    if options.json:
+        with open(options.json, 'w') as results_file:
+            json.dump({
+                'commit': commit(),
+                'date': datetime.utcnow().isoformat(),
+                'python': platform.python_version(),
+                'database': dialect,
+                'options': vars(options),
+                'results': results,
+            }, results_file, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
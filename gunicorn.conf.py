@@ -0,0 +1,107 @@
+'''
+Production settings of gunicorn:
+
+    gunicorn -c gunicorn.conf.py app:app
+
+Every setting can be overridden from the environment (see .env-example).
+Each worker process runs GUNICORN_THREADS threads, so DB_POOL_SIZE plus
+DB_MAX_OVERFLOW should be at least that many connections per worker, and
+workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW) within the database's
+connection limit. Unless WEB_CONCURRENCY sets it, the worker count
+derived from the usable CPUs is capped by GUNICORN_MAX_WORKERS and by
+the workers DB_MAX_CONNECTIONS, when set, has connections for.
+'''
+import os
+import multiprocessing
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+def _usable_cpus():
+    '''CPUs this process may run on, fewer than the host's in a
+    container or under taskset'''
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return multiprocessing.cpu_count()
+
+
+def _default_workers(cpus):
+    count = min(cpus * 2 + 1, _env_int('GUNICORN_MAX_WORKERS', 12))
+    budget = os.getenv('DB_MAX_CONNECTIONS')
+    if budget:
+        per_worker = _env_int('DB_POOL_SIZE', 5) + \
+            _env_int('DB_MAX_OVERFLOW', 10)
+        count = min(count, int(budget) // per_worker)
+    return max(count, 1)
+
+
+cpus = _usable_cpus()
+
+# Heroku sets PORT and WEB_CONCURRENCY
+bind = os.getenv('GUNICORN_BIND', f"0.0.0.0:{os.getenv('PORT', 8000)}")
+workers = _env_int('WEB_CONCURRENCY', _default_workers(cpus))
+# Threads overlap the waits on the database and on Auth0 within a worker
+threads = _env_int('GUNICORN_THREADS', 2)
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+# Import the app once in the master: workers fork with it loaded, start
+# faster and share its memory pages
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() in \
+    ('1', 'true', 'yes')
+
+# Recycle workers after a jittered number of requests, so they never all
+# restart at once and slow leaks stay bounded
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = _env_int('GUNICORN_MAX_REQUESTS_JITTER', 100)
+
+# Seconds an idle keep-alive connection is held (gthread workers only)
+keepalive = _env_int('GUNICORN_KEEPALIVE', 5)
+timeout = _env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = _env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+
+# Heartbeat files on tmpfs, a disk-backed /tmp can block workers
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG')
+
+
+def on_starting(server):
+    '''Starts the metrics of the workers (METRICS_DIR) from zero'''
+    directory = os.getenv('METRICS_DIR')
+    if directory and os.path.isdir(directory):
+        for name in os.listdir(directory):
+            if name.endswith('.json'):
+                os.remove(os.path.join(directory, name))
+
+
+def _dispose_engines():
+    from app import app
+    from app.models import dispose_engines
+    dispose_engines(app)
+
+
+def pre_fork(server, worker):
+    '''Closes the connections the preloaded app opened in the master
+    (create_all, replica probes) so no child inherits their sockets'''
+    if server.cfg.preload_app:
+        _dispose_engines()
+
+
+def post_fork(server, worker):
+    '''Gives each worker fresh connection pools of its own'''
+    if server.cfg.preload_app:
+        _dispose_engines()
+
+
+def worker_exit(server, worker):
+    '''Writes the metrics observed since the last flush, which the
+    worker would otherwise take with it'''
+    from app import app
+    from app.metrics import metrics
+    if metrics.enabled and metrics.directory:
+        with app.app_context():
+            metrics.flush()
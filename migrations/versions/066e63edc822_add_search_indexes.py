@@ -0,0 +1,61 @@
+"""add search indexes
+
+Full-text GIN indexes on PostgreSQL; FTS5 tables kept in sync by
+triggers on SQLite. Other databases search through the in-process index.
+
+Revision ID: 066e63edc822
+Revises: 416f0a22eed3
+Create Date: 2026-10-18 16:48:05.630981
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '066e63edc822'
+down_revision = '416f0a22eed3'
+branch_labels = None
+depends_on = None
+
+SEARCHED = (('actors', 'name'), ('movies', 'title'))
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    for table, column in SEARCHED:
+        if dialect == 'postgresql':
+            op.execute(
+                f'CREATE INDEX IF NOT EXISTS ix_{table}_{column}_search '
+                f"ON {table} USING gin (to_tsvector('simple', {column}))")
+        elif dialect == 'sqlite':
+            fts = f'{table}_search'
+            op.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5('
+                f"{column}, content='{table}', content_rowid='id')")
+            op.execute(
+                f'CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT '
+                f'ON {table} BEGIN INSERT INTO {fts}(rowid, {column}) '
+                f'VALUES (new.id, new.{column}); END')
+            op.execute(
+                f'CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE '
+                f'ON {table} BEGIN INSERT INTO {fts}({fts}, rowid, {column}) '
+                f"VALUES ('delete', old.id, old.{column}); END")
+            op.execute(
+                f'CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE '
+                f'OF {column} ON {table} BEGIN '
+                f'INSERT INTO {fts}({fts}, rowid, {column}) '
+                f"VALUES ('delete', old.id, old.{column}); "
+                f'INSERT INTO {fts}(rowid, {column}) '
+                f'VALUES (new.id, new.{column}); END')
+            op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    for table, column in SEARCHED:
+        if dialect == 'postgresql':
+            op.execute(f'DROP INDEX IF EXISTS ix_{table}_{column}_search')
+        elif dialect == 'sqlite':
+            for trigger in ('insert', 'delete', 'update'):
+                op.execute(f'DROP TRIGGER IF EXISTS {table}_search_{trigger}')
+            op.execute(f'DROP TABLE IF EXISTS {table}_search')
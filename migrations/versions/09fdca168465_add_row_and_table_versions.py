@@ -0,0 +1,45 @@
+"""add row and table versions
+
+Revision ID: 09fdca168465
+Revises: a3659f4eaded
+Create Date: 2026-10-18 11:41:09.226813
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '09fdca168465'
+down_revision = 'a3659f4eaded'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('actors', 'movies'):
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(),
+                                       nullable=True))
+        op.add_column(table, sa.Column('version', sa.Integer(),
+                                       server_default='1', nullable=False))
+    table_versions = op.create_table(
+        'table_versions',
+        sa.Column('name', sa.String(length=250), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+    now = datetime.utcnow()
+    op.bulk_insert(table_versions, [
+        {'name': 'actors', 'version': 1, 'updated_at': now},
+        {'name': 'movies', 'version': 1, 'updated_at': now},
+    ])
+
+
+def downgrade():
+    op.drop_table('table_versions')
+    for table in ('movies', 'actors'):
+        op.drop_column(table, 'version')
+        op.drop_column(table, 'updated_at')
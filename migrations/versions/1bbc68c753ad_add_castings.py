@@ -0,0 +1,59 @@
+"""add castings
+
+Revision ID: 1bbc68c753ad
+Revises: 09fdca168465
+Create Date: 2026-10-18 14:02:37.518204
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1bbc68c753ad'
+down_revision = '09fdca168465'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'castings',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('version', sa.Integer(), server_default='1',
+                  nullable=False),
+        sa.Column('movie_id', sa.Integer(), nullable=False),
+        sa.Column('actor_id', sa.Integer(), nullable=False),
+        sa.Column('role', sa.String(length=250), nullable=False),
+        sa.Column('billing_order', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['actor_id'], ['actors.id'],
+                                ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['movie_id'], ['movies.id'],
+                                ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('movie_id', 'actor_id', 'role',
+                            name='uq_castings_movie_actor_role')
+    )
+    op.create_index('ix_castings_movie_id_billing_order', 'castings',
+                    ['movie_id', 'billing_order'], unique=False)
+    op.create_index('ix_castings_actor_id', 'castings', ['actor_id'],
+                    unique=False)
+    table_versions = sa.table(
+        'table_versions',
+        sa.column('name', sa.String),
+        sa.column('version', sa.Integer),
+        sa.column('updated_at', sa.DateTime))
+    op.bulk_insert(table_versions, [
+        {'name': 'castings', 'version': 1, 'updated_at': datetime.utcnow()},
+    ])
+
+
+def downgrade():
+    op.execute("DELETE FROM table_versions WHERE name = 'castings'")
+    op.drop_index('ix_castings_actor_id', table_name='castings')
+    op.drop_index('ix_castings_movie_id_billing_order', table_name='castings')
+    op.drop_table('castings')
@@ -0,0 +1,45 @@
+"""initial schema
+
+Revision ID: 2a9f45a4cf36
+Revises:
+Create Date: 2026-10-18 09:12:41.318204
+
+Databases created by db.create_all() before migrations were introduced
+already have these tables; mark them with `python manage.py db stamp
+2a9f45a4cf36` and then run `python manage.py db upgrade`.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2a9f45a4cf36'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'actors',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('name', sa.String(length=250), nullable=False),
+        sa.Column('dob', sa.Date(), nullable=False),
+        sa.Column('gender', sa.String(length=250), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'movies',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('title', sa.String(length=250), nullable=False),
+        sa.Column('release_date', sa.Date(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('movies')
+    op.drop_table('actors')
@@ -0,0 +1,43 @@
+"""add list filter indexes
+
+Revision ID: 416f0a22eed3
+Revises: 1bbc68c753ad
+Create Date: 2026-10-18 15:20:44.902117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '416f0a22eed3'
+down_revision = '1bbc68c753ad'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_actors_name_id', 'actors', ['name', 'id'],
+                    unique=False)
+    op.create_index('ix_actors_dob_id', 'actors', ['dob', 'id'],
+                    unique=False)
+    op.create_index('ix_actors_gender_dob', 'actors', ['gender', 'dob'],
+                    unique=False)
+    op.create_index('ix_actors_lower_name', 'actors',
+                    [sa.text('lower(name)')], unique=False)
+    op.create_index('ix_movies_title_id', 'movies', ['title', 'id'],
+                    unique=False)
+    op.create_index('ix_movies_release_date_id', 'movies',
+                    ['release_date', 'id'], unique=False)
+    op.create_index('ix_movies_lower_title', 'movies',
+                    [sa.text('lower(title)')], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_movies_lower_title', table_name='movies')
+    op.drop_index('ix_movies_release_date_id', table_name='movies')
+    op.drop_index('ix_movies_title_id', table_name='movies')
+    op.drop_index('ix_actors_lower_name', table_name='actors')
+    op.drop_index('ix_actors_gender_dob', table_name='actors')
+    op.drop_index('ix_actors_dob_id', table_name='actors')
+    op.drop_index('ix_actors_name_id', table_name='actors')
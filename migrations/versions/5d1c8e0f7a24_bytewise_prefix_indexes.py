@@ -0,0 +1,38 @@
+"""bytewise prefix indexes
+
+Rebuilds the lower(name) and lower(title) indexes under COLLATE "C" on
+PostgreSQL, so the prefix filters' ranges hold whatever the collation
+of the database. SQLite already compares byte by byte.
+
+Revision ID: 5d1c8e0f7a24
+Revises: 066e63edc822
+Create Date: 2026-10-18 19:02:37.418265
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '5d1c8e0f7a24'
+down_revision = '066e63edc822'
+branch_labels = None
+depends_on = None
+
+LOWERED = (('actors', 'name'), ('movies', 'title'))
+
+
+def _rebuild(collate):
+    for table, column in LOWERED:
+        op.execute(f'DROP INDEX IF EXISTS ix_{table}_lower_{column}')
+        op.execute(f'CREATE INDEX ix_{table}_lower_{column} '
+                   f'ON {table} (lower({column}){collate})')
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        _rebuild(' COLLATE "C"')
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        _rebuild('')
@@ -0,0 +1,63 @@
+"""fts5 prefix indexes
+
+Recreates the SQLite FTS5 tables with indexes of the 1 to 4 character
+prefixes, so the search reads broad prefixes as a stream instead of
+expanding them over every matching row. PostgreSQL is left unchanged.
+
+Revision ID: 8b3e51f0c2d6
+Revises: 5d1c8e0f7a24
+Create Date: 2026-10-18 21:14:52.803117
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8b3e51f0c2d6'
+down_revision = '5d1c8e0f7a24'
+branch_labels = None
+depends_on = None
+
+SEARCHED = (('actors', 'name'), ('movies', 'title'))
+
+
+def _recreate(options):
+    for table, column in SEARCHED:
+        fts = f'{table}_search'
+        for trigger in ('insert', 'delete', 'update'):
+            op.execute(f'DROP TRIGGER IF EXISTS {fts}_{trigger}')
+        op.execute(f'DROP TABLE IF EXISTS {fts}')
+        op.execute(
+            f'CREATE VIRTUAL TABLE {fts} USING fts5('
+            f"{column}, content='{table}', content_rowid='id'{options})")
+        op.execute(
+            f'CREATE TRIGGER {fts}_insert AFTER INSERT '
+            f'ON {table} BEGIN INSERT INTO {fts}(rowid, {column}) '
+            f'VALUES (new.id, new.{column}); END')
+        op.execute(
+            f'CREATE TRIGGER {fts}_delete AFTER DELETE '
+            f'ON {table} BEGIN INSERT INTO {fts}({fts}, rowid, {column}) '
+            f"VALUES ('delete', old.id, old.{column}); END")
+        op.execute(
+            f'CREATE TRIGGER {fts}_update AFTER UPDATE '
+            f'OF {column} ON {table} BEGIN '
+            f'INSERT INTO {fts}({fts}, rowid, {column}) '
+            f"VALUES ('delete', old.id, old.{column}); "
+            f'INSERT INTO {fts}(rowid, {column}) '
+            f'VALUES (new.id, new.{column}); END')
+        op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def _has_fts5():
+    return op.get_bind().execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'actors_search'").scalar()
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'sqlite' and _has_fts5():
+        _recreate(", prefix='1 2 3 4'")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite' and _has_fts5():
+        _recreate('')
@@ -0,0 +1,27 @@
+"""add keyset pagination indexes
+
+Revision ID: a3659f4eaded
+Revises: 2a9f45a4cf36
+Create Date: 2026-10-18 10:03:27.540117
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3659f4eaded'
+down_revision = '2a9f45a4cf36'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_actors_created_at_id', 'actors',
+                    ['created_at', 'id'], unique=False)
+    op.create_index('ix_movies_created_at_id', 'movies',
+                    ['created_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_movies_created_at_id', table_name='movies')
+    op.drop_index('ix_actors_created_at_id', table_name='actors')
@@ -10,9 +10,15 @@ TEST_ASSISTANT_CLIENT_SECRET = os.getenv('TEST_ASSISTANT_CLIENT_SECRET')
 TEST_DIRECTOR_CLIENT_ID = os.getenv('TEST_DIRECTOR_CLIENT_ID')
 TEST_DIRECTOR_CLIENT_SECRET = os.getenv('TEST_DIRECTOR_CLIENT_SECRET')
 API_AUDIENCE = os.getenv('API_AUDIENCE')
+AUTH_KEY_PROVIDER = os.getenv('AUTH_KEY_PROVIDER', 'jwks')
 
 
 def get_token(type):
+    if AUTH_KEY_PROVIDER == 'local':
+        # Signed by the app's own key provider, no Auth0 round trip
+        from auth.auth import key_provider
+        from .local_auth import ROLE_PERMISSIONS
+        return key_provider.mint(ROLE_PERMISSIONS[type], subject=type)
     conn = http.client.HTTPSConnection(AUTH0_DOMAIN)
     if type == 'producer':
         client_id = TEST_PRODUCER_CLIENT_ID
@@ -0,0 +1,37 @@
+import time
+from unittest import mock
+
+# Permissions granted to each role, mirroring the Auth0 RBAC setup
+ROLE_PERMISSIONS = {
+    'assistant': ['get:actors', 'get:movies'],
+    'director': ['get:actors', 'get:movies', 'post:actors',
+                 'patch:actors', 'delete:actors', 'patch:movies'],
+    'producer': ['get:actors', 'get:movies', 'post:actors',
+                 'patch:actors', 'delete:actors', 'post:movies',
+                 'patch:movies', 'delete:movies'],
+}
+
+
+def verify_role_token(token):
+    return {
+        'sub': token,
+        'exp': time.time() + 3600,
+        'permissions': ROLE_PERMISSIONS[token],
+    }
+
+
+async def verify_role_token_async(token):
+    return verify_role_token(token)
+
+
+def local_auth():
+    '''Accepts the role names of ROLE_PERMISSIONS as bearer tokens
+    without contacting Auth0, in the WSGI and ASGI apps alike.'''
+    return mock.patch.multiple(
+        'auth.auth',
+        verify_decode_jwt=mock.Mock(side_effect=verify_role_token),
+        verify_decode_jwt_async=verify_role_token_async)
+
+
+def auth_header(role):
+    return {'Authorization': f'Bearer {role}'}
@@ -0,0 +1,65 @@
+import unittest
+from unittest import mock
+from datetime import date, timedelta
+
+from app import app, age
+from app.age import age_on, ages, years_before, dob_range
+
+
+class AgeTestCase(unittest.TestCase):
+    """This class represents the actor age computation test case"""
+    def test_birthday_counts_from_the_day_itself(self):
+        dob = date(1990, 6, 15)
+
+        self.assertEqual(age_on(dob, date(2020, 6, 14)), 29)
+        self.assertEqual(age_on(dob, date(2020, 6, 15)), 30)
+        self.assertEqual(age_on(dob, date(2020, 6, 16)), 30)
+
+    def test_leap_day_birthdays(self):
+        dob = date(2000, 2, 29)
+
+        self.assertEqual(age_on(dob, date(2023, 2, 28)), 22)
+        self.assertEqual(age_on(dob, date(2023, 3, 1)), 23)
+        self.assertEqual(age_on(dob, date(2024, 2, 28)), 23)
+        self.assertEqual(age_on(dob, date(2024, 2, 29)), 24)
+
+    def test_new_year_and_year_end(self):
+        self.assertEqual(age_on(date(1999, 12, 31), date(2000, 1, 1)), 0)
+        self.assertEqual(age_on(date(1999, 12, 31), date(2000, 12, 31)), 1)
+        self.assertEqual(age_on(date(2000, 1, 1), date(2000, 12, 31)), 0)
+
+    def test_batch_matches_single_ages_with_and_without_numpy(self):
+        start = date(1995, 1, 1)
+        dobs = [start + timedelta(days=i) for i in range(0, 3000, 7)]
+        dobs.append(date(1996, 2, 29))
+        for day in (date(2024, 2, 28), date(2024, 2, 29), date(2023, 3, 1),
+                    date(2025, 12, 31)):
+            expected = [age_on(dob, day) for dob in dobs]
+            with mock.patch.object(age, 'AGE_NUMPY_THRESHOLD', 0):
+                vectorized = ages(dobs, day)
+            with mock.patch.object(age, 'numpy', None):
+                plain = ages(dobs, day)
+
+            self.assertEqual(vectorized, expected, day)
+            self.assertEqual(plain, expected, day)
+            self.assertTrue(all(type(value) is int for value in vectorized))
+
+    def test_dob_range_agrees_with_age_on(self):
+        dobs = [date(1980, 1, 1) + timedelta(days=i) for i in range(0, 800)]
+        for day in (date(2024, 2, 29), date(2023, 2, 28), date(2023, 3, 1)):
+            earliest, latest = dob_range(42, 43, day)
+            in_range = [dob for dob in dobs if earliest < dob <= latest]
+            expected = [dob for dob in dobs if 42 <= age_on(dob, day) <= 43]
+
+            self.assertEqual(in_range, expected, day)
+
+    def test_years_before_maps_leap_day_to_february_28(self):
+        self.assertEqual(years_before(date(2024, 2, 29), 1), date(2023, 2, 28))
+
+    def test_today_is_fixed_for_a_request(self):
+        with app.test_request_context():
+            first = age.today()
+            with mock.patch.object(age, 'datetime') as clock:
+                clock.now.return_value.date.return_value = date(1999, 1, 1)
+
+                self.assertEqual(age.today(), first)
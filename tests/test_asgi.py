@@ -0,0 +1,143 @@
+import os
+import json
+import asyncio
+import unittest
+from datetime import date
+
+from app import app
+from app.asgi import ASGIApplication, ThreadPoolDatabase, _named_to_numbered
+from app.models import db, setup_db, Actor, Movie, Casting
+from .local_auth import local_auth, auth_header
+
+
+class ASGITestCase(unittest.TestCase):
+    """This class represents the ASGI serving mode test case"""
+    def setUp(self):
+        self.app = app
+        database_path = os.getenv('TEST_DATABASE_URI', 'sqlite://')
+        setup_db(self.app, database_path)
+        self.auth = local_auth()
+        self.auth.start()
+        with self.app.app_context():
+            db.create_all()
+            actor = Actor(name='Actor', dob=date(1990, 1, 1), gender='male')
+            actor.insert()
+            movie = Movie(title='Movie', release_date=date(2000, 1, 1))
+            movie.insert()
+            self.actor_id = actor.id
+            self.movie_id = movie.id
+        self.application = ASGIApplication(self.app, threads=2)
+
+    def tearDown(self):
+        self.auth.stop()
+        self.application.executor.shutdown()
+        with self.app.app_context():
+            db.session.query(Casting).delete()
+            db.session.query(Actor).delete()
+            db.session.query(Movie).delete()
+            db.session.commit()
+
+    def request(self, path, method='GET', body=b'', role='assistant',
+                headers=None):
+        headers = dict(auth_header(role) if role else {}, **(headers or {}))
+        scope = {
+            'type': 'http',
+            'method': method,
+            'path': path.split('?')[0],
+            'query_string': path.partition('?')[2].encode(),
+            'headers': [(name.lower().encode(), value.encode())
+                        for name, value in headers.items()],
+        }
+        messages = [{'type': 'http.request', 'body': body}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(self.application(scope, receive, send))
+        start = sent[0]
+        response_headers = {name.decode(): value.decode()
+                            for name, value in start['headers']}
+        data = b''.join(message.get('body', b'') for message in sent[1:])
+        return start['status'], response_headers, data
+
+    def test_async_route_matches_flask(self):
+        path = f'/api/v1/actors/{self.actor_id}'
+        status, headers, data = self.request(path)
+        flask_response = self.app.test_client().get(
+            path, headers=auth_header('assistant'))
+
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(data), json.loads(flask_response.data))
+        self.assertEqual(headers['etag'], flask_response.headers['ETag'])
+
+    def test_async_route_answers_conditional_requests(self):
+        path = f'/api/v1/actors/{self.actor_id}'
+        status, headers, data = self.request(path)
+        status, headers, data = self.request(
+            path, headers={'If-None-Match': headers['etag']})
+
+        self.assertEqual(status, 304)
+        self.assertEqual(data, b'')
+
+    def test_async_route_errors(self):
+        status, headers, data = self.request('/api/v1/movies/999999')
+        self.assertEqual(status, 404)
+        self.assertEqual(json.loads(data)['message'], 'resource not found')
+
+        status, headers, data = self.request('/api/v1/movies/1', role=None)
+        self.assertEqual(status, 401)
+
+    def test_other_requests_run_the_flask_app(self):
+        status, headers, data = self.request(
+            f'/api/v1/movies/{self.movie_id}/cast', method='POST',
+            role='producer', headers={'Content-Type': 'application/json'},
+            body=json.dumps({'actor_id': self.actor_id,
+                             'role': 'Lead'}).encode())
+        self.assertEqual(status, 201)
+
+        status, headers, data = self.request(
+            f'/api/v1/movies/{self.movie_id}/cast?limit=5')
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(data)['cast'][0]['role'], 'Lead')
+
+    def test_thread_pool_database(self):
+        database = ThreadPoolDatabase(None, self.application.executor)
+        with self.app.app_context():
+            database.engine = db.engine
+
+        row = asyncio.run(database.fetch_one(
+            'SELECT name FROM actors WHERE id = :id', id=self.actor_id))
+
+        self.assertEqual(row, {'name': 'Actor'})
+
+    def test_concurrent_first_requests_connect_once(self):
+        class SlowDatabase:
+            connects = 0
+
+            async def connect(self):
+                SlowDatabase.connects += 1
+                await asyncio.sleep(0.01)
+
+        application = ASGIApplication(self.app, threads=1,
+                                      database=SlowDatabase())
+
+        async def first_requests():
+            await asyncio.gather(*(application.startup() for _ in range(5)))
+        try:
+            asyncio.run(first_requests())
+        finally:
+            application.executor.shutdown()
+
+        self.assertEqual(SlowDatabase.connects, 1)
+        self.assertTrue(application.started)
+
+    def test_named_parameters_become_numbered(self):
+        statement, args = _named_to_numbered(
+            'SELECT 1 WHERE a = :a AND b::text = :b', {'a': 1, 'b': 2})
+
+        self.assertEqual(statement, 'SELECT 1 WHERE a = $1 AND b::text = $2')
+        self.assertEqual(args, [1, 2])
@@ -0,0 +1,99 @@
+import os
+import json
+import unittest
+from datetime import date
+
+from sqlalchemy import event
+
+from app import app
+from app.models import db, setup_db, Actor, Movie
+from app.batch import parse_ids, fetch_by_ids
+from .local_auth import local_auth, auth_header
+
+
+class BatchReadTestCase(unittest.TestCase):
+    """This class represents the batch read by ids test case"""
+    def setUp(self):
+        self.app = app
+        self.client = self.app.test_client
+        database_path = os.getenv('TEST_DATABASE_URI', 'sqlite://')
+        setup_db(self.app, database_path)
+        self.auth = local_auth()
+        self.auth.start()
+        with self.app.app_context():
+            db.create_all()
+            actors = [Actor(name=f'Actor {i}', dob=date(1990, 1, 1),
+                            gender='female') for i in range(5)]
+            movie = Movie(title='Movie', release_date=date(2020, 1, 1))
+            db.session.add_all(actors + [movie])
+            db.session.commit()
+            self.ids = [actor.id for actor in actors]
+            self.movie_id = movie.id
+
+    def tearDown(self):
+        self.auth.stop()
+        with self.app.app_context():
+            db.session.query(Actor).delete()
+            db.session.query(Movie).delete()
+            db.session.commit()
+
+    def get(self, path, role='assistant'):
+        response = self.client().get(path, headers=auth_header(role))
+        return response, json.loads(response.data)
+
+    def test_actors_in_requested_order(self):
+        ids = [self.ids[3], self.ids[0], self.ids[3], self.ids[1]]
+        response, data = self.get(
+            f"/api/v1/actors?ids={','.join(map(str, ids))}")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([actor['id'] for actor in data['actors']],
+                         [self.ids[3], self.ids[0], self.ids[1]])
+        self.assertEqual(data['missing'], [])
+
+    def test_missing_ids_are_reported(self):
+        unknown = max(self.ids) + 100
+        response, data = self.get(
+            f'/api/v1/actors?ids={unknown},{self.ids[2]}&fields=id,name')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['actors'],
+                         [{'id': self.ids[2], 'name': 'Actor 2'}])
+        self.assertEqual(data['missing'], [unknown])
+
+    def test_movies_by_ids_with_cast(self):
+        response, data = self.get(
+            f'/api/v1/movies?ids={self.movie_id}&include=cast')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['movies'][0]['title'], 'Movie')
+        self.assertEqual(data['movies'][0]['cast'], [])
+
+    def test_invalid_ids(self):
+        for value in ('', '1,a', '0', '-1'):
+            response, _ = self.get(f'/api/v1/actors?ids={value}')
+            self.assertEqual(response.status_code, 400, value)
+
+    def test_too_many_ids(self):
+        with self.assertRaises(ValueError):
+            parse_ids('1,2,3', max_ids=2)
+
+    def test_single_query_and_identity_map(self):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, *args):
+            statements.append(parameters)
+
+        with self.app.app_context():
+            first = Actor.query.get(self.ids[0])
+            event.listen(db.engine, 'before_cursor_execute', record)
+            try:
+                actors, missing = fetch_by_ids(Actor, self.ids)
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', record)
+
+        self.assertIs(actors[0], first)
+        self.assertEqual(len(actors), 5)
+        self.assertEqual(len(statements), 1)
+        # The actor already in the identity map is not loaded again
+        self.assertNotIn(self.ids[0], statements[0])
@@ -0,0 +1,147 @@
+import os
+import json
+import unittest
+from datetime import date
+
+from app import app
+from app.models import db, setup_db, Actor, Movie
+from tests import mock_data
+from .local_auth import local_auth, auth_header
+
+
+class BulkTestCase(unittest.TestCase):
+    """This class represents the bulk endpoints test case"""
+    def setUp(self):
+        self.app = app
+        self.client = self.app.test_client
+        database_path = os.getenv('TEST_DATABASE_URI', 'sqlite://')
+        setup_db(self.app, database_path)
+        self.auth = local_auth()
+        self.auth.start()
+        with self.app.app_context():
+            db.create_all()
+            actor = Actor(name='Mugerwa Fred', dob=date(1996, 5, 7),
+                          gender='male')
+            actor.insert()
+            self.actor_id = actor.id
+
+    def tearDown(self):
+        self.auth.stop()
+        with self.app.app_context():
+            db.session.query(Actor).delete()
+            db.session.query(Movie).delete()
+            db.session.commit()
+
+    def post(self, url, operations, role='producer', ndjson=False):
+        if ndjson:
+            body = '\n'.join(json.dumps(operation)
+                             for operation in operations)
+            content_type = 'application/x-ndjson'
+        else:
+            body = json.dumps(operations)
+            content_type = 'application/json'
+        return self.client().post(url, data=body,
+                                  content_type=content_type,
+                                  headers=auth_header(role))
+
+    def test_bulk_actor_operations(self):
+        response = self.post('/api/v1/actors/bulk?chunk_size=2', [
+            {'op': 'create', 'data': {
+                'name': 'Actor A', 'dob': '1990-01-02', 'gender': 'female'}},
+            {'op': 'create', 'data': {
+                'name': 'Actor B', 'dob': '1991-01-02', 'gender': 'male'}},
+            {'op': 'create', 'data': {
+                'name': 'Actor C', 'dob': '1992-01-02', 'gender': 'male'}},
+            {'op': 'update', 'id': self.actor_id,
+             'data': {'name': 'Fred Mugerwa'}},
+            {'op': 'delete', 'id': 99999},
+        ])
+        data = json.loads(response.data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(data['success'])
+        statuses = [result['status'] for result in data['results']]
+        self.assertEqual(statuses, [201, 201, 201, 200, 404])
+        with self.app.app_context():
+            self.assertEqual(Actor.query.count(), 4)
+            self.assertEqual(Actor.query.get(self.actor_id).name,
+                             'Fred Mugerwa')
+            created = Actor.query.get(data['results'][2]['id'])
+            self.assertEqual(created.dob, date(1992, 1, 2))
+
+    def test_bulk_delete_with_ndjson(self):
+        response = self.post('/api/v1/actors/bulk', [
+            {'op': 'delete', 'id': self.actor_id},
+            {'op': 'delete', 'id': self.actor_id},
+        ], ndjson=True)
+        data = json.loads(response.data)
+
+        self.assertEqual(response.status_code, 200)
+        statuses = [result['status'] for result in data['results']]
+        self.assertEqual(statuses, [200, 404])
+        with self.app.app_context():
+            self.assertEqual(Actor.query.count(), 0)
+
+    def test_bulk_invalid_operations_are_reported(self):
+        response = self.post('/api/v1/movies/bulk', [
+            {'op': 'create', 'data': {'title': 'No date'}},
+            {'op': 'create', 'data': {
+                'title': 'Bad date', 'release_date': 'soon'}},
+            {'op': 'create', 'data': {
+                'title': 'Extra', 'release_date': '2020-01-01',
+                'rating': 5}},
+            {'op': 'create', 'data': {
+                'title': 'Good', 'release_date': '2020-01-01'}},
+        ])
+        data = json.loads(response.data)
+
+        self.assertEqual(response.status_code, 200)
+        statuses = [result['status'] for result in data['results']]
+        self.assertEqual(statuses, [422, 422, 422, 201])
+        with self.app.app_context():
+            self.assertEqual(Movie.query.count(), 1)
+
+    def test_bulk_update_invalidates_patch_etag(self):
+        patch = self.client().patch(
+            f'/api/v1/actors/{self.actor_id}',
+            data=json.dumps({'name': 'Patched'}),
+            content_type='application/json', headers=auth_header('producer'))
+        self.post('/api/v1/actors/bulk', [
+            {'op': 'update', 'id': self.actor_id,
+             'data': {'name': 'Bulk'}},
+            {'op': 'update', 'id': self.actor_id,
+             'data': {'gender': 'female'}},
+        ])
+        stale = self.client().patch(
+            f'/api/v1/actors/{self.actor_id}',
+            data=json.dumps({'name': 'Stale'}),
+            content_type='application/json',
+            headers=dict(auth_header('producer'),
+                         **{'If-Match': patch.headers['ETag']}))
+
+        self.assertEqual(stale.status_code, 412)
+        with self.app.app_context():
+            actor = Actor.query.get(self.actor_id)
+            self.assertEqual((actor.name, actor.gender), ('Bulk', 'female'))
+            # Each update of the batch bumped the version in SQL
+            self.assertEqual(actor.version, 4)
+
+    def test_bulk_requires_permission_for_every_operation(self):
+        response = self.post('/api/v1/movies/bulk', [
+            {'op': 'create', 'data': {
+                'title': 'Movie', 'release_date': '2020-01-01'}},
+        ], role='director')
+        data = json.loads(response.data)
+
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(data, mock_data.forbidden_error_response)
+        with self.app.app_context():
+            self.assertEqual(Movie.query.count(), 0)
+
+    def test_bulk_with_malformed_body(self):
+        response = self.client().post(
+            '/api/v1/actors/bulk', data='{"op": "create"}',
+            content_type='application/json',
+            headers=auth_header('producer'))
+
+        self.assertEqual(response.status_code, 400)
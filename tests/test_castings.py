@@ -0,0 +1,151 @@
+import os
+import json
+import unittest
+from datetime import date
+
+from sqlalchemy import event
+
+from app import app
+from app.models import db, setup_db, Actor, Movie, Casting
+from .local_auth import local_auth, auth_header
+
+
+class CastingTestCase(unittest.TestCase):
+    """This class represents the actor-movie casting test case"""
+    def setUp(self):
+        self.app = app
+        self.client = self.app.test_client
+        database_path = os.getenv('TEST_DATABASE_URI', 'sqlite://')
+        setup_db(self.app, database_path)
+        self.auth = local_auth()
+        self.auth.start()
+        with self.app.app_context():
+            db.create_all()
+            self.seed(movies=3, cast_size=4)
+            self.queries = 0
+            event.listen(db.engine, 'before_cursor_execute', self.count)
+
+    def tearDown(self):
+        self.auth.stop()
+        with self.app.app_context():
+            event.remove(db.engine, 'before_cursor_execute', self.count)
+            db.session.query(Casting).delete()
+            db.session.query(Actor).delete()
+            db.session.query(Movie).delete()
+            db.session.commit()
+
+    def seed(self, movies, cast_size):
+        actors = [Actor(name=f'Actor {i}', dob=date(1980, 1, 1 + i),
+                        gender='female') for i in range(cast_size)]
+        movies = [Movie(title=f'Movie {i}', release_date=date(2000 + i, 1, 1))
+                  for i in range(movies)]
+        db.session.add_all(actors + movies)
+        db.session.flush()
+        db.session.add_all(
+            Casting(movie_id=movie.id, actor_id=actor.id, role=f'Role {j}',
+                    billing_order=cast_size - j)
+            for movie in movies for j, actor in enumerate(actors))
+        db.session.commit()
+
+    def count(self, *args):
+        self.queries += 1
+
+    def queries_for(self, url):
+        self.queries = 0
+        response = self.client().get(url, headers=auth_header('assistant'))
+        self.assertEqual(response.status_code, 200)
+        return self.queries
+
+    def test_retrieve_movies_with_cast(self):
+        response = self.client().get('/api/v1/movies?include=cast',
+                                     headers=auth_header('assistant'))
+        data = json.loads(response.data)
+
+        self.assertEqual(response.status_code, 200)
+        cast = data['movies'][0]['cast']
+        self.assertEqual(len(cast), 4)
+        self.assertEqual([casting['billing_order'] for casting in cast],
+                         [1, 2, 3, 4])
+        self.assertEqual(cast[0]['actor']['name'], 'Actor 3')
+
+    def test_include_cast_runs_a_constant_number_of_queries(self):
+        small = self.queries_for('/api/v1/movies?include=cast&limit=1')
+        with self.app.app_context():
+            self.seed(movies=50, cast_size=10)
+        large = self.queries_for('/api/v1/movies?include=cast&limit=100')
+
+        self.assertEqual(small, large)
+
+    def test_unknown_include_is_rejected(self):
+        response = self.client().get('/api/v1/movies?include=crew',
+                                     headers=auth_header('assistant'))
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_retrieve_cast_and_filmography(self):
+        with self.app.app_context():
+            movie_id = Movie.query.filter_by(title='Movie 1').one().id
+            actor_id = Actor.query.filter_by(name='Actor 0').one().id
+        cast = self.client().get(f'/api/v1/movies/{movie_id}/cast',
+                                 headers=auth_header('assistant'))
+        movies = self.client().get(f'/api/v1/actors/{actor_id}/movies',
+                                   headers=auth_header('assistant'))
+
+        self.assertEqual(cast.status_code, 200)
+        self.assertEqual(len(json.loads(cast.data)['cast']), 4)
+        self.assertEqual(movies.status_code, 200)
+        self.assertEqual(
+            [casting['movie']['title']
+             for casting in json.loads(movies.data)['movies']],
+            ['Movie 0', 'Movie 1', 'Movie 2'])
+
+    def test_add_casting_invalidates_cached_listing(self):
+        with self.app.app_context():
+            movie_id = Movie.query.filter_by(title='Movie 0').one().id
+            actor = Actor(name='Newcomer', dob=date(2000, 1, 1),
+                          gender='male')
+            actor.insert()
+            actor_id = actor.id
+        first = self.client().get('/api/v1/movies?include=cast',
+                                  headers=auth_header('assistant'))
+        response = self.client().post(
+            f'/api/v1/movies/{movie_id}/cast',
+            json={'actor_id': actor_id, 'role': 'Cameo', 'billing_order': 9},
+            headers=auth_header('director'))
+        second = self.client().get(
+            '/api/v1/movies?include=cast',
+            headers=dict(auth_header('assistant'),
+                         **{'If-None-Match': first.headers['ETag']}))
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(
+            json.loads(second.data)['movies'][0]['cast'][-1]['role'],
+            'Cameo')
+
+    def test_add_casting_requires_patch_movies(self):
+        with self.app.app_context():
+            movie_id = Movie.query.first().id
+            actor_id = Actor.query.first().id
+        response = self.client().post(
+            f'/api/v1/movies/{movie_id}/cast',
+            json={'actor_id': actor_id, 'role': 'Extra'},
+            headers=auth_header('assistant'))
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_add_duplicate_casting_is_unprocessable(self):
+        with self.app.app_context():
+            casting = Casting.query.first()
+            url = f'/api/v1/movies/{casting.movie_id}/cast'
+            body = {'actor_id': casting.actor_id, 'role': casting.role}
+        response = self.client().post(url, json=body,
+                                      headers=auth_header('director'))
+
+        self.assertEqual(response.status_code, 422)
+
+    def test_deleting_an_actor_removes_their_castings(self):
+        with self.app.app_context():
+            Actor.query.filter_by(name='Actor 0').one().delete()
+
+            self.assertEqual(Casting.query.count(), 9)
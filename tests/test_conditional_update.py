@@ -0,0 +1,123 @@
+import os
+import json
+import unittest
+from datetime import date
+
+from app import app
+from app.models import db, setup_db, Actor, Movie, StaleVersion
+from .local_auth import local_auth, auth_header
+
+
+class ConditionalUpdateTestCase(unittest.TestCase):
+    """This class represents the optimistic concurrency test case"""
+    def setUp(self):
+        self.app = app
+        self.client = self.app.test_client
+        database_path = os.getenv('TEST_DATABASE_URI', 'sqlite://')
+        setup_db(self.app, database_path)
+        self.auth = local_auth()
+        self.auth.start()
+        with self.app.app_context():
+            db.create_all()
+            actor = Actor(name='Actor', dob=date(1990, 1, 1),
+                          gender='female')
+            movie = Movie(title='Movie', release_date=date(2020, 1, 1))
+            db.session.add_all([actor, movie])
+            db.session.commit()
+            self.actor_id = actor.id
+            self.movie_id = movie.id
+
+    def tearDown(self):
+        self.auth.stop()
+        with self.app.app_context():
+            db.session.query(Actor).delete()
+            db.session.query(Movie).delete()
+            db.session.commit()
+
+    def patch(self, path, data, etag=None, role='producer'):
+        headers = auth_header(role)
+        if etag is not None:
+            headers['If-Match'] = etag
+        return self.client().patch(path, data=json.dumps(data),
+                                   content_type='application/json',
+                                   headers=headers)
+
+    def actor_etag(self):
+        response = self.client().get(f'/api/v1/actors/{self.actor_id}',
+                                     headers=auth_header('assistant'))
+        return response.headers['ETag']
+
+    def test_update_without_if_match(self):
+        response = self.patch(f'/api/v1/actors/{self.actor_id}',
+                              {'name': 'Renamed', 'dob': '1991-02-03'})
+        data = json.loads(response.data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['actor']['name'], 'Renamed')
+        self.assertIn(f'actors-{self.actor_id}-v2', response.headers['ETag'])
+        with self.app.app_context():
+            actor = Actor.query.get(self.actor_id)
+            self.assertEqual(actor.dob, date(1991, 2, 3))
+            self.assertEqual(actor.version, 2)
+
+    def test_if_match_with_current_etag(self):
+        etag = self.actor_etag()
+        response = self.patch(f'/api/v1/actors/{self.actor_id}',
+                              {'name': 'Renamed'}, etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_concurrent_edit_is_rejected(self):
+        etag = self.actor_etag()
+        first = self.patch(f'/api/v1/actors/{self.actor_id}',
+                           {'name': 'First'}, etag)
+        second = self.patch(f'/api/v1/actors/{self.actor_id}',
+                            {'name': 'Second'}, etag)
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 412)
+        self.assertEqual(json.loads(second.data)['error'], 412)
+        with self.app.app_context():
+            self.assertEqual(Actor.query.get(self.actor_id).name, 'First')
+
+    def test_if_match_of_another_resource(self):
+        response = self.patch(f'/api/v1/actors/{self.actor_id}',
+                              {'name': 'Renamed'}, '"movies-1-v1"')
+
+        self.assertEqual(response.status_code, 412)
+
+    def test_unknown_and_read_only_columns_are_rejected(self):
+        for data in ({'nickname': 'x'}, {'version': 7}, {}):
+            response = self.patch(f'/api/v1/actors/{self.actor_id}', data)
+            self.assertEqual(response.status_code, 422, data)
+
+    def test_missing_row(self):
+        response = self.patch(f'/api/v1/movies/{self.movie_id + 100}',
+                              {'title': 'Renamed'})
+
+        self.assertEqual(response.status_code, 422)
+
+    def test_movie_update(self):
+        response = self.patch(f'/api/v1/movies/{self.movie_id}',
+                              {'release_date': '2021-05-06'},
+                              f'"movies-{self.movie_id}-v1"')
+        data = json.loads(response.data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['movie']['release_date'], '2021-05-06')
+
+    def test_update_by_id_stale_version(self):
+        with self.app.app_context():
+            with self.assertRaises(StaleVersion):
+                Actor.update_by_id(self.actor_id, {'name': 'x'}, version=5)
+            self.assertIsNone(
+                Actor.update_by_id(self.actor_id + 100, {'name': 'x'}))
+
+    def test_update_by_id_leaves_values_untouched(self):
+        values = {'name': 'Renamed'}
+        with self.app.app_context():
+            row = Actor.update_by_id(self.actor_id, values)
+
+        self.assertEqual(values, {'name': 'Renamed'})
+        self.assertEqual(row.version, 2)
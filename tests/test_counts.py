@@ -0,0 +1,45 @@
+import os
+import unittest
+from datetime import date
+
+from app import app
+from app.models import db, setup_db, Actor
+from app.counts import count_rows, cached_count
+
+
+class CountsTestCase(unittest.TestCase):
+    """This class represents the row count strategies test case"""
+    def setUp(self):
+        self.app = app
+        database_path = os.getenv('TEST_DATABASE_URI', 'sqlite://')
+        setup_db(self.app, database_path)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        for i in range(3):
+            Actor(name=f'Actor {i}', dob=date(1990, 1, 1), gender='female'
+                  ).insert()
+
+    def tearDown(self):
+        db.session.query(Actor).delete()
+        db.session.commit()
+        cached_count.invalidate(Actor)
+        self.context.pop()
+
+    def test_exact_count(self):
+        self.assertEqual(count_rows(Actor, 'exact'), 3)
+
+    def test_approximate_count(self):
+        self.assertEqual(count_rows(Actor, 'approximate'), 3)
+
+    def test_cached_count_is_invalidated_by_insert(self):
+        self.assertEqual(count_rows(Actor, 'cached'), 3)
+        Actor(name='Actor 3', dob=date(1990, 1, 1), gender='male').insert()
+
+        self.assertEqual(count_rows(Actor, 'cached'), 4)
+
+    def test_cached_count_is_invalidated_by_delete(self):
+        self.assertEqual(count_rows(Actor, 'cached'), 3)
+        Actor.query.first().delete()
+
+        self.assertEqual(count_rows(Actor, 'cached'), 2)
@@ -0,0 +1,67 @@
+import os
+import csv
+import json
+import unittest
+from io import StringIO
+from datetime import date
+
+from app import app
+from app.models import db, setup_db, Actor, Movie
+from tests import mock_data
+from .local_auth import local_auth, auth_header
+
+
+class ExportTestCase(unittest.TestCase):
+    """This class represents the catalog export test case"""
+    def setUp(self):
+        self.app = app
+        self.client = self.app.test_client
+        database_path = os.getenv('TEST_DATABASE_URI', 'sqlite://')
+        setup_db(self.app, database_path)
+        self.auth = local_auth()
+        self.auth.start()
+        with self.app.app_context():
+            db.create_all()
+            for i in range(5):
+                Actor(name=f'Actor {i}', dob=date(1990, 1, 1 + i),
+                      gender='female').insert()
+                Movie(title=f'Movie {i}', release_date=date(2000, 1, 1 + i)
+                      ).insert()
+
+    def tearDown(self):
+        self.auth.stop()
+        with self.app.app_context():
+            db.session.query(Actor).delete()
+            db.session.query(Movie).delete()
+            db.session.commit()
+
+    def test_export_actors_as_ndjson(self):
+        response = self.client().get('/api/v1/actors/export',
+                                     headers=auth_header('assistant'))
+        rows = [json.loads(line)
+                for line in response.data.decode().splitlines()]
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0].keys(), mock_data.actor.keys())
+        self.assertEqual([row['name'] for row in rows],
+                         [f'Actor {i}' for i in range(5)])
+
+    def test_export_movies_as_csv(self):
+        response = self.client().get('/api/v1/movies/export?format=csv',
+                                     headers=auth_header('assistant'))
+        rows = list(csv.DictReader(StringIO(response.data.decode())))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/csv')
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[4]['release_date'], '2000-01-05')
+
+    def test_export_with_unknown_format(self):
+        response = self.client().get('/api/v1/movies/export?format=xml',
+                                     headers=auth_header('assistant'))
+        data = json.loads(response.data)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(data, mock_data.bad_request_error_response)
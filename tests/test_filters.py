@@ -0,0 +1,114 @@
+import os
+import json
+import unittest
+from datetime import date
+
+from sqlalchemy import and_
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex
+
+from app import app
+from app.models import db, setup_db, Actor, Movie
+from app.filters import actor_criteria, prefix_criteria
+from .local_auth import local_auth, auth_header
+
+
+class FilterTestCase(unittest.TestCase):
+    """This class represents the list filtering and sorting test case"""
+    def setUp(self):
+        self.app = app
+        self.client = self.app.test_client
+        database_path = os.getenv('TEST_DATABASE_URI', 'sqlite://')
+        setup_db(self.app, database_path)
+        self.auth = local_auth()
+        self.auth.start()
+        with self.app.app_context():
+            db.create_all()
+            for name, dob, gender in (
+                    ('Alice Adams', date(1960, 5, 1), 'female'),
+                    ('alfred Brown', date(1990, 5, 1), 'male'),
+                    ('Bob Cole', date(2000, 5, 1), 'male'),
+                    ('Al_ Dee', date(1980, 5, 1), 'female')):
+                Actor(name=name, dob=dob, gender=gender).insert()
+            for i in range(4):
+                Movie(title=f'Movie {i}', release_date=date(2000 + i, 6, 1)
+                      ).insert()
+
+    def tearDown(self):
+        self.auth.stop()
+        with self.app.app_context():
+            db.session.query(Actor).delete()
+            db.session.query(Movie).delete()
+            db.session.commit()
+
+    def get(self, url):
+        response = self.client().get(url, headers=auth_header('assistant'))
+        return response, json.loads(response.data)
+
+    def names(self, url):
+        response, data = self.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [actor['name'] for actor in data['actors']]
+
+    def test_filter_actors_by_gender_and_prefix(self):
+        self.assertEqual(self.names('/api/v1/actors?gender=male&sort=name'),
+                         ['Bob Cole', 'alfred Brown'])
+        self.assertEqual(self.names('/api/v1/actors?name_prefix=AL&sort=id'),
+                         ['Alice Adams', 'alfred Brown', 'Al_ Dee'])
+
+    def test_name_prefix_escapes_like_wildcards(self):
+        self.assertEqual(self.names('/api/v1/actors?name_prefix=al_'),
+                         ['Al_ Dee'])
+
+    def test_prefix_is_compared_bytewise_on_postgresql(self):
+        dialect = postgresql.dialect()
+        criteria = str(and_(*prefix_criteria(Actor.name, 'al'))
+                       .compile(dialect=dialect))
+        index, = [index for index in Actor.__table__.indexes
+                  if index.name == 'ix_actors_lower_name']
+
+        self.assertEqual(criteria.count('lower(actors.name) COLLATE "C"'), 3)
+        self.assertIn('(lower(name) COLLATE "C")',
+                      str(CreateIndex(index).compile(dialect=dialect)))
+
+    def test_age_range_is_translated_to_dob_range(self):
+        with self.app.app_context():
+            # Al_ Dee turns 41 and Bob Cole turns 21 that day
+            criteria = actor_criteria({'min_age': '22', 'max_age': '40'},
+                                      today=date(2021, 5, 1))
+            names = [actor.name for actor in
+                     Actor.query.filter(*criteria).order_by(Actor.id)]
+
+        self.assertEqual(names, ['alfred Brown'])
+
+    def test_filtered_total_counts_matching_rows(self):
+        response, data = self.get('/api/v1/movies?released_after=2001-12-31')
+
+        self.assertEqual(data['total-movies'], 2)
+        self.assertEqual([movie['title'] for movie in data['movies']],
+                         ['Movie 2', 'Movie 3'])
+
+    def test_descending_sort_pages_with_cursor(self):
+        titles, cursor = [], ''
+        while cursor is not None:
+            response, data = self.get(
+                f'/api/v1/movies?sort=-release_date&limit=3&cursor={cursor}')
+            titles.extend(movie['title'] for movie in data['movies'])
+            cursor = data['next_cursor']
+
+        self.assertEqual(titles, [f'Movie {i}' for i in (3, 2, 1, 0)])
+
+    def test_sparse_fieldset(self):
+        response, data = self.get('/api/v1/actors?fields=name,age&sort=dob')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(data['actors'][0]), ['age', 'name'])
+        self.assertEqual(data['actors'][0]['name'], 'Alice Adams')
+
+    def test_invalid_parameters_are_rejected(self):
+        for query in ('fields=salary', 'sort=title', 'min_age=old',
+                      'max_age=-1'):
+            response, data = self.get(f'/api/v1/actors?{query}')
+            self.assertEqual(response.status_code, 400, query)
+        response, data = self.get('/api/v1/movies?released_after=2001')
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,126 @@
+import os
+import json
+import unittest
+from datetime import date, datetime, timedelta
+
+from app import app
+from app.models import db, setup_db, Actor, Movie, TableVersion
+from .local_auth import local_auth, auth_header
+
+
+class HTTPCacheTestCase(unittest.TestCase):
+    """This class represents the ETag and conditional GET test case"""
+    def setUp(self):
+        self.app = app
+        self.client = self.app.test_client
+        database_path = os.getenv('TEST_DATABASE_URI', 'sqlite://')
+        setup_db(self.app, database_path)
+        self.auth = local_auth()
+        self.auth.start()
+        with self.app.app_context():
+            db.create_all()
+            movie = Movie(title='Movie', release_date=date(2000, 1, 1))
+            movie.insert()
+            self.movie_id = movie.id
+            actor = Actor(name='Actor', dob=date(1990, 1, 1), gender='male')
+            actor.insert()
+            self.actor_id = actor.id
+
+    def tearDown(self):
+        self.auth.stop()
+        with self.app.app_context():
+            db.session.query(Actor).delete()
+            db.session.query(Movie).delete()
+            db.session.commit()
+
+    def get(self, url, **headers):
+        headers.update(auth_header('producer'))
+        return self.client().get(url, headers=headers)
+
+    def test_get_movie_sets_etag(self):
+        response = self.get(f'/api/v1/movies/{self.movie_id}')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['ETag'],
+                         f'"movies-{self.movie_id}-v1"')
+        self.assertIn('no-cache', response.headers['Cache-Control'])
+
+    def test_get_movie_with_matching_etag(self):
+        etag = self.get(f'/api/v1/movies/{self.movie_id}').headers['ETag']
+        response = self.get(f'/api/v1/movies/{self.movie_id}',
+                            **{'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+        self.assertEqual(response.headers['ETag'], etag)
+
+    def test_actor_etag_changes_after_update(self):
+        url = f'/api/v1/actors/{self.actor_id}'
+        etag = self.get(url).headers['ETag']
+        self.client().patch(url, data=json.dumps({'name': 'Renamed'}),
+                            headers=auth_header('producer'))
+        response = self.get(url, **{'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertIn('-v2-', response.headers['ETag'])
+
+    def test_update_of_a_stale_instance_bumps_the_stored_version(self):
+        with self.app.app_context():
+            actor = Actor.query.get(self.actor_id)
+            # Another writer bumps the row after this instance was loaded
+            db.session.execute(Actor.__table__.update().values(
+                version=Actor.__table__.c.version + 1))
+            actor.name = 'Renamed'
+            actor.update()
+
+            self.assertEqual(actor.version, 3)
+
+    def test_list_with_matching_etag(self):
+        self.age_table_versions()
+        first = self.get('/api/v1/movies?page=1')
+        response = self.get('/api/v1/movies?page=1',
+                            **{'If-None-Match': first.headers['ETag']})
+
+        self.assertTrue(first.headers['ETag'].startswith('W/'))
+        self.assertIn('Last-Modified', first.headers)
+        self.assertEqual(response.status_code, 304)
+
+    def test_list_etag_depends_on_query(self):
+        first = self.get('/api/v1/movies?page=1')
+        response = self.get('/api/v1/movies?page=1&limit=5',
+                            **{'If-None-Match': first.headers['ETag']})
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_etag_changes_after_insert(self):
+        first = self.get('/api/v1/movies')
+        with self.app.app_context():
+            Movie(title='Sequel', release_date=date(2001, 1, 1)).insert()
+        response = self.get('/api/v1/movies',
+                            **{'If-None-Match': first.headers['ETag']})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)['total-movies'], 2)
+
+    def age_table_versions(self):
+        """Moves the last change of every table a minute back"""
+        with self.app.app_context():
+            db.session.execute(TableVersion.__table__.update().values(
+                updated_at=datetime.utcnow() - timedelta(minutes=1)))
+            db.session.commit()
+
+    def test_list_with_if_modified_since(self):
+        self.age_table_versions()
+        first = self.get('/api/v1/movies')
+        response = self.get(
+            '/api/v1/movies',
+            **{'If-Modified-Since': first.headers['Last-Modified']})
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_no_last_modified_within_the_second_of_a_change(self):
+        response = self.get('/api/v1/movies')
+
+        self.assertNotIn('Last-Modified', response.headers)
+        self.assertIn('ETag', response.headers)
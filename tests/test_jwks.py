@@ -0,0 +1,221 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import subprocess
+import tempfile
+import threading
+import unittest
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+from auth.jwks import JWKSKeyStore
+
+jwks = {
+    'keys': [
+        {'kid': 'key-1', 'kty': 'RSA', 'use': 'sig', 'n': 'abc', 'e': 'AQAB'},
+        {'kid': 'key-2', 'kty': 'RSA', 'use': 'sig', 'n': 'def', 'e': 'AQAB'},
+    ]
+}
+
+
+class StubJWKSHandler(BaseHTTPRequestHandler):
+    hits = 0
+
+    def do_GET(self):
+        StubJWKSHandler.hits += 1
+        body = json.dumps(jwks).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class JWKSFileTestCase(unittest.TestCase):
+    """This class represents the JWKS key store test case for local files"""
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.json')
+        with os.fdopen(handle, 'w') as jwks_file:
+            json.dump(jwks, jwks_file)
+        self.store = JWKSKeyStore(f'file://{self.path}')
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_get_key_by_kid(self):
+        key = self.store.get_key('key-2')
+
+        self.assertEqual(key['n'], 'def')
+
+    def test_get_key_with_unknown_kid(self):
+        self.assertIsNone(self.store.get_key('unknown'))
+
+    def test_clear_forces_reload(self):
+        self.store.get_key('key-1')
+        with open(self.path, 'w') as jwks_file:
+            json.dump({'keys': [{'kid': 'key-3'}]}, jwks_file)
+        self.store.clear()
+
+        self.assertIsNone(self.store.get_key('key-1'))
+        self.assertIsNotNone(self.store.get_key('key-3'))
+
+
+class JWKSServerTestCase(unittest.TestCase):
+    """This class represents the JWKS key store test case over HTTP"""
+    def setUp(self):
+        StubJWKSHandler.hits = 0
+        self.server = HTTPServer(('127.0.0.1', 0), StubJWKSHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        host, port = self.server.server_address
+        self.url = f'http://{host}:{port}/.well-known/jwks.json'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_keys_are_fetched_once(self):
+        store = JWKSKeyStore(self.url)
+        for _ in range(50):
+            store.get_key('key-1')
+
+        self.assertEqual(StubJWKSHandler.hits, 1)
+
+    def test_unknown_kid_refresh_is_rate_limited(self):
+        store = JWKSKeyStore(self.url, min_refresh_interval=60)
+        for _ in range(50):
+            self.assertIsNone(store.get_key('bogus'))
+
+        self.assertEqual(StubJWKSHandler.hits, 1)
+
+    def test_unknown_kid_forces_refresh_after_interval(self):
+        store = JWKSKeyStore(self.url, min_refresh_interval=0)
+        store.get_key('key-1')
+        store.get_key('bogus')
+
+        self.assertEqual(StubJWKSHandler.hits, 2)
+
+    def test_stale_keys_are_served_while_revalidating(self):
+        store = JWKSKeyStore(self.url, ttl=0, min_refresh_interval=0)
+        store.get_key('key-1')
+
+        self.assertIsNotNone(store.get_key('key-1'))
+        deadline = time.monotonic() + 5
+        while StubJWKSHandler.hits < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(StubJWKSHandler.hits, 2)
+
+    def test_stale_keys_survive_failed_refresh(self):
+        store = JWKSKeyStore(self.url, ttl=0, min_refresh_interval=0)
+        store.get_key('key-1')
+        # Nothing listens on port 9 (discard) on the loopback interface
+        store.url = 'http://127.0.0.1:9/.well-known/jwks.json'
+        store.timeout = 0.5
+
+        self.assertIsNotNone(store.get_key('key-1'))
+        self.assertIsNone(store.get_key('bogus'))
+
+
+class FailingJWKSKeyStore(JWKSKeyStore):
+    """Key store whose fetches fail at once once `failing` is set"""
+    def __init__(self, **options):
+        super().__init__('file:///unused', **options)
+        self.fetches = 0
+        self.failing = False
+
+    def fetch(self):
+        self.fetches += 1
+        if self.failing:
+            raise OSError('key endpoint down')
+        return jwks
+
+
+class SlowJWKSKeyStore(FailingJWKSKeyStore):
+    """Key store whose fetches wait for `release` once `slow` is set"""
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.slow = False
+        self.release = threading.Event()
+
+    def fetch(self):
+        if self.slow:
+            self.release.wait(5)
+        return super().fetch()
+
+
+class JWKSFailureTestCase(unittest.TestCase):
+    """This class represents the JWKS key store test case under failures"""
+    def test_failed_first_load_is_rate_limited(self):
+        store = FailingJWKSKeyStore(min_refresh_interval=60)
+        store.failing = True
+
+        with self.assertRaises(OSError):
+            store.get_key('key-1')
+        for _ in range(50):
+            self.assertIsNone(store.get_key('key-1'))
+        self.assertEqual(store.fetches, 1)
+
+    def test_failed_background_refresh_is_rate_limited(self):
+        store = FailingJWKSKeyStore(ttl=60, min_refresh_interval=60)
+        store.get_key('key-1')
+        store.failing = True
+        # Stale, and past the interval since the first fetch
+        store._fetched_at -= 120
+        store._last_attempt -= 120
+
+        for _ in range(50):
+            self.assertIsNotNone(store.get_key('key-1'))
+            deadline = time.monotonic() + 5
+            while store._refreshing and time.monotonic() < deadline:
+                time.sleep(0.001)
+        self.assertEqual(store.fetches, 2)
+
+    def test_stale_lookups_do_not_wait_for_the_refresh(self):
+        store = SlowJWKSKeyStore(ttl=60, min_refresh_interval=60)
+        store.get_key('key-1')
+        store.slow = True
+        store._fetched_at -= 120
+        store._last_attempt -= 120
+
+        try:
+            started = time.monotonic()
+            for _ in range(20):
+                self.assertIsNotNone(store.get_key('key-1'))
+            self.assertIsNone(store.get_key('unknown'))
+            elapsed = time.monotonic() - started
+            self.assertTrue(store._refreshing)
+        finally:
+            store.release.set()
+        self.assertLess(elapsed, 1)
+
+    def test_stale_async_lookup_never_blocks_the_loop(self):
+        store = FailingJWKSKeyStore(ttl=60, min_refresh_interval=60)
+        store.get_key('key-1')
+        store._fetched_at -= 120
+
+        # Held by another thread, as while it swaps in a new key set
+        with store._lock:
+            started = time.monotonic()
+            key = asyncio.run(store.get_key_async('key-1'))
+            elapsed = time.monotonic() - started
+
+        self.assertEqual(key['kid'], 'key-1')
+        self.assertLess(elapsed, 1)
+
+
+class JWKSURLTestCase(unittest.TestCase):
+    """This class represents the JWKS URL setting test case"""
+    def test_empty_url_falls_back_to_the_tenant(self):
+        environ = dict(os.environ, JWKS_URL='', AUTH0_DOMAIN='tenant.test')
+        url = subprocess.check_output(
+            [sys.executable, '-c',
+             'from auth.auth import JWKS_URL; print(JWKS_URL)'],
+            env=environ, cwd=os.path.dirname(os.path.dirname(__file__)))
+
+        self.assertEqual(url.decode().strip(),
+                         'https://tenant.test/.well-known/jwks.json')
@@ -0,0 +1,84 @@
+import os
+import json
+import asyncio
+import tempfile
+import unittest
+from unittest import mock
+
+from auth import auth
+from auth.auth import AuthError, verify_decode_jwt, verify_decode_jwt_async
+from auth.jwks import JWKSKeyStore
+from auth.keys import PinnedKeyProvider, LocalSigningProvider, JWKSKeyProvider
+
+signer = LocalSigningProvider(kid='test-key',
+                              issuer=f'https://{auth.AUTH0_DOMAIN}/',
+                              audience=auth.API_AUDIENCE)
+
+
+class KeyProviderTestCase(unittest.TestCase):
+    """This class represents the offline token verification test case"""
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        signer.write_jwks(self.path)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def verify(self, provider, token):
+        with mock.patch.object(auth, 'key_provider', provider):
+            return verify_decode_jwt(token)
+
+    def test_local_provider_verifies_its_tokens(self):
+        payload = self.verify(signer, signer.mint(['get:actors']))
+
+        self.assertEqual(payload['permissions'], ['get:actors'])
+
+    def test_pinned_provider_verifies_without_network(self):
+        provider = PinnedKeyProvider(self.path)
+        with mock.patch('auth.jwks.urlopen') as urlopen:
+            payload = self.verify(provider, signer.mint(subject='pinned'))
+
+        self.assertEqual(payload['sub'], 'pinned')
+        urlopen.assert_not_called()
+
+    def test_pinned_provider_async(self):
+        provider = PinnedKeyProvider(self.path)
+        with mock.patch.object(auth, 'key_provider', provider):
+            payload = asyncio.run(verify_decode_jwt_async(signer.mint()))
+
+        self.assertEqual(payload['sub'], 'local')
+
+    def test_pinned_file_without_keys(self):
+        with open(self.path, 'w') as jwks_file:
+            json.dump({'keys': [{'kid': 'x', 'kty': 'oct'}]}, jwks_file)
+
+        with self.assertRaises(ValueError):
+            PinnedKeyProvider(self.path)
+
+    def test_unknown_kid(self):
+        other = LocalSigningProvider(kid='other-key',
+                                     issuer=signer.issuer,
+                                     audience=signer.audience)
+
+        with self.assertRaises(AuthError) as context:
+            self.verify(PinnedKeyProvider(self.path), other.mint())
+        self.assertEqual(context.exception.error['description'],
+                         'Unable to find the appropriate key.')
+
+    def test_tampered_signature(self):
+        header, claims, signature = signer.mint().split('.')
+        forged = f'{header}.{claims}.{signature[::-1]}'
+
+        with self.assertRaises(AuthError) as context:
+            self.verify(signer, forged)
+        self.assertEqual(context.exception.error['description'],
+                         'Unable to parse authentication token.')
+
+    def test_jwks_store_parses_keys_once(self):
+        provider = JWKSKeyProvider(JWKSKeyStore(f'file://{self.path}'))
+
+        key = provider.get_key('test-key')
+        self.assertIs(provider.get_key('test-key'), key)
+        self.assertIsNone(provider.get_key('unknown'))
+        self.assertEqual(self.verify(provider, signer.mint())['sub'], 'local')
@@ -0,0 +1,169 @@
+import os
+import re
+import json
+import runpy
+import shutil
+import logging
+import tempfile
+import unittest
+from datetime import date
+from unittest import mock
+
+from app import app
+from app.models import db, setup_db, Actor
+from app.metrics import metrics, Metrics, merge_histograms
+from app.query_stats import query_stats
+from auth.auth import token_cache
+from .local_auth import local_auth, auth_header
+
+
+def sample(text, name, **labels):
+    '''Returns the value of the sample of name with exactly labels'''
+    for line in text.splitlines():
+        match = re.match(r'^(\w+)(?:\{(.*)\})? (\S+)$', line)
+        if not match or match.group(1) != name:
+            continue
+        found = dict(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"',
+                                match.group(2) or ''))
+        if found == labels:
+            return float(match.group(3))
+    return None
+
+
+class MetricsTestCase(unittest.TestCase):
+    """This class represents the Prometheus metrics test case"""
+    def setUp(self):
+        self.app = app
+        self.client = self.app.test_client
+        database_path = os.getenv('TEST_DATABASE_URI', 'sqlite://')
+        setup_db(self.app, database_path)
+        self.auth = local_auth()
+        self.auth.start()
+        token_cache.clear()
+        with self.app.app_context():
+            db.create_all()
+            Actor(name='Actor', dob=date(1990, 1, 1), gender='male').insert()
+        self.directory = tempfile.mkdtemp()
+        self.values = mock.patch.object(metrics, '_values', {})
+        self.values.start()
+        metrics.enable()
+
+    def tearDown(self):
+        metrics.disable()
+        query_stats.disable()
+        self.values.stop()
+        self.auth.stop()
+        shutil.rmtree(self.directory)
+        with self.app.app_context():
+            db.session.query(Actor).delete()
+            db.session.commit()
+
+    def test_metrics_endpoint_is_disabled_by_default(self):
+        metrics.disable()
+        response = self.client().get('/metrics')
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_request_auth_and_db_histograms(self):
+        for _ in range(2):
+            self.client().get('/api/v1/actors',
+                              headers=auth_header('assistant'))
+        self.client().get('/api/v1/actors')
+        response = self.client().get('/metrics')
+        text = response.data.decode()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+        self.assertEqual(sample(
+            text, 'http_request_duration_seconds_count',
+            route='/api/v1/actors', method='GET', status='200'), 2)
+        self.assertEqual(sample(
+            text, 'http_request_duration_seconds_bucket',
+            route='/api/v1/actors', method='GET', status='401',
+            le='+Inf'), 1)
+        self.assertEqual(sample(
+            text, 'auth_duration_seconds_count',
+            outcome='ok', cache='miss'), 1)
+        self.assertEqual(sample(
+            text, 'auth_duration_seconds_count',
+            outcome='ok', cache='hit'), 1)
+        self.assertEqual(sample(
+            text, 'auth_duration_seconds_count',
+            outcome='invalid_header', cache='none'), 1)
+        self.assertGreater(sample(
+            text, 'http_request_db_seconds_sum',
+            route='/api/v1/actors', method='GET'), 0)
+        self.assertGreater(sample(
+            text, 'http_response_encode_seconds_sum',
+            route='/api/v1/actors', method='GET'), 0)
+        self.assertIsNotNone(sample(text, 'db_pool_checked_out',
+                                    pid=str(os.getpid())))
+        self.assertIn('# TYPE db_pool_wait_seconds_total counter', text)
+        self.assertIsNotNone(sample(text, 'db_pool_timeouts_total',
+                                    pid=str(os.getpid())))
+
+    def test_metrics_alone_add_no_server_timing(self):
+        with self.assertLogs('app.query_stats', 'WARNING') as logs, \
+                mock.patch.object(query_stats, 'slow_query_ms', 0):
+            response = self.client().get('/api/v1/actors',
+                                         headers=auth_header('assistant'))
+            logging.getLogger('app.query_stats').warning('end')
+        text = self.client().get('/metrics').data.decode()
+
+        self.assertNotIn('Server-Timing', response.headers)
+        self.assertEqual(len(logs.records), 1)
+        self.assertEqual(query_stats.report(), {})
+        self.assertGreater(sample(
+            text, 'http_request_db_statements_sum',
+            route='/api/v1/actors', method='GET'), 0)
+
+    def test_workers_are_summed_through_the_directory(self):
+        worker = Metrics(directory=self.directory)
+        other = Metrics(directory=self.directory)
+        for registry in (worker, other):
+            registry.observe('auth_duration_seconds', ('ok', 'hit'), 0.002)
+        with self.app.app_context():
+            other.flush()
+            values, gauges = worker.collect()
+
+        counts, total = values['auth_duration_seconds', ('ok', 'hit')]
+        self.assertEqual(sum(counts), 2)
+        self.assertAlmostEqual(total, 0.004)
+        self.assertEqual(list(gauges), [os.getpid()])
+
+    def test_dead_workers_are_archived(self):
+        worker = Metrics(directory=self.directory)
+        dead = Metrics(directory=self.directory)
+        dead.observe('auth_duration_seconds', ('ok', 'hit'), 0.002)
+        with self.app.app_context():
+            dead.flush()
+            os.rename(dead._path,
+                      os.path.join(self.directory, '999999999-dead.json'))
+            for _ in range(2):
+                values, gauges = worker.collect()
+
+        counts, _ = values['auth_duration_seconds', ('ok', 'hit')]
+        self.assertEqual(sum(counts), 1)
+        self.assertNotIn(
+            '999999999-dead.json', os.listdir(self.directory))
+        self.assertIn('archive.json', os.listdir(self.directory))
+
+    def test_exiting_workers_flush_their_last_observations(self):
+        path = os.path.join(self.directory, 'worker.json')
+        settings = runpy.run_path(os.path.join(
+            os.path.dirname(os.path.dirname(__file__)), 'gunicorn.conf.py'))
+        with mock.patch.multiple(metrics, directory=self.directory,
+                                 _path=path):
+            metrics.observe('auth_duration_seconds', ('ok', 'hit'), 0.002)
+            settings['worker_exit'](mock.Mock(), None)
+
+        with open(path) as metrics_file:
+            histograms = json.load(metrics_file)['histograms']
+        self.assertEqual(histograms[0][:2],
+                         ['auth_duration_seconds', ['ok', 'hit']])
+
+    def test_merge_histograms(self):
+        values = merge_histograms({}, [['a', ['x'], [1, 0], 0.5]])
+        merge_histograms(values, [['a', ['x'], [0, 2], 1.5]])
+
+        self.assertEqual(values, {('a', ('x',)): [[1, 2], 2.0]})
@@ -0,0 +1,101 @@
+import os
+import sys
+import unittest
+import subprocess
+from datetime import date, datetime, timedelta
+
+from app import app
+from app.models import db, setup_db, Actor
+from app.pagination import keyset_page, serializer
+from .local_auth import local_auth, auth_header
+
+
+class KeysetPaginationTestCase(unittest.TestCase):
+    """This class represents the keyset pagination test case"""
+    def setUp(self):
+        self.app = app
+        database_path = os.getenv('TEST_DATABASE_URI', 'sqlite://')
+        setup_db(self.app, database_path)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        created_at = datetime(2020, 1, 1)
+        for i in range(25):
+            actor = Actor(name=f'Actor {i}', dob=date(1990, 1, 1),
+                          gender='female')
+            # Every other pair of actors shares a creation timestamp
+            actor.created_at = created_at + timedelta(seconds=i // 2)
+            db.session.add(actor)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.query(Actor).delete()
+        db.session.commit()
+        self.context.pop()
+
+    def collect(self, sort, limit):
+        names, cursor = [], ''
+        while cursor is not None:
+            actors, cursor = keyset_page(Actor, sort, cursor, limit)
+            names.extend(actor.name for actor in actors)
+        return names
+
+    def test_pages_by_id_cover_every_row_once(self):
+        names = self.collect('id', 10)
+
+        self.assertEqual(names, [f'Actor {i}' for i in range(25)])
+
+    def test_pages_by_created_at_cover_every_row_once(self):
+        names = self.collect('created_at', 3)
+
+        self.assertEqual(names, [f'Actor {i}' for i in range(25)])
+
+    def test_last_page_has_no_next_cursor(self):
+        actors, cursor = keyset_page(Actor, 'id', '', 25)
+
+        self.assertEqual(len(actors), 25)
+        self.assertIsNone(cursor)
+
+    def test_tampered_cursor_is_rejected(self):
+        _, cursor = keyset_page(Actor, 'id', '', 10)
+
+        with self.assertRaises(ValueError):
+            keyset_page(Actor, 'id', cursor[:-2] + 'xx', 10)
+
+    def test_cursor_for_another_sort_is_rejected(self):
+        _, cursor = keyset_page(Actor, 'id', '', 10)
+
+        with self.assertRaises(ValueError):
+            keyset_page(Actor, 'created_at', cursor, 10)
+
+    def test_cursor_for_another_table_is_rejected(self):
+        cursor = serializer.dumps(['movies', 'id', [1]])
+
+        with self.assertRaises(ValueError):
+            keyset_page(Actor, 'id', cursor, 10)
+
+    def test_limit_below_one_is_rejected(self):
+        for limit in (0, -1):
+            with self.assertRaises(ValueError):
+                keyset_page(Actor, 'id', '', limit)
+
+    def test_endpoints_answer_400_for_limit_below_one(self):
+        with local_auth():
+            for path in ('/api/v1/actors', '/api/v1/movies'):
+                for limit in (0, -1):
+                    response = self.app.test_client().get(
+                        f'{path}?cursor=&limit={limit}',
+                        headers=auth_header('assistant'))
+                    self.assertEqual(response.status_code, 400,
+                                     (path, limit))
+
+    def test_workers_share_the_default_cursor_secret(self):
+        environ = dict(os.environ, CURSOR_SECRET='',
+                       DATABASE_URI='sqlite://')
+        secrets = {subprocess.check_output(
+            [sys.executable, '-c', 'from app.pagination import '
+             'CURSOR_SECRET; print(CURSOR_SECRET)'],
+            env=environ, cwd=os.path.dirname(os.path.dirname(__file__)))
+            for _ in range(2)}
+
+        self.assertEqual(len(secrets), 1)
@@ -0,0 +1,88 @@
+import unittest
+from unittest import mock
+
+from flask import Flask
+
+from auth import auth
+from auth.auth import requires_auth, check_permissions, AuthError
+from auth.permissions import Permissions, granted_permissions
+from .local_auth import local_auth, auth_header
+
+
+class PermissionsTestCase(unittest.TestCase):
+    """This class represents the compiled permissions test case"""
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.auth = local_auth()
+        self.auth.start()
+        auth.token_cache.clear()
+
+    def tearDown(self):
+        self.auth.stop()
+        auth.token_cache.clear()
+
+    def call(self, role, **required):
+        @requires_auth(**required)
+        def endpoint():
+            return auth.get_current_permissions()
+
+        with self.app.test_request_context('/', headers=auth_header(role)):
+            return endpoint()
+
+    def test_all_of(self):
+        required = Permissions('get:actors', all_of=['post:movies'])
+
+        self.assertTrue(required.allows(frozenset(
+            ['get:actors', 'post:movies', 'delete:movies'])))
+        self.assertFalse(required.allows(frozenset(['get:actors'])))
+
+    def test_any_of(self):
+        required = Permissions(any_of=['post:movies', 'patch:movies'])
+
+        self.assertTrue(required.allows(frozenset(['patch:movies'])))
+        self.assertFalse(required.allows(frozenset(['get:movies'])))
+
+    def test_empty_requirement_is_falsy(self):
+        self.assertFalse(Permissions())
+        self.assertTrue(Permissions('get:actors'))
+
+    def test_string_collections_are_rejected(self):
+        with self.assertRaises(TypeError):
+            Permissions(any_of='get:actors')
+
+    def test_check_permissions_accepts_strings(self):
+        payload = {'permissions': ['get:actors']}
+
+        self.assertTrue(check_permissions('get:actors', payload))
+        with self.assertRaises(AuthError) as context:
+            check_permissions('post:actors', payload)
+        self.assertEqual(context.exception.status_code, 403)
+
+    def test_missing_permissions_claim(self):
+        self.assertIsNone(granted_permissions({'sub': 'user'}))
+        with self.assertRaises(AuthError) as context:
+            check_permissions(Permissions('get:actors'), {'sub': 'user'})
+        self.assertEqual(context.exception.status_code, 400)
+
+    def test_requires_auth_any_of(self):
+        permissions = self.call('director',
+                                any_of=['post:movies', 'patch:movies'])
+
+        self.assertIn('patch:movies', permissions)
+        with self.assertRaises(AuthError):
+            self.call('assistant', any_of=['post:movies', 'patch:movies'])
+
+    def test_requires_auth_all_of(self):
+        self.call('producer', all_of=['post:movies', 'delete:movies'])
+
+        with self.assertRaises(AuthError):
+            self.call('director', all_of=['post:actors', 'post:movies'])
+
+    def test_permissions_compiled_once_per_token(self):
+        with mock.patch('auth.auth.granted_permissions',
+                        wraps=granted_permissions) as compile_permissions:
+            first = self.call('director', permission='get:actors')
+            second = self.call('director', permission='patch:movies')
+
+        self.assertIs(first, second)
+        self.assertEqual(compile_permissions.call_count, 1)
@@ -0,0 +1,126 @@
+import os
+import json
+import runpy
+import tempfile
+import unittest
+from unittest import mock
+
+from sqlalchemy import inspect
+
+import app as application
+from app import app
+from app.models import db, setup_db, dispose_engines
+from app.pool import TimedQueuePool
+
+
+class PoolTestCase(unittest.TestCase):
+    """This class represents the connection pool configuration test case"""
+    def setUp(self):
+        self.app = app
+        self.client = self.app.test_client
+        self.directory = tempfile.mkdtemp()
+        setup_db(self.app, f'sqlite:///{self.directory}/pool.db',
+                 DB_POOL_SIZE=3, DB_MAX_OVERFLOW=2, DB_POOL_RECYCLE=60)
+        application.INTERNAL_ENDPOINTS = True
+
+    def tearDown(self):
+        application.INTERNAL_ENDPOINTS = False
+        setup_db(self.app, os.getenv('TEST_DATABASE_URI', 'sqlite://'))
+
+    def test_pool_settings_are_applied(self):
+        with self.app.app_context():
+            pool = db.engine.pool
+
+            self.assertIsInstance(pool, TimedQueuePool)
+            self.assertEqual(pool.size(), 3)
+            self.assertEqual(pool._max_overflow, 2)
+            self.assertEqual(pool._recycle, 60)
+            self.assertTrue(pool._pre_ping)
+
+    def test_pool_status_endpoint(self):
+        response = self.client().get('/internal/pool')
+        data = json.loads(response.data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['pool']['size'], 3)
+        self.assertGreaterEqual(data['pool']['checkouts'], 1)
+
+    def test_pool_status_endpoint_is_disabled_by_default(self):
+        application.INTERNAL_ENDPOINTS = False
+        response = self.client().get('/internal/pool')
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_dispose_engines_closes_pooled_connections(self):
+        with self.app.app_context():
+            db.session.execute('SELECT 1')
+            db.session.remove()
+            self.assertEqual(db.engine.pool.checkedin(), 1)
+
+            dispose_engines(self.app)
+
+            self.assertEqual(db.engine.pool.checkedin(), 0)
+
+    def test_tables_are_not_created_when_migrations_manage_them(self):
+        setup_db(self.app, f'sqlite:///{self.directory}/migrated.db',
+                 create_all=False)
+        with self.app.app_context():
+            self.assertEqual(inspect(db.engine).get_table_names(), [])
+
+
+class GunicornConfigTestCase(unittest.TestCase):
+    """This class represents the gunicorn settings test case"""
+    path = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                        'gunicorn.conf.py')
+
+    def run_with_cpus(self, cpus, **environ):
+        with mock.patch.dict(os.environ, environ), \
+                mock.patch('os.sched_getaffinity', create=True,
+                           return_value=set(range(cpus))):
+            for name in ('WEB_CONCURRENCY', 'GUNICORN_THREADS',
+                         'GUNICORN_MAX_WORKERS', 'DB_MAX_CONNECTIONS'):
+                if name not in environ:
+                    os.environ.pop(name, None)
+            return runpy.run_path(self.path)
+
+    def test_defaults_follow_the_cpu_count(self):
+        with mock.patch('multiprocessing.cpu_count', return_value=64):
+            settings = self.run_with_cpus(4)
+
+        self.assertEqual(settings['cpus'], 4)
+        self.assertEqual(settings['workers'], 9)
+        self.assertEqual(settings['worker_class'], 'gthread')
+        self.assertTrue(settings['preload_app'])
+        self.assertGreater(settings['max_requests_jitter'], 0)
+
+    def test_derived_workers_are_capped(self):
+        self.assertEqual(self.run_with_cpus(64)['workers'], 12)
+        self.assertEqual(self.run_with_cpus(
+            64, GUNICORN_MAX_WORKERS='20')['workers'], 20)
+        self.assertEqual(self.run_with_cpus(
+            4, DB_MAX_CONNECTIONS='100', DB_POOL_SIZE='5',
+            DB_MAX_OVERFLOW='15')['workers'], 5)
+        self.assertEqual(self.run_with_cpus(
+            4, DB_MAX_CONNECTIONS='10')['workers'], 1)
+        self.assertEqual(self.run_with_cpus(
+            4, WEB_CONCURRENCY='30', DB_MAX_CONNECTIONS='10')['workers'], 30)
+
+    def test_single_thread_uses_sync_workers(self):
+        with mock.patch.dict(os.environ, {'WEB_CONCURRENCY': '2',
+                                          'GUNICORN_THREADS': '1'}):
+            settings = runpy.run_path(self.path)
+
+        self.assertEqual(settings['workers'], 2)
+        self.assertEqual(settings['worker_class'], 'sync')
+
+    def test_forks_dispose_the_engines_of_a_preloaded_app(self):
+        settings = runpy.run_path(self.path)
+        server = mock.Mock()
+        server.cfg.preload_app = True
+        with mock.patch('app.models.dispose_engines') as dispose:
+            settings['pre_fork'](server, None)
+            settings['post_fork'](server, None)
+            server.cfg.preload_app = False
+            settings['post_fork'](server, None)
+
+        self.assertEqual(dispose.call_count, 2)
@@ -0,0 +1,89 @@
+import os
+import json
+import unittest
+from datetime import date
+from unittest import mock
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+import app as application
+from app import app
+from app.models import db, setup_db, Actor
+from app.query_stats import query_stats
+from .local_auth import local_auth, auth_header
+
+
+class QueryStatsTestCase(unittest.TestCase):
+    """This class represents the SQL instrumentation test case"""
+    def setUp(self):
+        self.app = app
+        self.client = self.app.test_client
+        database_path = os.getenv('TEST_DATABASE_URI', 'sqlite://')
+        setup_db(self.app, database_path)
+        self.auth = local_auth()
+        self.auth.start()
+        with self.app.app_context():
+            db.create_all()
+            for i in range(3):
+                Actor(name=f'Actor {i}', dob=date(1990, 1, 1),
+                      gender='female').insert()
+        query_stats.reset()
+        query_stats.enable()
+
+    def tearDown(self):
+        query_stats.disable()
+        query_stats.reset()
+        application.INTERNAL_ENDPOINTS = False
+        self.auth.stop()
+        with self.app.app_context():
+            db.session.query(Actor).delete()
+            db.session.commit()
+
+    def test_server_timing_header(self):
+        response = self.client().get('/api/v1/actors?count=exact',
+                                     headers=auth_header('assistant'))
+        timing = response.headers['Server-Timing']
+
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(timing, r'^db;desc="\d+ queries";dur=[\d.]+, '
+                                 r'db-slowest;dur=[\d.]+, app;dur=[\d.]+$')
+        self.assertNotIn('db;desc="0 queries"', timing)
+
+    def test_report_aggregates_per_endpoint(self):
+        application.INTERNAL_ENDPOINTS = True
+        for _ in range(2):
+            self.client().get('/api/v1/actors',
+                              headers=auth_header('assistant'))
+        self.client().get('/api/v1/actors/1',
+                          headers=auth_header('assistant'))
+        response = self.client().get('/internal/queries')
+        endpoints = json.loads(response.data)['endpoints']
+
+        self.assertEqual(endpoints['retrieve_actors']['requests'], 2)
+        self.assertGreaterEqual(
+            endpoints['retrieve_actors']['queries_per_request'], 1)
+        self.assertIn('SELECT',
+                      endpoints['retrieve_actors']['slowest_statement'])
+        self.assertEqual(endpoints['retrieve_actor']['requests'], 1)
+
+    def test_slow_queries_are_logged(self):
+        with mock.patch.object(query_stats, 'slow_query_ms', 0), \
+                self.assertLogs('app.query_stats', 'WARNING') as logs:
+            self.client().get('/api/v1/actors',
+                              headers=auth_header('assistant'))
+        line = json.loads(logs.records[0].getMessage())
+
+        self.assertEqual(line['event'], 'slow_query')
+        self.assertEqual(line['endpoint'], 'retrieve_actors')
+        self.assertEqual(line['path'], '/api/v1/actors')
+
+    def test_disabled_instrumentation_adds_nothing(self):
+        query_stats.disable()
+        response = self.client().get('/api/v1/actors',
+                                     headers=auth_header('assistant'))
+
+        self.assertNotIn('Server-Timing', response.headers)
+        self.assertFalse(event.contains(Engine, 'after_cursor_execute',
+                                        query_stats._after))
+        self.assertEqual(query_stats.report(), {})
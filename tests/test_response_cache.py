@@ -0,0 +1,133 @@
+import os
+import json
+import unittest
+from datetime import date
+
+from sqlalchemy import event
+
+from app import app
+from app.models import db, setup_db, Movie
+from app.response_cache import response_cache, LRUBackend, RedisBackend
+from .local_auth import local_auth, auth_header
+
+
+class FakeRedis:
+    """Dict based stand-in for the subset of redis.Redis in use"""
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        value = value if isinstance(value, bytes) else str(value).encode()
+        self.data[key] = value
+        return True
+
+    def incr(self, key):
+        value = int(self.data.get(key, b'0')) + 1
+        self.data[key] = str(value).encode()
+        return value
+
+
+class ResponseCacheTestCase(unittest.TestCase):
+    """This class represents the list response cache test case"""
+    def setUp(self):
+        self.app = app
+        self.client = self.app.test_client
+        database_path = os.getenv('TEST_DATABASE_URI', 'sqlite://')
+        setup_db(self.app, database_path)
+        self.auth = local_auth()
+        self.auth.start()
+        response_cache.backend = self.make_backend()
+        response_cache.hits = response_cache.misses = 0
+        with self.app.app_context():
+            db.create_all()
+            Movie(title='Movie', release_date=date(2000, 1, 1)).insert()
+            self.queries = 0
+            event.listen(db.engine, 'before_cursor_execute', self.count)
+
+    def tearDown(self):
+        response_cache.backend = None
+        self.auth.stop()
+        with self.app.app_context():
+            event.remove(db.engine, 'before_cursor_execute', self.count)
+            db.session.query(Movie).delete()
+            db.session.commit()
+
+    # table_versions lookups of a cached hit
+    hit_queries = 1
+
+    def make_backend(self):
+        return LRUBackend()
+
+    def other_worker_backend(self):
+        return LRUBackend()
+
+    def count(self, *args):
+        self.queries += 1
+
+    def get(self, url='/api/v1/movies?page=1', **headers):
+        headers.update(auth_header('assistant'))
+        return self.client().get(url, headers=headers)
+
+    def test_repeated_list_is_served_from_cache(self):
+        first = self.get()
+        queries = self.queries
+        second = self.get()
+
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second.headers['ETag'], first.headers['ETag'])
+        self.assertEqual(self.queries, queries + self.hit_queries)
+        self.assertEqual(response_cache.stats()['hits'], 1)
+
+    def test_cache_key_depends_on_query(self):
+        self.get()
+        response = self.get('/api/v1/movies?page=2')
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response_cache.stats()['hits'], 0)
+
+    def test_cached_list_answers_conditional_get(self):
+        etag = self.get().headers['ETag']
+        response = self.get(**{'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response_cache.stats()['hits'], 1)
+
+    def test_write_invalidates_cached_lists(self):
+        self.get()
+        with self.app.app_context():
+            Movie(title='Sequel', release_date=date(2001, 1, 1)).insert()
+        response = self.get()
+
+        self.assertEqual(json.loads(response.data)['total-movies'], 2)
+        self.assertEqual(response_cache.stats()['hits'], 0)
+
+    def test_write_in_another_worker_invalidates_cached_lists(self):
+        self.get()
+        backend = response_cache.backend
+        response_cache.backend = self.other_worker_backend()
+        try:
+            with self.app.app_context():
+                Movie(title='Sequel', release_date=date(2001, 1, 1)).insert()
+        finally:
+            response_cache.backend = backend
+        response = self.get()
+
+        self.assertEqual(json.loads(response.data)['total-movies'], 2)
+        self.assertEqual(response_cache.stats()['hits'], 0)
+
+
+class RedisResponseCacheTestCase(ResponseCacheTestCase):
+    """The same cases against the Redis backend with a local stand-in"""
+    hit_queries = 0
+
+    def make_backend(self):
+        return RedisBackend(FakeRedis())
+
+    def other_worker_backend(self):
+        return response_cache.backend
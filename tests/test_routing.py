@@ -0,0 +1,117 @@
+import os
+import json
+import tempfile
+import unittest
+from unittest import mock
+from datetime import date
+
+from app import app
+from app.models import db, setup_db, Actor
+from app.routing import router, ReplicaRouter
+from .local_auth import local_auth, auth_header
+
+
+class ReplicaRoutingTestCase(unittest.TestCase):
+    """This class represents the read replica routing test case"""
+    def setUp(self):
+        self.app = app
+        self.client = self.app.test_client
+        self.directory = tempfile.mkdtemp()
+        self.auth = local_auth()
+        self.auth.start()
+        self.bind(['replica_a', 'replica_b'])
+
+    def tearDown(self):
+        self.auth.stop()
+        setup_db(self.app, os.getenv('TEST_DATABASE_URI', 'sqlite://'),
+                 replica_paths=[])
+
+    def uri(self, name):
+        return f'sqlite:///{self.directory}/{name}.db'
+
+    def bind(self, replicas):
+        setup_db(self.app, self.uri('primary'),
+                 replica_paths=[self.uri(name) for name in replicas])
+        with self.app.app_context():
+            engines = {'primary': db.get_engine(self.app)}
+            for index, name in enumerate(replicas):
+                engines[name] = db.get_engine(self.app,
+                                              bind=f'replica_{index}')
+            for name, engine in engines.items():
+                db.Model.metadata.create_all(bind=engine)
+                engine.execute(Actor.__table__.delete())
+                engine.execute(Actor.__table__.insert(), {
+                    'id': 1, 'name': name, 'dob': date(1990, 1, 1),
+                    'gender': 'female'})
+
+    def get_actor_name(self, role='assistant'):
+        response = self.client().get('/api/v1/actors/1',
+                                     headers=auth_header(role))
+        return json.loads(response.data)['actor']['name']
+
+    def test_reads_go_to_replicas_in_turn(self):
+        names = {self.get_actor_name() for _ in range(4)}
+
+        self.assertEqual(names, {'replica_a', 'replica_b'})
+
+    def test_least_connections_strategy(self):
+        router.strategy = 'least_connections'
+        try:
+            self.assertIn(self.get_actor_name(), ('replica_a', 'replica_b'))
+        finally:
+            router.strategy = 'round_robin'
+
+    def test_writes_go_to_the_primary(self):
+        response = self.client().patch(
+            '/api/v1/actors/1', data=json.dumps({'gender': 'male'}),
+            headers=auth_header('director'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)['actor']['name'],
+                         'primary')
+
+    def test_reads_follow_own_writes_to_the_primary(self):
+        self.client().patch(
+            '/api/v1/actors/1', data=json.dumps({'gender': 'male'}),
+            headers=auth_header('director'))
+
+        self.assertEqual(self.get_actor_name('director'), 'primary')
+        self.assertNotEqual(self.get_actor_name('assistant'), 'primary')
+
+    def test_write_cookie_carries_reads_to_the_primary(self):
+        client = self.client()
+        client.patch(
+            '/api/v1/actors/1', data=json.dumps({'gender': 'male'}),
+            headers=auth_header('director'))
+        # As if the next read landed on another worker
+        router._last_writes.clear()
+        response = client.get('/api/v1/actors/1',
+                              headers=auth_header('director'))
+
+        self.assertEqual(json.loads(response.data)['actor']['name'],
+                         'primary')
+        self.assertNotEqual(self.get_actor_name('director'), 'primary')
+
+    def test_lagging_replicas_are_skipped(self):
+        router.max_lag = -1
+        try:
+            self.assertEqual(self.get_actor_name(), 'primary')
+        finally:
+            router.max_lag = 5
+
+    def test_unavailable_replica_falls_back_to_primary(self):
+        setup_db(self.app, self.uri('primary'),
+                 replica_paths=[f'sqlite:///{self.directory}/missing/x.db'])
+
+        self.assertEqual(self.get_actor_name(), 'primary')
+
+    def test_expired_writes_are_forgotten_on_later_writes(self):
+        replicas = ReplicaRouter(read_your_writes=5)
+        with mock.patch('app.routing.time.monotonic', return_value=100):
+            for client in range(1000):
+                replicas.record_write(f'client-{client}')
+        with mock.patch('app.routing.time.monotonic', return_value=110):
+            replicas.record_write('writer')
+
+            self.assertEqual(list(replicas._last_writes), ['writer'])
+            self.assertTrue(replicas.wrote_recently('writer'))
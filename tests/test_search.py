@@ -0,0 +1,137 @@
+import os
+import json
+import unittest
+from datetime import date
+
+from app import app
+from app.models import db, setup_db, Actor, Movie
+from app.search import (
+    search, inverted_index, fts5_available, InvertedIndexSearch, SQLiteSearch)
+from .local_auth import local_auth, auth_header
+
+
+class SearchTestCase(unittest.TestCase):
+    """This class represents the actor and movie search test case"""
+    def setUp(self):
+        self.app = app
+        self.client = self.app.test_client
+        database_path = os.getenv('TEST_DATABASE_URI', 'sqlite://')
+        setup_db(self.app, database_path)
+        self.auth = local_auth()
+        self.auth.start()
+        inverted_index.invalidate(Actor)
+        with self.app.app_context():
+            db.create_all()
+            for name in ('John Smith', 'Johnny Walker', 'Mary Johnson',
+                         'Anna Karenina'):
+                Actor(name=name, dob=date(1980, 1, 1), gender='female'
+                      ).insert()
+            for title in ('John Wick', 'Anna Karenina', 'Heat'):
+                Movie(title=title, release_date=date(2000, 1, 1)).insert()
+
+    def tearDown(self):
+        self.auth.stop()
+        with self.app.app_context():
+            db.session.query(Actor).delete()
+            db.session.query(Movie).delete()
+            db.session.commit()
+
+    def get(self, query, role='assistant'):
+        response = self.client().get(f'/api/v1/search?{query}',
+                                     headers=auth_header(role))
+        return response, json.loads(response.data)
+
+    def fts5(self):
+        with self.app.app_context():
+            return db.engine.dialect.name == 'sqlite' and fts5_available()
+
+    def test_prefix_search_across_actors_and_movies(self):
+        for backend in ('auto', 'memory'):
+            with self.app.app_context():
+                rows = search('joh', ['actor', 'movie'], backend=backend)
+
+            self.assertEqual(
+                sorted((kind, value) for kind, id, value, score in rows),
+                [('actor', 'John Smith'), ('actor', 'Johnny Walker'),
+                 ('actor', 'Mary Johnson'), ('movie', 'John Wick')],
+                backend)
+
+    def test_every_word_must_match(self):
+        for backend in ('auto', 'memory'):
+            with self.app.app_context():
+                rows = search('john s', ['actor'], backend=backend)
+
+            self.assertEqual([value for kind, id, value, score in rows],
+                             ['John Smith'], backend)
+
+    def test_whole_word_matches_rank_first(self):
+        for backend in ('auto', 'memory'):
+            with self.app.app_context():
+                rows = search('anna karenina', ['actor', 'movie'],
+                              backend=backend)
+                partial = search('john', ['actor'], backend=backend)
+
+            self.assertEqual(len(rows), 2)
+            self.assertEqual(partial[0][2], 'John Smith', backend)
+
+    def test_search_endpoint_pages_results(self):
+        response, first = self.get('q=john&limit=2')
+        response, second = self.get('q=john&limit=2&page=2')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(first['next_page'], 2)
+        self.assertIsNone(second['next_page'])
+        results = first['results'] + second['results']
+        self.assertEqual(len(results), 4)
+        self.assertEqual([result['title'] for result in results
+                          if result['type'] == 'movie'], ['John Wick'])
+
+    def test_search_sees_new_rows(self):
+        self.get('q=heat')
+        with self.app.app_context():
+            Movie(title='Heatwave', release_date=date(2001, 1, 1)).insert()
+            rows = search('heat', ['movie'], backend='memory')
+        response, data = self.get('q=heat')
+
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(len(data['results']), 2)
+
+    def test_empty_query_is_rejected(self):
+        response, data = self.get('q=%20-')
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_type_filter(self):
+        response, data = self.get('q=anna&type=movie')
+
+        self.assertEqual([result['type'] for result in data['results']],
+                         ['movie'])
+
+    def test_candidates_bound_the_matches_ranked(self):
+        with self.app.app_context():
+            Actor(name='Juno', dob=date(1980, 1, 1), gender='male').insert()
+        backends = [InvertedIndexSearch(candidates=2)]
+        if self.fts5():
+            backends.append(SQLiteSearch(candidates=2))
+        for backend in backends:
+            with self.app.app_context():
+                first = backend.search(['j'], ['actor'], 0, 1)
+                page = backend.search(['j'], ['actor'], 0, 4)
+
+            # The best match comes after the first two candidates, unless
+            # the page asked for is larger
+            name = type(backend).__name__
+            self.assertEqual(first[0][2], 'John Smith', name)
+            self.assertEqual(page[0][2], 'Juno', name)
+            self.assertEqual(len(page), 4, name)
+
+    def test_rare_terms_fall_back_to_the_full_text_query(self):
+        if not self.fts5():
+            self.skipTest('SQLite without FTS5')
+        # The first name read shares only the first letters of the term
+        backend = SQLiteSearch(candidates=1)
+        with self.app.app_context():
+            rows = backend.search(['johnson'], ['actor'], 0, 1)
+
+        self.assertEqual([value for kind, id, value, score in rows],
+                         ['Mary Johnson'])
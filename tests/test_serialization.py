@@ -0,0 +1,66 @@
+import os
+import json
+import unittest
+from unittest import mock
+from datetime import date
+
+from app import app
+from app.models import db, setup_db, Actor, Movie
+from app import serialization
+from app.serialization import dumps, jsonify, row_query
+
+
+class SerializationTestCase(unittest.TestCase):
+    """This class represents the JSON serialization test case"""
+    def setUp(self):
+        self.app = app
+        database_path = os.getenv('TEST_DATABASE_URI', 'sqlite://')
+        setup_db(self.app, database_path)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        for i in range(3):
+            Actor(name=f'Actor {i}', dob=date(1980 + i, 2, 1),
+                  gender='female').insert()
+            Movie(title=f'Movie {i}', release_date=date(2000, 1, 1 + i)
+                  ).insert()
+
+    def tearDown(self):
+        db.session.query(Actor).delete()
+        db.session.query(Movie).delete()
+        db.session.commit()
+        self.context.pop()
+
+    def test_encoders_agree(self):
+        data = {'b': [1, 2.5, None, True], 'a': 'Zoë', 'day': date(2020, 1, 2)}
+        fast = dumps(data, sort_keys=True)
+        with mock.patch.object(serialization, 'orjson', None):
+            plain = dumps(data, sort_keys=True)
+
+        self.assertEqual(json.loads(fast), json.loads(plain))
+        self.assertEqual(json.loads(plain)['day'],
+                         'Thu, 02 Jan 2020 00:00:00 GMT')
+
+    def test_jsonify_matches_flask(self):
+        with self.app.test_request_context():
+            response = jsonify({'success': True, 'actors': []})
+
+        self.assertEqual(response.mimetype, 'application/json')
+        self.assertEqual(json.loads(response.data),
+                         {'success': True, 'actors': []})
+
+    def test_row_tuples_format_like_models(self):
+        for model in (Actor, Movie):
+            models = [row.format() for row in
+                      model.query.order_by(model.id)]
+            rows = [model.format_row(row) for row in
+                    row_query(model.query, model).order_by(model.id)]
+
+            self.assertEqual(rows, models)
+
+    def test_row_query_selects_only_needed_columns(self):
+        query = row_query(Actor.query, Actor, ['age'], sort='name')
+        row = query.order_by(Actor.name).first()
+
+        self.assertEqual(row._fields, ('dob', 'name', 'id'))
+        self.assertEqual(list(Actor.format_row(row, ['age'])), ['age'])
@@ -0,0 +1,159 @@
+import time
+import threading
+import unittest
+from unittest import mock
+
+from flask import Flask, abort, jsonify
+
+from app.models import Actor
+from app.single_flight import SingleFlight, single_flight, coalesced
+
+
+class SingleFlightTestCase(unittest.TestCase):
+    """This class represents the request coalescing test case"""
+    def setUp(self):
+        self.flights = SingleFlight(timeout=5)
+        self.release = threading.Event()
+        self.calls = 0
+
+    def slow(self, result='row'):
+        self.calls += 1
+        self.release.wait(5)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def run_concurrently(self, count, func):
+        results = [None] * count
+
+        def run(index):
+            try:
+                results[index] = func()
+            except Exception as error:
+                results[index] = error
+        threads = [threading.Thread(target=run, args=(i,))
+                   for i in range(count)]
+        threads[0].start()
+        self.wait_for_flight()
+        for thread in threads[1:]:
+            thread.start()
+        # Let the followers reach the wait before the leader finishes
+        time.sleep(0.05)
+        self.release.set()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def wait_for_flight(self):
+        deadline = time.monotonic() + 5
+        while not self.calls and time.monotonic() < deadline:
+            time.sleep(0.001)
+
+    def test_concurrent_calls_share_one_result(self):
+        results = self.run_concurrently(
+            8, lambda: self.flights.do('movie:1', self.slow))
+
+        self.assertEqual(results, ['row'] * 8)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.flights.stats()['shared'], 7)
+        self.assertEqual(self.flights.in_flight(), 0)
+
+    def test_errors_reach_every_caller(self):
+        error = LookupError('gone')
+        results = self.run_concurrently(
+            4, lambda: self.flights.do('movie:1', lambda: self.slow(error)))
+
+        self.assertEqual(results, [error] * 4)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.flights.do('movie:1', lambda: 'again'),
+                         'again')
+
+    def test_timed_out_callers_run_the_call_themselves(self):
+        leader = threading.Thread(
+            target=self.flights.do, args=('movie:1', self.slow))
+        leader.start()
+        self.wait_for_flight()
+
+        result = self.flights.do('movie:1', lambda: 'own', timeout=0.01)
+        self.release.set()
+        leader.join()
+
+        self.assertEqual(result, 'own')
+        self.assertEqual(self.flights.timeouts, 1)
+
+    def test_writes_detach_flights_of_their_table(self):
+        leader = threading.Thread(target=self.flights.do,
+                                  args=('movie:1', self.slow, ['movies']))
+        leader.start()
+        self.wait_for_flight()
+        self.flights.invalidate('actors')
+        self.assertEqual(self.flights.in_flight(), 1)
+
+        self.flights.invalidate('movies')
+        result = self.flights.do('movie:1', lambda: 'fresh')
+        self.release.set()
+        leader.join()
+
+        self.assertEqual(result, 'fresh')
+
+
+class CoalescedViewTestCase(unittest.TestCase):
+    """This class represents the coalesced view test case"""
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.release = threading.Event()
+        self.calls = 0
+
+        @self.app.route('/actors/<int:id>')
+        @coalesced(Actor)
+        def actor(id):
+            self.calls += 1
+            self.release.wait(5)
+            if id == 404:
+                abort(404)
+            return jsonify({'id': id}), 200
+
+        patcher = mock.patch.object(single_flight, 'enabled', True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_concurrently(self, path, count=5):
+        statuses, bodies = [], []
+
+        def get():
+            response = self.app.test_client().get(path)
+            statuses.append(response.status_code)
+            bodies.append(response.get_data())
+        threads = [threading.Thread(target=get) for _ in range(count)]
+        threads[0].start()
+        deadline = time.monotonic() + 5
+        while not self.calls and time.monotonic() < deadline:
+            time.sleep(0.001)
+        for thread in threads[1:]:
+            thread.start()
+        time.sleep(0.05)
+        self.release.set()
+        for thread in threads:
+            thread.join()
+        return statuses, bodies
+
+    def test_identical_requests_run_the_view_once(self):
+        statuses, bodies = self.get_concurrently('/actors/1')
+
+        self.assertEqual(statuses, [200] * 5)
+        self.assertEqual(len(set(bodies)), 1)
+        self.assertEqual(self.calls, 1)
+
+    def test_http_errors_are_shared(self):
+        statuses, _ = self.get_concurrently('/actors/404')
+
+        self.assertEqual(statuses, [404] * 5)
+        self.assertEqual(self.calls, 1)
+
+    def test_disabled_runs_every_request(self):
+        self.release.set()
+        with mock.patch.object(single_flight, 'enabled', False):
+            for _ in range(3):
+                self.app.test_client().get('/actors/1')
+
+        self.assertEqual(self.calls, 3)
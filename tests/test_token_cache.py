@@ -0,0 +1,66 @@
+import unittest
+
+from auth.token_cache import VerifiedTokenCache
+
+
+class FakeClock:
+    def __init__(self, now=1000):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class VerifiedTokenCacheTestCase(unittest.TestCase):
+    """This class represents the verified-token cache test case"""
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = VerifiedTokenCache(maxsize=2, clock=self.clock)
+        self.payload = {'exp': 1100, 'permissions': ['get:actors']}
+
+    def test_get_returns_cached_payload(self):
+        self.cache.put('token', self.payload)
+
+        self.assertIs(self.cache.get('token'), self.payload)
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_lookup_returns_cached_permissions(self):
+        permissions = frozenset(self.payload['permissions'])
+        self.cache.put('token', self.payload, permissions)
+
+        self.assertEqual(self.cache.lookup('token'),
+                         (self.payload, permissions))
+        self.assertEqual(self.cache.lookup('other'), (None, None))
+
+    def test_get_unknown_token_is_a_miss(self):
+        self.assertIsNone(self.cache.get('token'))
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_entries_expire_at_exp(self):
+        self.cache.put('token', self.payload)
+        self.clock.now = 1100
+
+        self.assertIsNone(self.cache.get('token'))
+        self.assertEqual(self.cache.expirations, 1)
+
+    def test_expired_tokens_are_not_cached(self):
+        self.cache.put('token', {'exp': 999})
+
+        self.assertEqual(self.cache.stats()['size'], 0)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        self.cache.put('first', self.payload)
+        self.cache.put('second', self.payload)
+        self.cache.get('first')
+        self.cache.put('third', self.payload)
+
+        self.assertIsNotNone(self.cache.get('first'))
+        self.assertIsNone(self.cache.get('second'))
+        self.assertEqual(self.cache.evictions, 1)
+
+    def test_max_ttl_caps_entry_lifetime(self):
+        cache = VerifiedTokenCache(max_ttl=10, clock=self.clock)
+        cache.put('token', self.payload)
+        self.clock.now = 1010
+
+        self.assertIsNone(cache.get('token'))